@@ -1,31 +1,134 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, request, jsonify, render_template, send_file, stream_with_context
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, insert, or_, select, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased, deferred, joinedload, undefer
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from datetime import datetime
+from werkzeug.local import LocalProxy
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Any
 import os
-import requests
-from io import BytesIO
+import threading
+import time
+import uuid
+import hashlib
+import base64
+import csv
+import io
+import zlib
 import json
+import click
+from contextlib import contextmanager
+from functools import wraps
 from dotenv import load_dotenv
+from db_engine import READ_BIND, RoutingSession, engine_options, tune_engine
 
-# Load environment variables
-load_dotenv()
+def _load_config(app):
+    """Read settings from the environment (and .env) into app.config"""
+    load_dotenv()
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///court_cases.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATABASE_READ_URL'] = os.getenv('DATABASE_READ_URL')  # replica (or the primary again, for a separate read pool)
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))  # Postgres and other server databases
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds; below server/proxy idle timeouts
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000))  # wait for the write lock rather than fail
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 ** 2))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 4))
+    app.config['JOB_QUEUE_MAX'] = int(os.getenv('JOB_QUEUE_MAX', 500))
+    app.config['JOB_LEASE_SECONDS'] = int(os.getenv('JOB_LEASE_SECONDS', 120))  # a running job whose lease lapses is requeued
+    app.config['JOB_HEARTBEAT_INTERVAL'] = int(os.getenv('JOB_HEARTBEAT_INTERVAL', 30))  # lease renewal and recovery; 0 disables
+    app.config['RESULT_CACHE_SIZE'] = int(os.getenv('RESULT_CACHE_SIZE', 5000))
+    app.config['RESULT_CACHE_TTL'] = int(os.getenv('RESULT_CACHE_TTL', 3600))
+    app.config['RESULT_CACHE_NEGATIVE_TTL'] = int(os.getenv('RESULT_CACHE_NEGATIVE_TTL', 300))
+    app.config['SINGLEFLIGHT_DATABASE'] = os.getenv('SINGLEFLIGHT_DATABASE', 'false').lower() == 'true'
+    app.config['SINGLEFLIGHT_MAX_AGE'] = int(os.getenv('SINGLEFLIGHT_MAX_AGE', 600))
+    app.config['BATCH_MAX_CASES'] = int(os.getenv('BATCH_MAX_CASES', 2000))
+    app.config['BATCH_WORKERS'] = int(os.getenv('BATCH_WORKERS', 8))
+    app.config['BATCH_COURT_CONCURRENCY'] = int(os.getenv('BATCH_COURT_CONCURRENCY', 4))
+    app.config['BATCH_FLUSH_SIZE'] = int(os.getenv('BATCH_FLUSH_SIZE', 50))
+    app.config['CAPTCHA_STORE'] = os.getenv('CAPTCHA_STORE', 'memory')  # memory or database
+    app.config['CAPTCHA_STORE_URL'] = os.getenv('CAPTCHA_STORE_URL')  # defaults to the app database
+    app.config['CAPTCHA_MAX_SESSIONS'] = int(os.getenv('CAPTCHA_MAX_SESSIONS', 100000))
+    app.config['CAPTCHA_POOL_SIZE'] = int(os.getenv('CAPTCHA_POOL_SIZE', 64))  # pre-rendered images kept ready
+    app.config['CAPTCHA_MAX_IMAGES'] = int(os.getenv('CAPTCHA_MAX_IMAGES', 10000))  # issued images held for serving
+    app.config['DOCUMENT_CACHE_DIR'] = os.getenv('DOCUMENT_CACHE_DIR', os.path.join(app.instance_path, 'document_cache'))
+    app.config['DOCUMENT_CACHE_SIZE'] = int(os.getenv('DOCUMENT_CACHE_SIZE', 256))  # rendered documents kept in memory
+    app.config['DOCUMENT_CACHE_MAX_DISK_BYTES'] = int(os.getenv('DOCUMENT_CACHE_MAX_DISK_BYTES', 512 * 1024 ** 2))  # rendered documents on disk
+    app.config['DOCUMENT_STORE_DIR'] = os.getenv('DOCUMENT_STORE_DIR', os.path.join(app.instance_path, 'documents'))
+    app.config['DOCUMENT_STORE_MAX_BYTES'] = int(os.getenv('DOCUMENT_STORE_MAX_BYTES', 2 * 1024 ** 3))  # upstream documents on disk
+    app.config['DOCUMENT_PREFETCH_WORKERS'] = int(os.getenv('DOCUMENT_PREFETCH_WORKERS', 2))
+    app.config['UPSTREAM_CACHE_DIR'] = os.getenv('UPSTREAM_CACHE_DIR', os.path.join(app.instance_path, 'http_cache'))
+    app.config['UPSTREAM_CACHE_MAX_ENTRIES'] = int(os.getenv('UPSTREAM_CACHE_MAX_ENTRIES', 10000))  # upstream responses on disk
+    app.config['UPSTREAM_CACHE_MAX_BYTES'] = int(os.getenv('UPSTREAM_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+    app.config['UPSTREAM_POOL_SIZE'] = int(os.getenv('UPSTREAM_POOL_SIZE', 10))  # keep-alive connections per host
+    app.config['UPSTREAM_HOST_POOLS'] = os.getenv('UPSTREAM_HOST_POOLS', '')  # e.g. delhihighcourt.nic.in=20,districts.ecourts.gov.in=8
+    app.config['UPSTREAM_RETRIES'] = int(os.getenv('UPSTREAM_RETRIES', 3))
+    app.config['UPSTREAM_CONNECT_TIMEOUT'] = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 5))
+    app.config['UPSTREAM_READ_TIMEOUT'] = float(os.getenv('UPSTREAM_READ_TIMEOUT', 30))
+    app.config['COURT_CASE_STATUS_URL'] = os.getenv('COURT_CASE_STATUS_URL')  # unset serves demo data
+    app.config['PROCEEDINGS_PAGE_SIZE'] = int(os.getenv('PROCEEDINGS_PAGE_SIZE', 50))
+    app.config['PROCEEDINGS_MAX_PAGE_SIZE'] = int(os.getenv('PROCEEDINGS_MAX_PAGE_SIZE', 500))
+    app.config['WEB_THREADS'] = int(os.getenv('WEB_THREADS', 32))  # request threads per process (gunicorn.conf.py reads the same variable)
+    app.config['EVENTS_RESERVED_THREADS'] = int(os.getenv('EVENTS_RESERVED_THREADS', 8))  # threads event streams may never take
+    app.config['EVENTS_MAX_CONNECTIONS'] = int(os.getenv('EVENTS_MAX_CONNECTIONS', 0))  # open SSE streams per process; 0 derives it from WEB_THREADS
+    app.config['EVENTS_HEARTBEAT'] = int(os.getenv('EVENTS_HEARTBEAT', 15))
+    app.config['EVENTS_STREAM_MAX_AGE'] = int(os.getenv('EVENTS_STREAM_MAX_AGE', 300))  # clients reconnect with Last-Event-ID
+    app.config['EVENTS_RETRY_MS'] = int(os.getenv('EVENTS_RETRY_MS', 3000))
+    app.config['EVENTS_SYNC_INTERVAL'] = int(os.getenv('EVENTS_SYNC_INTERVAL', 5))  # picks up commits from other processes; 0 disables
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    app.config['RETENTION_DAYS'] = int(os.getenv('RETENTION_DAYS', 90))  # finished lookups kept in the database; 0 keeps all
+    app.config['RETENTION_INTERVAL'] = int(os.getenv('RETENTION_INTERVAL', 3600))  # seconds between background passes; 0 disables
+    app.config['RETENTION_BATCH_SIZE'] = int(os.getenv('RETENTION_BATCH_SIZE', 500))  # queries archived per transaction
+    app.config['RETENTION_PAUSE'] = float(os.getenv('RETENTION_PAUSE', 0.05))  # seconds between batches
+    app.config['RETENTION_VACUUM_PAGES'] = int(os.getenv('RETENTION_VACUUM_PAGES', 1000))  # SQLite pages freed per step
+    app.config['ARCHIVE_DIR'] = os.getenv('ARCHIVE_DIR', os.path.join(app.instance_path, 'archive'))
+    app.config['STATIC_FINGERPRINT'] = os.getenv('STATIC_FINGERPRINT', 'true').lower() == 'true'  # off in debug mode
+    app.config['STATIC_BUILD_DIR'] = os.getenv('STATIC_BUILD_DIR', os.path.join(app.instance_path, 'static_build'))
+    app.config['STATIC_FINGERPRINT_EXCLUDE'] = os.getenv('STATIC_FINGERPRINT_EXCLUDE', 'images/captcha').split(',')  # written at runtime
+    app.config['PAGE_CACHE_SIZE'] = int(os.getenv('PAGE_CACHE_SIZE', 1024))  # rendered pages kept; 0 renders every hit
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATELIMIT_STORAGE'] = os.getenv('RATELIMIT_STORAGE', 'memory')  # memory, database or a limits URI (redis://...)
+    app.config['RATELIMIT_STORAGE_URL'] = os.getenv('RATELIMIT_STORAGE_URL')  # defaults to the app database
+    app.config['RATELIMIT_MAX_KEYS'] = int(os.getenv('RATELIMIT_MAX_KEYS', 100000))  # exact counters; the rest are approximated
+    app.config['RATELIMIT_STRATEGY'] = os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    app.config['RATELIMIT_APPLICATION'] = os.getenv('RATELIMIT_BUDGET', '300 per minute')  # per client, weighted by ROUTE_COSTS
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='static', template_folder='templates')
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///court_cases.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Extensions are bound to an app in create_app
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Share of a client's overall budget (RATELIMIT_BUDGET) each request uses. Routes that
+# make the app talk to the court website or hold a worker cost more than plain reads.
+ROUTE_COSTS = {
+    'main.submit_captcha': 10,
+    'main.batch_search': 20,
+    'main.search_case': 5,
+    'main.export_history': 5,
+    'main.download_document': 3,
+    'main.get_captcha': 2,
+    'main.refresh_captcha': 2,
+    'main.find_cases': 2
+}
+
+def _request_cost():
+    return ROUTE_COSTS.get(request.endpoint, 1)
+
+def _count_rejection(request_limit):
+    RATE_LIMIT_REJECTIONS.inc(request.endpoint or 'unmatched')
 
-# Initialize extensions
-db = SQLAlchemy(app)
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
-    default_limits=["100 per minute"]
+    default_limits=["100 per minute"],
+    on_breach=_count_rejection,
+    application_limits_cost=_request_cost,
+    application_limits_exempt_when=lambda: request.endpoint == 'static'
 )
+main = Blueprint('main', __name__)
 
 # Database Models
 class CaseQuery(db.Model):
@@ -36,10 +139,25 @@ class CaseQuery(db.Model):
     case_number = db.Column(db.String(100), nullable=False)
     filing_year = db.Column(db.String(10), nullable=False)
     court = db.Column(db.String(50), nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='pending')
+    # Case key normalized like the cache key (see _new_query); the columns above keep what the user entered
+    court_key = db.Column(db.String(50), nullable=True)
+    case_type_key = db.Column(db.String(50), nullable=True)
+    case_number_key = db.Column(db.String(100), nullable=True)
+    filing_year_key = db.Column(db.String(10), nullable=True)
+    source_query_id = db.Column(db.Integer, nullable=True, index=True)  # answered from the cache with this query's stored result
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
     error_message = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     completed_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    snapshot = deferred(db.Column(db.Text, nullable=True))  # Final response JSON, set once the query is terminal
+    snapshot_etag = db.Column(db.String(40), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_case_queries_case_key', 'court_key', 'case_type_key', 'case_number_key', 'filing_year_key'),
+        db.Index('ix_case_queries_created_id', 'created_at', 'id'),
+        db.Index('ix_case_queries_updated_id', 'updated_at', 'id'),
+    )
     
     # Relationship
     case_detail = db.relationship('CaseDetail', backref='query', uselist=False, cascade='all, delete-orphan')
@@ -48,7 +166,7 @@ class CaseDetail(db.Model):
     __tablename__ = 'case_details'
     
     id = db.Column(db.Integer, primary_key=True)
-    query_id = db.Column(db.Integer, db.ForeignKey('case_queries.id'), nullable=False)
+    query_id = db.Column(db.Integer, db.ForeignKey('case_queries.id'), nullable=False, index=True)
     case_number = db.Column(db.String(200), nullable=False)
     case_type = db.Column(db.String(50), nullable=False)
     filing_date = db.Column(db.String(50), nullable=True)
@@ -58,16 +176,34 @@ class CaseDetail(db.Model):
     respondent = db.Column(db.Text, nullable=True)
     current_status = db.Column(db.String(200), nullable=True)
     last_update = db.Column(db.String(50), nullable=True)
-    proceedings = db.Column(db.Text, nullable=True)  # JSON string
     
-    # Relationship
+    # Relationships
     documents = db.relationship('CaseDocument', backref='case_detail', cascade='all, delete-orphan')
+    proceedings = db.relationship('CaseProceeding', backref='case_detail', cascade='all, delete-orphan',
+                                  order_by='CaseProceeding.position', lazy='dynamic')
+
+class CaseProceeding(db.Model):
+    __tablename__ = 'case_proceedings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_detail_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # order within the case
+    date = db.Column(db.Date, nullable=True)  # parsed hearing date, for date queries
+    date_text = db.Column(db.String(50), nullable=True)  # date as shown by the court
+    title = db.Column(db.String(300), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    proceeding_type = db.Column(db.String(50), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_case_proceedings_date_case', 'date', 'case_detail_id'),
+        db.Index('ix_case_proceedings_case_position', 'case_detail_id', 'position'),
+    )
 
 class CaseDocument(db.Model):
     __tablename__ = 'case_documents'
     
     id = db.Column(db.Integer, primary_key=True)
-    case_detail_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False)
+    case_detail_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False, index=True)
     title = db.Column(db.String(300), nullable=False)
     document_type = db.Column(db.String(50), nullable=False)
     filed_date = db.Column(db.String(50), nullable=True)
@@ -75,26 +211,1049 @@ class CaseDocument(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     file_size = db.Column(db.Integer, nullable=True)
 
-# Import court scraper after models are defined
-from court_scraper import CourtScraper
+class ScrapeJob(db.Model):
+    __tablename__ = 'scrape_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    query_id = db.Column(db.Integer, db.ForeignKey('case_queries.id'), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON string
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    claimed_by = db.Column(db.String(100), nullable=True)  # JobQueue.worker_id of the process running it
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # renewed while it runs; requeued once it lapses
+    
+    # Relationship
+    case_query = db.relationship('CaseQuery')
+
+class CaseBatch(db.Model):
+    __tablename__ = 'case_batches'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, completed, cancelled
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# Modules that pull in requests, BeautifulSoup or Pillow are imported by the component builders
+from components import Components
+from job_queue import JobQueue, QueueFullError
+from result_cache import ResultCache, make_cache_key
+from singleflight import SingleFlight
+from batch_lookup import BatchRunner, prepare_cases
+from migrations import run_migrations
+from pdf_writer import render_text_pdf
+from case_search import find_case_details
+from events import EventBus
+from metrics import REGISTRY, COUNT_BUCKETS, CONTENT_TYPE
+
+def _create_captcha_store(app):
+    """Build the configured CAPTCHA session store"""
+    from captcha_store import MemoryCaptchaStore, DatabaseCaptchaStore
+    
+    if app.config['CAPTCHA_STORE'] == 'database':
+        if app.config['CAPTCHA_STORE_URL']:
+            from sqlalchemy import create_engine
+            url = app.config['CAPTCHA_STORE_URL']
+            engine = tune_engine(create_engine(url, **engine_options(url, app.config)), app.config)
+        else:
+            with app.app_context():
+                engine = db.engine
+        return DatabaseCaptchaStore(engine, max_sessions=app.config['CAPTCHA_MAX_SESSIONS'])
+    
+    return MemoryCaptchaStore(max_sessions=app.config['CAPTCHA_MAX_SESSIONS'])
+
+def _create_upstream_client(app):
+    """Build the pooled HTTP client used for court websites"""
+    from upstream_client import UpstreamClient
+    
+    host_pools = {}
+    for entry in app.config['UPSTREAM_HOST_POOLS'].split(','):
+        host, _, size = entry.strip().partition('=')
+        if host and size:
+            host_pools[host] = int(size)
+    
+    return UpstreamClient(
+        cache_dir=app.config['UPSTREAM_CACHE_DIR'],
+        cache_max_entries=app.config['UPSTREAM_CACHE_MAX_ENTRIES'],
+        cache_max_bytes=app.config['UPSTREAM_CACHE_MAX_BYTES'],
+        pool_connections=max(10, len(host_pools) + 1),
+        pool_maxsize=app.config['UPSTREAM_POOL_SIZE'],
+        host_pool_sizes=host_pools,
+        retries=app.config['UPSTREAM_RETRIES'],
+        timeout=(app.config['UPSTREAM_CONNECT_TIMEOUT'], app.config['UPSTREAM_READ_TIMEOUT'])
+    )
+
+def _create_court_scraper(app):
+    """Build the scraper with its CAPTCHA pool, document store and HTTP client"""
+    from court_scraper import CourtScraper
+    from captcha_images import CaptchaImagePool
+    from document_cache import DiskDocumentStore
+    
+    return CourtScraper(
+        captcha_store=_create_captcha_store(app),
+        captcha_images=CaptchaImagePool(
+            pool_size=app.config['CAPTCHA_POOL_SIZE'],
+            max_sessions=app.config['CAPTCHA_MAX_IMAGES']
+        ),
+        document_store=DiskDocumentStore(
+            app.config['DOCUMENT_STORE_DIR'],
+            max_bytes=app.config['DOCUMENT_STORE_MAX_BYTES']
+        ),
+        prefetch_workers=app.config['DOCUMENT_PREFETCH_WORKERS'],
+        upstream_client=_create_upstream_client(app),
+        case_status_url=app.config['COURT_CASE_STATUS_URL']
+    )
+
+def _new_query(search_params):
+    """Create a CaseQuery showing the case as entered, keyed the same way as the cache"""
+    query = CaseQuery()
+    query.court = search_params['court']
+    query.case_type = search_params['caseType']
+    query.case_number = search_params['caseNumber']
+    query.filing_year = search_params['filingYear']
+    query.court_key, query.case_type_key, query.case_number_key, query.filing_year_key = make_cache_key(search_params)
+    db.session.add(query)
+    return query
+
+def _find_latest_query(key, status=None):
+    """Latest stored query for a case key, resolved through ix_case_queries_case_key"""
+    court, case_type, case_number, filing_year = key
+    
+    query = CaseQuery.query.filter(
+        CaseQuery.court_key == court,
+        CaseQuery.case_type_key == case_type,
+        CaseQuery.case_number_key == case_number,
+        CaseQuery.filing_year_key == filing_year
+    )
+    if status:
+        query = query.filter(CaseQuery.status == status)
+    
+    return query.order_by(CaseQuery.id.desc()).first()
+
+def _query_params(query):
+    """Search parameters of a stored query"""
+    return {
+        'caseType': query.case_type,
+        'caseNumber': query.case_number,
+        'filingYear': query.filing_year,
+        'court': query.court
+    }
+
+REQUIRED_CASE_FIELDS = ('caseNumber', 'caseType', 'court')
+
+def _checked_result(result):
+    """A result as it may be stored: a success missing the fields a case is stored by is a failure"""
+    if not result.get('success'):
+        return result
+    case_detail = result.get('caseDetail') or {}
+    missing = [field for field in REQUIRED_CASE_FIELDS if not str(case_detail.get(field) or '').strip()]
+    if missing:
+        return {'success': False, 'error': f"Incomplete case details from court website (missing {', '.join(missing)})"}
+    return result
+
+def _stage_results(entries):
+    """Stage (query, result) pairs in the session: queries and details through the ORM,
+    all documents in a single executemany insert, and the final response snapshot
+    of every query. The caller commits."""
+    details = []
+    entries = [(query, _checked_result(result)) for query, result in entries]
+    
+    for query, result in entries:
+        query.completed_at = datetime.utcnow()
+        
+        if not result.get('success'):
+            query.status = 'failed'
+            query.error_message = result.get('error', 'Unknown error occurred')
+            continue
+        
+        query.status = 'success'
+        
+        source = _stored_source(result)
+        if source is not None:
+            # Served from the cache: point at the stored copy instead of writing another
+            query.source_query_id = source.id
+            continue
+        
+        case_detail = CaseDetail()
+        case_detail.query = query
+        case_detail.case_number = result['caseDetail']['caseNumber']
+        case_detail.case_type = result['caseDetail']['caseType']
+        case_detail.filing_date = result['caseDetail'].get('filingDate')
+        case_detail.court = result['caseDetail']['court']
+        case_detail.judge = result['caseDetail'].get('judge')
+        case_detail.petitioner = result['caseDetail'].get('petitioner')
+        case_detail.respondent = result['caseDetail'].get('respondent')
+        case_detail.current_status = result['caseDetail'].get('currentStatus')
+        case_detail.last_update = result['caseDetail'].get('lastUpdate')
+        db.session.add(case_detail)
+        details.append((case_detail, result.get('documents', []), result['caseDetail'].get('proceedings', [])))
+    
+    # Assign query and detail ids so documents and snapshots can reference them
+    db.session.flush()
+    
+    documents = [
+        {
+            'case_detail_id': case_detail.id,
+            'title': doc['title'],
+            'document_type': doc['documentType'],
+            'filed_date': doc.get('filedDate'),
+            'download_url': doc.get('downloadUrl'),
+            'is_available': doc.get('isAvailable', True),
+            'file_size': doc.get('fileSize')
+        }
+        for case_detail, docs, _ in details
+        for doc in docs
+    ]
+    document_ids = []
+    if documents:
+        document_ids = db.session.scalars(
+            insert(CaseDocument).returning(CaseDocument.id, sort_by_parameter_order=True),
+            documents
+        ).all()
+    
+    proceedings = [
+        _proceeding_row(case_detail.id, position, proceeding)
+        for case_detail, _, case_proceedings in details
+        for position, proceeding in enumerate(case_proceedings)
+    ]
+    if proceedings:
+        db.session.execute(insert(CaseProceeding), proceedings)
+    
+    serialized = {}
+    for document, document_id in zip(documents, document_ids):
+        serialized.setdefault(document['case_detail_id'], []).append({
+            'id': document_id,
+            'title': document['title'],
+            'documentType': document['document_type'],
+            'filedDate': document['filed_date'],
+            'downloadUrl': document['download_url'],
+            'isAvailable': document['is_available'],
+            'fileSize': document['file_size']
+        })
+    
+    for query, result in entries:
+        if query.status == 'success' and not query.source_query_id:
+            _materialize_snapshot(
+                query,
+                serialized.get(query.case_detail.id, []),
+                result['caseDetail'].get('proceedings', [])
+            )
+        else:
+            _materialize_snapshot(query)
+
+PROCEEDING_DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d.%m.%Y']
+
+def _parse_proceeding_date(text):
+    """Parse a court date string, or None if it is not a recognised date"""
+    text = (text or '').strip()
+    for date_format in PROCEEDING_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+def _proceeding_row(case_detail_id, position, proceeding):
+    """Column values for one proceeding of a scraper result"""
+    return {
+        'case_detail_id': case_detail_id,
+        'position': position,
+        'date': _parse_proceeding_date(proceeding.get('date')),
+        'date_text': proceeding.get('date'),
+        'title': proceeding.get('title'),
+        'description': proceeding.get('description'),
+        'proceeding_type': proceeding.get('type')
+    }
+
+def _serialize_proceeding(proceeding):
+    """Serialize a stored proceeding in the scraper's shape"""
+    return {
+        'date': proceeding.date_text,
+        'title': proceeding.title,
+        'description': proceeding.description,
+        'type': proceeding.proceeding_type
+    }
+
+def _store_result(query, result, update_cache=True):
+    """Record a scraper result against its query in one transaction"""
+    result = _checked_result(result)
+    _stage_results([(query, result)])
+    db.session.commit()
+    
+    # The query is final once committed; a cache or prefetch error must not mark it failed
+    try:
+        if update_cache:
+            result_cache.put(_query_params(query), _cache_entry(query, result))
+        _prefetch_documents([result])
+    except Exception as e:
+        print(f"Post-commit work for query {query.id} failed: {e}")
+
+def _stored_source(result):
+    """The query holding the stored copy of a cached result, while it is still in the database"""
+    query_id = result.get('queryId')
+    source = db.session.get(CaseQuery, query_id) if query_id else None
+    if source is None or source.status != 'success' or source.case_detail is None:
+        return None
+    return source
+
+def _case_detail_of(query):
+    """Stored case detail of a query; queries answered from the cache share their source's"""
+    if query.source_query_id:
+        source = db.session.get(CaseQuery, query.source_query_id)
+        return source.case_detail if source else None
+    return query.case_detail
+
+def _cache_entry(query, result):
+    """A result as the cache keeps it: with the query that stores it, and without what only
+    concerned the lookup that produced it (the CAPTCHA it was verified with)"""
+    entry = dict(result, queryId=query.source_query_id or query.id)
+    if result.get('caseDetail'):
+        entry['caseDetail'] = {k: v for k, v in result['caseDetail'].items() if k != 'verificationMethod'}
+    return entry
+
+def _prefetch_documents(results):
+    """Warm the document cache for successful lookups so the first download is a hit"""
+    court_scraper.prefetch_documents([
+        doc.get('downloadUrl')
+        for result in results if result.get('success')
+        for doc in result.get('documents', []) if doc.get('isAvailable', True)
+    ])
+
+def _record_lookup(search_params, result, update_cache=True):
+    """Create a query for a lookup that completed without the job queue"""
+    query = _new_query(search_params)
+    
+    try:
+        _store_result(query, result, update_cache)
+    except Exception as e:
+        db.session.rollback()
+        query.case_detail = None  # staged before the error; rolled back with it
+        db.session.add(query)
+        _stage_results([(query, {'success': False, 'error': str(e)})])
+        db.session.commit()
+    
+    return query
+
+def _result_from_detail(case_detail):
+    """Rebuild a scraper-shaped result from a stored CaseDetail"""
+    return {
+        'success': True,
+        'caseDetail': {
+            'caseNumber': case_detail.case_number,
+            'caseType': case_detail.case_type,
+            'filingDate': case_detail.filing_date,
+            'court': case_detail.court,
+            'judge': case_detail.judge,
+            'petitioner': case_detail.petitioner,
+            'respondent': case_detail.respondent,
+            'currentStatus': case_detail.current_status,
+            'lastUpdate': case_detail.last_update,
+            'proceedings': [_serialize_proceeding(p) for p in case_detail.proceedings]
+        },
+        'documents': [
+            {
+                'title': doc.title,
+                'documentType': doc.document_type,
+                'filedDate': doc.filed_date,
+                'downloadUrl': doc.download_url,
+                'isAvailable': doc.is_available,
+                'fileSize': doc.file_size
+            }
+            for doc in case_detail.documents
+        ]
+    }
+
+def _query_response(query, documents=None, proceedings=None, proceedings_offset=0, proceedings_limit=None):
+    """Serialize a query with its case detail, documents and one page of proceedings
+    (pass documents and the full proceedings list if already serialized)"""
+    response = {
+        'id': query.id,
+        'status': query.status,
+        'caseType': query.case_type,
+        'caseNumber': query.case_number,
+        'filingYear': query.filing_year,
+        'court': query.court,
+        'createdAt': query.created_at.isoformat(),
+        'completedAt': query.completed_at.isoformat() if query.completed_at else None,
+        'updatedAt': query.updated_at.isoformat() if query.updated_at else None
+    }
+    
+    if query.status == 'failed':
+        response['error'] = query.error_message
+    elif query.status == 'success' and _case_detail_of(query):
+        case_detail = _case_detail_of(query)
+        response['caseDetail'] = {
+            'id': case_detail.id,
+            'caseNumber': case_detail.case_number,
+            'caseType': case_detail.case_type,
+            'filingDate': case_detail.filing_date,
+            'court': case_detail.court,
+            'judge': case_detail.judge,
+            'petitioner': case_detail.petitioner,
+            'respondent': case_detail.respondent,
+            'currentStatus': case_detail.current_status,
+            'lastUpdate': case_detail.last_update
+        }
+        response['caseDetail'].update(
+            _proceedings_page(case_detail, proceedings, proceedings_offset, proceedings_limit)
+        )
+        
+        # Include documents
+        if documents is not None:
+            response['documents'] = documents
+            return response
+        
+        response['documents'] = []
+        for doc in case_detail.documents:
+            response['documents'].append({
+                'id': doc.id,
+                'title': doc.title,
+                'documentType': doc.document_type,
+                'filedDate': doc.filed_date,
+                'downloadUrl': doc.download_url,
+                'isAvailable': doc.is_available,
+                'fileSize': doc.file_size
+            })
+    
+    return response
+
+def _proceedings_page(case_detail, proceedings=None, offset=0, limit=None):
+    """One page of a case's proceedings with paging fields, read through the
+    (case_detail_id, position) index unless the full list is passed in"""
+    limit = limit or current_app.config['PROCEEDINGS_PAGE_SIZE']
+    
+    if proceedings is not None:
+        total = len(proceedings)
+        page = proceedings[offset:offset + limit]
+    else:
+        total = case_detail.proceedings.count()
+        page = [
+            _serialize_proceeding(p)
+            for p in case_detail.proceedings.filter(CaseProceeding.position >= offset).limit(limit)
+        ]
+    
+    return {
+        'proceedings': page,
+        'proceedingsTotal': total,
+        'proceedingsOffset': offset,
+        'proceedingsNextOffset': offset + limit if offset + limit < total else None
+    }
+
+def _archived_response(record):
+    """Query response for a query moved to the archive by retention"""
+    stored = record['query']
+    if stored.get('snapshot'):
+        response = json.loads(stored['snapshot'])
+    else:
+        response = {
+            'id': stored['id'],
+            'status': stored['status'],
+            'caseType': stored['case_type'],
+            'caseNumber': stored['case_number'],
+            'filingYear': stored['filing_year'],
+            'court': stored['court'],
+            'createdAt': stored['created_at'],
+            'completedAt': stored['completed_at'],
+            'error': stored.get('error_message')
+        }
+    response['archived'] = True
+    response['archivedAt'] = record['archivedAt']
+    return response
+
+def _materialize_snapshot(query, documents=None, proceedings=None):
+    """Store the final response JSON of a terminal query so polls never rebuild it"""
+    query.snapshot = json.dumps(_query_response(query, documents, proceedings))
+    query.snapshot_etag = hashlib.sha1(query.snapshot.encode('utf-8')).hexdigest()
+
+HISTORY_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None
+}
+
+def _history_window_start(filter_type):
+    """Earliest created_at included by a history filter, or None for no limit"""
+    if filter_type not in HISTORY_WINDOWS:
+        raise ValueError(f'Unknown filter: {filter_type}')
+    window = HISTORY_WINDOWS[filter_type]
+    return datetime.utcnow() - window if window else None
+
+def _encode_cursor(timestamp, row_id):
+    """Opaque keyset cursor for a (timestamp, id) position"""
+    raw = json.dumps([timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor"""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def _history_item(query):
+    """Serialize a query for the history table"""
+    return {
+        'id': query.id,
+        'caseType': query.case_type,
+        'caseNumber': query.case_number,
+        'filingYear': query.filing_year,
+        'court': query.court,
+        'status': query.status,
+        'createdAt': query.created_at.isoformat(),
+        'completedAt': query.completed_at.isoformat() if query.completed_at else None,
+        'updatedAt': query.updated_at.isoformat() if query.updated_at else None
+    }
+
+def _load_stored_result(key, max_age):
+    """Persistent cache tier: latest successful stored result for a case key, with the
+    time it was fetched from the court"""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    
+    query = _find_latest_query(key, status='success')
+    if query and query.source_query_id:
+        # A cache hit is as old as the lookup that fetched its result
+        query = db.session.get(CaseQuery, query.source_query_id)
+    if not query or not query.completed_at or query.completed_at < cutoff or query.case_detail is None:
+        return None
+    
+    stored_at = query.completed_at.replace(tzinfo=timezone.utc).timestamp()
+    return dict(_result_from_detail(query.case_detail), queryId=query.id), stored_at
+
+def _lease_expiry():
+    return datetime.utcnow() + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+
+def _finish_job(job_id, status):
+    """Close a job this process still holds; False if its lease lapsed and it was requeued"""
+    return ScrapeJob.query.filter_by(id=job_id, status='running', claimed_by=job_queue.worker_id).update({
+        'status': status,
+        'finished_at': datetime.utcnow(),
+        'lease_expires_at': None
+    }, synchronize_session=False) == 1
+
+def _run_scrape_job(job_id):
+    """Worker entry point: fetch case details for a queued job and store them"""
+    job = db.session.get(ScrapeJob, job_id)
+    if job is None:
+        return
+    query = db.session.get(CaseQuery, job.query_id)
+    payload = json.loads(job.payload)
+    key = make_cache_key(payload['searchParams'])
+    
+    try:
+        # Claim the job atomically; the lease keeps other processes from requeueing it while it runs
+        claimed = ScrapeJob.query.filter_by(id=job_id, status='queued').update({
+            'status': 'running',
+            'started_at': datetime.utcnow(),
+            'attempts': ScrapeJob.attempts + 1,
+            'claimed_by': job_queue.worker_id,
+            'lease_expires_at': _lease_expiry()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            # Another worker has it; the key this process holds for it must not outlive this call
+            return
+        
+        result, _ = lookup_flights.do(
+            key,
+            lambda: court_scraper.fetch_case(payload['searchParams'], payload.get('captchaSolution', ''))
+        )
+        # The job is closed in the same transaction as the result, and only by its current holder
+        if not _finish_job(job_id, 'done'):
+            db.session.rollback()
+            print(f"Job {job_id} was requeued while running; discarding this result")
+            return
+        _store_result(query, result)
+    except Exception as e:
+        db.session.rollback()
+        if not _finish_job(job_id, 'failed'):
+            db.session.rollback()
+            return
+        # Staged like any other result, so the failure has its snapshot too
+        _stage_results([(query, {'success': False, 'error': str(e)})])
+        db.session.commit()
+    finally:
+        # Later lookups for this case now hit the cache instead of joining
+        lookup_flights.release(key)
+
+def _start_lookup(search_params, captcha_solution):
+    """Record a pending query plus its job and hand it to the worker pool"""
+    query = _new_query(search_params)
+    query.status = 'pending'
+    
+    job = ScrapeJob()
+    job.case_query = query
+    job.payload = json.dumps({
+        'searchParams': {
+            'caseType': search_params['caseType'],
+            'caseNumber': search_params['caseNumber'],
+            'filingYear': search_params['filingYear'],
+            'court': search_params['court']
+        },
+        'captchaSolution': captcha_solution
+    })
+    db.session.add(job)
+    db.session.commit()
+    
+    try:
+        job_queue.submit(job.id)
+    except Exception as e:
+        # Close both rows so neither a queued job nor a pending query outlives the rejection
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+        _stage_results([(query, {'success': False, 'error': f'Lookup was not queued: {e}'})])
+        db.session.commit()
+        raise
+    return query.id
+
+def _find_inflight_query(key):
+    """Find a pending query for the same case that another worker process is running"""
+    court, case_type, case_number, filing_year = key
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['SINGLEFLIGHT_MAX_AGE'])
+    
+    query = CaseQuery.query.join(ScrapeJob, ScrapeJob.query_id == CaseQuery.id).filter(
+        CaseQuery.status == 'pending',
+        ScrapeJob.status.in_(('queued', 'running')),
+        ScrapeJob.enqueued_at >= cutoff,
+        CaseQuery.court_key == court,
+        CaseQuery.case_type_key == case_type,
+        CaseQuery.case_number_key == case_number,
+        CaseQuery.filing_year_key == filing_year
+    ).order_by(CaseQuery.id.desc()).first()
+    
+    return query.id if query else None
+
+def _enqueue_lookup(search_params, captcha_solution=''):
+    """Queue a lookup, attaching to an identical one already in flight; returns (query, joined)"""
+    key = make_cache_key(search_params)
+    
+    if current_app.config['SINGLEFLIGHT_DATABASE']:
+        query_id = _find_inflight_query(key)
+        if query_id is not None:
+            return db.session.get(CaseQuery, query_id), True
+    
+    query_id, joined = lookup_flights.join_or_start(key, lambda: _start_lookup(search_params, captcha_solution))
+    return db.session.get(CaseQuery, query_id), joined
+
+def _fetch_for_batch(app, search_params, captcha_solution):
+    """Batch worker: serve a lookup from the cache or fetch it once upstream"""
+    with app.app_context():
+        cached = result_cache.get(search_params)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        scraper = court_scraper._get_current_object()
+    
+    # The batch's CAPTCHA was verified before any case was fetched
+    result, _ = lookup_flights.do(
+        make_cache_key(search_params),
+        lambda: scraper.fetch_case(search_params, captcha_solution)
+    )
+    return _checked_result(result)
+
+def _persist_batch_results(batch_id, entries, finished=False):
+    """Write a chunk of batch results and the batch progress in one transaction"""
+    batch = db.session.get(CaseBatch, batch_id)
+    queries = []
+    
+    for search_params, result in entries:
+        query = _new_query(search_params)
+        queries.append((query, result))
+        
+        batch.completed += 1
+        if result.get('success'):
+            batch.succeeded += 1
+        else:
+            batch.failed += 1
+    
+    if finished:
+        batch.status = 'completed' if batch.completed >= batch.total else 'cancelled'
+        batch.finished_at = datetime.utcnow()
+    
+    _stage_results(queries)
+    db.session.commit()
+    
+    for (search_params, result), (query, _) in zip(entries, queries):
+        if not result.get('cached'):
+            result_cache.put(search_params, _cache_entry(query, result))
+    _prefetch_documents([result for _, result in entries])
+    
+    return batch
+
+def _batch_progress(batch):
+    """Serialize batch progress"""
+    return {
+        'batchId': batch.id,
+        'status': batch.status,
+        'total': batch.total,
+        'completed': batch.completed,
+        'succeeded': batch.succeeded,
+        'failed': batch.failed,
+        'createdAt': batch.created_at.isoformat(),
+        'finishedAt': batch.finished_at.isoformat() if batch.finished_at else None
+    }
+
+def _recover_scrape_jobs(queue, queued_before=None):
+    """Requeue running jobs whose lease lapsed (their process died) and hand stored queued
+    jobs to this process; jobs other workers are running keep their lease and are left alone.
+    With queued_before, only jobs queued before then are picked up (a live sibling would
+    have claimed them by now)."""
+    now = datetime.utcnow()
+    requeued = ScrapeJob.query.filter(
+        ScrapeJob.status == 'running',
+        or_(ScrapeJob.lease_expires_at.is_(None), ScrapeJob.lease_expires_at < now)
+    ).update({'status': 'queued', 'claimed_by': None, 'lease_expires_at': None}, synchronize_session=False)
+    db.session.commit()
+    
+    jobs = ScrapeJob.query.filter_by(status='queued')
+    if queued_before is not None:
+        jobs = jobs.filter(ScrapeJob.enqueued_at < queued_before)
+    jobs = jobs.order_by(ScrapeJob.id).all()
+    
+    submitted = 0
+    for job in jobs:
+        try:
+            # A sibling may hold the same job in its queue; whichever claims it first runs it
+            submitted += queue.submit(job.id, job.enqueued_at.timestamp() if job.enqueued_at else None)
+        except QueueFullError:
+            print(f"Job queue full, {len(jobs)} stored jobs not all recovered")
+            break
+    
+    if requeued or submitted:
+        print(f"Recovered {submitted} queued scrape jobs ({requeued} with a lapsed lease)")
+
+def _maintain_scrape_jobs(queue):
+    """Heartbeat: renew the leases of jobs running here, then recover abandoned ones"""
+    running = queue.running_jobs()
+    if running:
+        ScrapeJob.query.filter(
+            ScrapeJob.id.in_(running),
+            ScrapeJob.status == 'running',
+            ScrapeJob.claimed_by == queue.worker_id
+        ).update({'lease_expires_at': _lease_expiry()}, synchronize_session=False)
+        db.session.commit()
+    
+    _recover_scrape_jobs(
+        queue, queued_before=datetime.utcnow() - timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    )
+
+def _create_result_cache(app):
+    from result_cache import ResultCache
+    
+    return ResultCache(
+        max_entries=app.config['RESULT_CACHE_SIZE'],
+        ttl=app.config['RESULT_CACHE_TTL'],
+        negative_ttl=app.config['RESULT_CACHE_NEGATIVE_TTL'],
+        loader=_load_stored_result
+    )
+
+def _create_document_cache(app):
+    from document_cache import DocumentCache
+    
+    return DocumentCache(
+        directory=app.config['DOCUMENT_CACHE_DIR'],
+        max_entries=app.config['DOCUMENT_CACHE_SIZE'],
+        max_disk_bytes=app.config['DOCUMENT_CACHE_MAX_DISK_BYTES']
+    )
+
+def _create_batch_runner(app):
+    return BatchRunner(
+        lambda search_params, captcha_solution: _fetch_for_batch(app, search_params, captcha_solution),
+        max_workers=app.config['BATCH_WORKERS'],
+        court_concurrency=app.config['BATCH_COURT_CONCURRENCY']
+    )
+
+def _create_job_queue(app):
+    """Start the worker pool and hand it the jobs stored by a previous run"""
+    queue = JobQueue(
+        app,
+        _run_scrape_job,
+        max_workers=app.config['JOB_WORKERS'],
+        max_pending=app.config['JOB_QUEUE_MAX']
+    )
+    with app.app_context():
+        _recover_scrape_jobs(queue)
+    if app.config['JOB_HEARTBEAT_INTERVAL']:
+        queue.start_maintenance(_maintain_scrape_jobs, app.config['JOB_HEARTBEAT_INTERVAL'])
+    return queue
+
+def _create_event_bus(app):
+    """Each open stream holds a request thread, so streams are capped below the thread count;
+    past the cap /api/events answers 503 and pages poll instead"""
+    available = max(0, app.config['WEB_THREADS'] - app.config['EVENTS_RESERVED_THREADS'])
+    configured = app.config['EVENTS_MAX_CONNECTIONS']
+    return EventBus(max_subscribers=min(configured, available) if configured else available)
+
+def _create_retention(app):
+    from retention import QueryArchive, Retention
+    
+    with app.app_context():
+        engine = db.engine
+    return Retention(
+        engine,
+        QueryArchive(app.config['ARCHIVE_DIR']),
+        days=app.config['RETENTION_DAYS'],
+        batch_size=app.config['RETENTION_BATCH_SIZE'],
+        pause=app.config['RETENTION_PAUSE'],
+        vacuum_pages=app.config['RETENTION_VACUUM_PAGES']
+    )
+
+def _create_static_assets(app):
+    from static_assets import StaticAssets
+    
+    return StaticAssets(
+        app.static_folder,
+        app.config['STATIC_BUILD_DIR'],
+        exclude=tuple(path for path in app.config['STATIC_FINGERPRINT_EXCLUDE'] if path)
+    ).load_or_build()
+
+def _create_page_cache(app):
+    from static_assets import PageCache
+    
+    version = app.extensions['case_lookup'].get('static_assets').version if _fingerprinting(app) else ''
+    return PageCache(max_entries=app.config['PAGE_CACHE_SIZE'], version=version)
+
+def _start_event_sync(app):
+    thread = threading.Thread(target=_sync_events, args=(app,), name='event-sync', daemon=True)
+    thread.start()
+    return thread
+
+COMPONENT_BUILDERS = {
+    'court_scraper': _create_court_scraper,
+    'result_cache': _create_result_cache,
+    'document_cache': _create_document_cache,
+    'batch_runner': _create_batch_runner,
+    'job_queue': _create_job_queue,
+    'event_bus': _create_event_bus,
+    'retention': _create_retention,
+    'static_assets': _create_static_assets,
+    'page_cache': _create_page_cache,
+    'event_sync': _start_event_sync
+}
+
+def _components():
+    return current_app.extensions['case_lookup']
+
+def _component(name):
+    return _components().get(name)
+
+# Built on first use by the current app (see components.py)
+court_scraper = LocalProxy(lambda: _component('court_scraper'))
+result_cache = LocalProxy(lambda: _component('result_cache'))
+document_cache = LocalProxy(lambda: _component('document_cache'))
+batch_runner = LocalProxy(lambda: _component('batch_runner'))
+job_queue = LocalProxy(lambda: _component('job_queue'))
+event_bus = LocalProxy(lambda: _component('event_bus'))
+lookup_flights = SingleFlight()
+
+# Metrics (rendered at /metrics; see metrics.py)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint, method and status code',
+    ['endpoint', 'method', 'status']
+)
+REQUEST_SQL_STATEMENTS = REGISTRY.histogram(
+    'http_request_sql_statements', 'SQL statements executed per request', ['endpoint'], buckets=COUNT_BUCKETS
+)
+REQUEST_SQL_SECONDS = REGISTRY.histogram('http_request_sql_seconds', 'Time spent in SQL per request', ['endpoint'])
+SQL_STATEMENTS = REGISTRY.counter('sql_statements_total', 'SQL statements executed, in requests or background work', ['context'])
+SQL_SECONDS = REGISTRY.counter('sql_seconds_total', 'Time spent in SQL, in requests or background work', ['context'])
+SQL_COMMITS = REGISTRY.counter('sql_commits_total', 'Database transactions committed')
+RATE_LIMIT_REJECTIONS = REGISTRY.counter('rate_limit_rejections_total', 'Requests refused by the rate limiter', ['endpoint'])
+
+def _start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+def _record_request_metrics(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+        REQUEST_SQL_STATEMENTS.observe(g.sql_statements, endpoint)
+        REQUEST_SQL_SECONDS.observe(g.sql_seconds, endpoint)
+    return response
 
-# Initialize scraper
-court_scraper = CourtScraper()
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.metrics_started
+    if has_request_context() and 'metrics_started' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+        SQL_STATEMENTS.inc('request')
+        SQL_SECONDS.inc('request', amount=elapsed)
+    else:
+        SQL_STATEMENTS.inc('background')
+        SQL_SECONDS.inc('background', amount=elapsed)
+
+def _sql_committed(conn):
+    SQL_COMMITS.inc()
+
+def _component_gauge(name, read):
+    """Gauge callback reading a component of the current app, if it has been built"""
+    def collect():
+        component = _components().peek(name) if has_request_context() else None
+        return read(component) if component is not None else {}
+    return collect
+
+REGISTRY.gauge('captcha_sessions', 'Active CAPTCHA sessions in the session store',
+               callback=_component_gauge('court_scraper', lambda scraper: {(): scraper.captcha_store.stats()['size']}))
+REGISTRY.gauge('job_queue_jobs', 'Lookup jobs in the background queue by state', ['state'],
+               callback=_component_gauge('job_queue', lambda queue: {
+                   (state,): queue.stats()[state] for state in ('pending', 'running')
+               }))
+REGISTRY.gauge('event_subscribers', 'Open server-sent event streams',
+               callback=_component_gauge('event_bus', lambda bus: {(): bus.subscriber_count()}))
+
+def _install_metrics(app):
+    """Time every request and count the SQL it runs (before the limiter, so rejections are timed too)"""
+    app.before_request(_start_request_metrics)
+    app.after_request(_record_request_metrics)
+    if not event.contains(Engine, 'after_cursor_execute', _sql_finished):
+        event.listen(Engine, 'before_cursor_execute', _sql_started)
+        event.listen(Engine, 'after_cursor_execute', _sql_finished)
+        event.listen(Engine, 'commit', _sql_committed)
+
+# Push query changes to SSE subscribers once the transaction that made them commits
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_queries(session, flush_context):
+    changed = session.info.setdefault('changed_queries', set())
+    changed.update(obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, CaseQuery))
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _serialize_changed_queries(session, flush_context):
+    # Serialized here, while the transaction is open, since after_commit cannot load attributes
+    pending = session.info.setdefault('query_events', {})
+    for query in session.info.pop('changed_queries', ()):
+        pending[query.id] = _history_item(query)
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changed_queries(session):
+    for item in session.info.pop('query_events', {}).values():
+        _publish_query_event(item)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changed_queries(session):
+    session.info.pop('changed_queries', None)
+    session.info.pop('query_events', None)
+
+def _publish_query_event(item):
+    """Publish a history row to history subscribers and to watchers of that query"""
+    bus = _components().peek('event_bus')
+    if bus is None:  # no stream has been opened, so nobody is listening
+        return
+    version = f"{item['updatedAt']}:{item['status']}"
+    bus.publish('query', item, query_id=item['id'], version=version)
+    bus.publish('history', item, query_id=item['id'], version=version)
+
+def _latest_change():
+    """(updated_at, id) of the most recently changed query, or None"""
+    latest = db.session.query(CaseQuery.updated_at, CaseQuery.id).order_by(
+        CaseQuery.updated_at.desc(), CaseQuery.id.desc()
+    ).first()
+    return (latest.updated_at, latest.id) if latest and latest.updated_at else None
+
+def _sync_step(cursor):
+    """One sync tick: publish queries changed after the cursor and return the new cursor"""
+    if not event_bus.subscriber_count():
+        # Nobody to tell; move to the head so the first subscriber is not sent the whole backlog
+        return _latest_change() or cursor
+    
+    rows = CaseQuery.query.filter(
+        tuple_(CaseQuery.updated_at, CaseQuery.id) > tuple_(*cursor)
+    ).order_by(CaseQuery.updated_at.asc(), CaseQuery.id.asc()).limit(500).all()
+    for query in rows:
+        # Changes made in this process were already published and are skipped by version
+        _publish_query_event(_history_item(query))
+    return (rows[-1].updated_at, rows[-1].id) if rows else cursor
+
+def _sync_events(app):
+    """Publish queries changed by other worker processes, which the session hooks never see"""
+    with app.app_context():
+        cursor = _latest_change() or (datetime.min, 0)
+        db.session.remove()
+    
+    while True:
+        time.sleep(app.config['EVENTS_SYNC_INTERVAL'])
+        try:
+            with app.app_context():
+                cursor = _sync_step(cursor)
+                db.session.remove()
+        except Exception as e:
+            print(f"Event sync error: {e}")
+
+def _ensure_event_sync():
+    """Start the cross-process sync thread with the first subscriber"""
+    if current_app.config['EVENTS_SYNC_INTERVAL']:
+        _component('event_sync')
+
+def read_only(view):
+    """Run a view's queries on the read bind (DATABASE_READ_URL) when one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        db.session.info['read_only'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside a read-only view, e.g. for rows a replica may not have yet"""
+    previous = db.session.info.pop('read_only', None)
+    try:
+        yield
+    finally:
+        if previous:
+            db.session.info['read_only'] = previous
+
+def _fingerprinting(app) -> bool:
+    # In debug mode assets are edited in place, so they keep their plain names
+    return app.config['STATIC_FINGERPRINT'] and not app.debug
+
+def _static_url_defaults(endpoint, values):
+    """Point url_for('static', ...) at the content-hashed copy of the file"""
+    if endpoint == 'static' and _fingerprinting(current_app):
+        _component('static_assets').url_defaults(endpoint, values)
+
+def _send_static(filename):
+    """Serve a static file, precompressed and cached for good when it is fingerprinted"""
+    if not _fingerprinting(current_app):
+        return current_app.send_static_file(filename)
+    return _component('static_assets').send(filename)
+
+def _install_static_assets(app):
+    app.url_defaults(_static_url_defaults)
+    app.view_functions['static'] = _send_static
+
+def _render_page(template, **context):
+    """Render a page once and answer repeat loads with 304 Not Modified"""
+    if not current_app.config['PAGE_CACHE_SIZE'] or current_app.debug:
+        return render_template(template, **context)
+    return _component('page_cache').render(template, **context)
 
 # Routes
-@app.route('/')
+@main.route('/')
 def index():
     """Serve the main page"""
-    return render_template('index.html')
+    return _render_page('index.html')
 
 
 
-@app.route('/case/<int:query_id>')
+@main.route('/case/<int:query_id>')
 def case_details_page(query_id):
     """Serve case details page"""
-    return render_template('case_details.html', query_id=query_id)
+    # The page reads the query ID from its URL, so every case shares one cached render
+    return _render_page('case_details.html')
 
-@app.route('/api/cases/search', methods=['POST'])
+@main.route('/api/cases/search', methods=['POST'])
 @limiter.limit("10 per minute")
 def search_case():
     """Search for case details"""
@@ -107,78 +1266,33 @@ def search_case():
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Create query record
-        query = CaseQuery()
-        query.case_type = data['caseType']
-        query.case_number = data['caseNumber']
-        query.filing_year = data['filingYear']
-        query.court = data['court']
-        query.status = 'pending'
-        db.session.add(query)
-        db.session.commit()
-        
-        # Check court scraper result
-        result = court_scraper.search_case({
+        search_params = {
             'caseType': data['caseType'],
             'caseNumber': data['caseNumber'],
             'filingYear': data['filingYear'],
             'court': data['court']
-        })
+        }
+        
+        # Serve repeat lookups from the cache without a CAPTCHA round trip
+        cached = result_cache.get(search_params)
+        if cached is not None:
+            query = _record_lookup(search_params, cached, update_cache=False)
+            return jsonify({
+                'queryId': query.id,
+                'status': query.status,
+                'cached': True,
+                'message': 'Search completed from cache'
+            })
         
-        # If CAPTCHA is required, delete the query and return CAPTCHA requirement
+        # Check court scraper result
+        result = court_scraper.search_case(search_params)
+        
+        # If CAPTCHA is required, return the CAPTCHA requirement without recording a query
         if result.get('requiresCaptcha'):
-            db.session.delete(query)
-            db.session.commit()
             return jsonify(result)
         
-        # Process normal search results
-        try:
-            if result['success']:
-                # Update query status
-                query.status = 'success'
-                query.completed_at = datetime.utcnow()
-                db.session.commit()
-                
-                # Create case detail
-                case_detail = CaseDetail()
-                case_detail.query_id = query.id
-                case_detail.case_number = result['caseDetail']['caseNumber']
-                case_detail.case_type = result['caseDetail']['caseType']
-                case_detail.filing_date = result['caseDetail'].get('filingDate')
-                case_detail.court = result['caseDetail']['court']
-                case_detail.judge = result['caseDetail'].get('judge')
-                case_detail.petitioner = result['caseDetail'].get('petitioner')
-                case_detail.respondent = result['caseDetail'].get('respondent')
-                case_detail.current_status = result['caseDetail'].get('currentStatus')
-                case_detail.last_update = result['caseDetail'].get('lastUpdate')
-                case_detail.proceedings = json.dumps(result['caseDetail'].get('proceedings', []))
-                db.session.add(case_detail)
-                db.session.commit()
-                
-                # Create documents
-                for doc in result.get('documents', []):
-                    document = CaseDocument()
-                    document.case_detail_id = case_detail.id
-                    document.title = doc['title']
-                    document.document_type = doc['documentType']
-                    document.filed_date = doc.get('filedDate')
-                    document.download_url = doc.get('downloadUrl')
-                    document.is_available = doc.get('isAvailable', False)
-                    document.file_size = doc.get('fileSize')
-                    db.session.add(document)
-                db.session.commit()
-                
-            else:
-                query.status = 'failed'
-                query.error_message = result.get('error', 'Unknown error occurred')
-                query.completed_at = datetime.utcnow()
-                db.session.commit()
-                
-        except Exception as e:
-            query.status = 'failed'
-            query.error_message = str(e)
-            query.completed_at = datetime.utcnow()
-            db.session.commit()
+        # Record the outcome of a search that needed no CAPTCHA
+        query = _record_lookup(search_params, result)
         
         return jsonify({
             'queryId': query.id,
@@ -189,226 +1303,647 @@ def search_case():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cases/query/<int:query_id>')
+@main.route('/api/cases/batch', methods=['POST'])
+@limiter.limit("2 per minute")
+def batch_search():
+    """Look up many cases at once, streaming each result as NDJSON"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Missing required field: cases'}), 400
+        
+        for field in ['cases', 'captchaSolution', 'formData']:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        cases = data['cases']
+        if not isinstance(cases, list):
+            return jsonify({'error': 'Missing required field: cases'}), 400
+        
+        if len(cases) > current_app.config['BATCH_MAX_CASES']:
+            return jsonify({'error': f"A batch can contain at most {current_app.config['BATCH_MAX_CASES']} cases"}), 400
+        
+        # One solved CAPTCHA covers the whole batch, as it covers a single lookup
+        captcha_solution = data['captchaSolution'].strip()
+        rejection = court_scraper.verify_captcha(captcha_solution, data['formData'])
+        if rejection:
+            return jsonify(rejection), 400
+        
+        unique, invalid, duplicates = prepare_cases(cases, make_cache_key)
+        
+        batch = CaseBatch()
+        batch.id = uuid.uuid4().hex
+        batch.total = len(unique)
+        batch.status = 'running' if unique else 'completed'
+        db.session.add(batch)
+        db.session.commit()
+        batch_id = batch.id
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        yield json.dumps({
+            'type': 'batch',
+            'batchId': batch_id,
+            'total': len(unique),
+            'duplicates': duplicates,
+            'invalid': len(invalid)
+        }) + '\n'
+        
+        for index, error in invalid:
+            yield json.dumps({'type': 'result', 'index': index, 'success': False, 'error': error}) + '\n'
+        
+        pending = []
+        try:
+            for index, search_params, result in batch_runner.run(unique, captcha_solution):
+                pending.append((search_params, result))
+                
+                line = {'type': 'result', 'index': index, 'success': bool(result.get('success'))}
+                line.update(search_params)
+                line['cached'] = bool(result.get('cached'))
+                if result.get('success'):
+                    # Like single lookups, results do not echo the CAPTCHA they were verified with
+                    line['caseDetail'] = {k: v for k, v in result['caseDetail'].items() if k != 'verificationMethod'}
+                    line['documents'] = result.get('documents', [])
+                else:
+                    line['error'] = result.get('error', 'Unknown error occurred')
+                yield json.dumps(line) + '\n'
+                
+                if len(pending) >= current_app.config['BATCH_FLUSH_SIZE']:
+                    _persist_batch_results(batch_id, pending)
+                    pending = []
+        finally:
+            batch = _persist_batch_results(batch_id, pending, finished=True)
+        
+        summary = _batch_progress(batch)
+        summary['type'] = 'summary'
+        yield json.dumps(summary) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main.route('/api/cases/batch/<batch_id>')
+def get_batch_status(batch_id):
+    """Get progress of a batch lookup"""
+    try:
+        batch = CaseBatch.query.get_or_404(batch_id)
+        return jsonify(_batch_progress(batch))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/cases/query/<int:query_id>')
+@read_only
 def get_query_status(query_id):
-    """Get query status and results"""
+    """Get query status and results
+    
+    Proceedings are paged: the response carries the first page, and
+    `proceedingsOffset`/`proceedingsLimit` select later ones.
+    """
     try:
-        query = CaseQuery.query.get_or_404(query_id)
+        offset = request.args.get('proceedingsOffset', 0, type=int)
+        limit = request.args.get('proceedingsLimit', type=int)
+        if offset < 0 or (limit is not None and not 0 < limit <= current_app.config['PROCEEDINGS_MAX_PAGE_SIZE']):
+            return jsonify({'error': 'Invalid proceedings page'}), 400
         
-        response = {
-            'id': query.id,
-            'status': query.status,
-            'caseType': query.case_type,
-            'caseNumber': query.case_number,
-            'filingYear': query.filing_year,
-            'court': query.court,
-            'createdAt': query.created_at.isoformat(),
-            'completedAt': query.completed_at.isoformat() if query.completed_at else None
-        }
+        load = CaseQuery.query.options(
+            undefer(CaseQuery.snapshot),
+            joinedload(CaseQuery.case_detail).joinedload(CaseDetail.documents)
+        ).filter_by(id=query_id)
+        query = load.first()
+        if not query and READ_BIND in db.engines:
+            # Just submitted, and the replica has not caught up yet
+            with primary_reads():
+                query = load.first()
+        if not query:
+            archived = _component('retention').archive.get(query_id)
+            if archived:
+                return jsonify(_archived_response(archived))
+            return jsonify({'error': 'Query not found'}), 404
         
-        if query.status == 'failed':
-            response['error'] = query.error_message
-        elif query.status == 'success' and query.case_detail:
-            case_detail = query.case_detail
-            response['caseDetail'] = {
-                'id': case_detail.id,
-                'caseNumber': case_detail.case_number,
-                'caseType': case_detail.case_type,
-                'filingDate': case_detail.filing_date,
-                'court': case_detail.court,
-                'judge': case_detail.judge,
-                'petitioner': case_detail.petitioner,
-                'respondent': case_detail.respondent,
-                'currentStatus': case_detail.current_status,
-                'lastUpdate': case_detail.last_update,
-                'proceedings': json.loads(case_detail.proceedings or '[]')
-            }
+        if query.snapshot and not (offset or limit):
+            response = Response(query.snapshot, mimetype='application/json')
+            response.set_etag(query.snapshot_etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        
+        # Pending queries, other proceedings pages (built from the proceedings index) and
+        # queries stored before snapshots existed; snapshots are only written by the job path
+        response = jsonify(_query_response(query, proceedings_offset=offset, proceedings_limit=limit))
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/events')
+def stream_events():
+    """Server-sent events for query status changes and new history rows
+
+    `query=<id>` (repeatable) subscribes to those queries, `history=1` to every
+    history row. Each stream starts with a `ready` event; `resync: true` means
+    updates may have been missed and the client should refetch once. Streams
+    end after EVENTS_STREAM_MAX_AGE and the browser reconnects with
+    Last-Event-ID, replaying anything published in between.
+    """
+    try:
+        query_ids = request.args.getlist('query', type=int)
+        history = request.args.get('history', 'false').lower() in ('1', 'true')
+        if not query_ids and not history:
+            return jsonify({'error': 'Subscribe to at least one query or to history'}), 400
+        if len(query_ids) > 50:
+            return jsonify({'error': 'Too many queries in one subscription'}), 400
+        
+        # The stream outlives the request context, so it holds the bus and settings directly
+        bus = event_bus._get_current_object()
+        subscription = bus.subscribe(query_ids, history)
+        if subscription is None:
+            # EventSource gives up on a non-200 response and the page falls back to polling
+            response = jsonify({'error': 'Too many open event streams'})
+            response.headers['Retry-After'] = '60'
+            return response, 503
+        _ensure_event_sync()
+        
+        last_event_id = request.headers.get('Last-Event-ID')
+        replayed = bus.replay(subscription, last_event_id) if last_event_id else None
+        retry_ms = current_app.config['EVENTS_RETRY_MS']
+        heartbeat = current_app.config['EVENTS_HEARTBEAT']
+        deadline = time.monotonic() + current_app.config['EVENTS_STREAM_MAX_AGE']
+        
+        def generate():
+            yield f"retry: {retry_ms}\n\n"
+            last_seq = subscription.start_seq
+            for published in replayed or []:
+                last_seq = max(last_seq, published.seq)
+                yield published.encode()
+            yield f"id: {bus.event_id(last_seq)}\nevent: ready\ndata: {json.dumps({'resync': replayed is None})}\n\n"
             
-            # Include documents
-            response['documents'] = []
-            for doc in case_detail.documents:
-                response['documents'].append({
-                    'id': doc.id,
-                    'title': doc.title,
-                    'documentType': doc.document_type,
-                    'filedDate': doc.filed_date,
-                    'downloadUrl': doc.download_url,
-                    'isAvailable': doc.is_available,
-                    'fileSize': doc.file_size
+            while time.monotonic() < deadline:
+                published = subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    while subscription.get(timeout=0) is not None:
+                        pass
+                    yield f"event: ready\ndata: {json.dumps({'resync': True})}\n\n"
+                elif published is None:
+                    yield ': keepalive\n\n'
+                elif published.seq > last_seq:  # replayed events may also have been queued
+                    last_seq = published.seq
+                    yield published.encode()
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+        # Runs when the stream ends or the client goes away, even if it never started
+        response.call_on_close(lambda: bus.unsubscribe(subscription))
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/events/stats')
+def get_event_stats():
+    """Get SSE subscriber and publish counters"""
+    try:
+        return jsonify(event_bus.stats())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/hearings')
+@read_only
+def get_hearings():
+    """List stored cases with a proceeding on a given date (date=YYYY-MM-DD or DD/MM/YYYY)
+
+    Cases come newest stored detail first, `limit` per page; pass `nextCursor`
+    back as `cursor` for the next page.
+    """
+    try:
+        hearing_date = _parse_proceeding_date(request.args.get('date'))
+        if hearing_date is None:
+            return jsonify({'error': 'A valid date is required'}), 400
+        
+        court = request.args.get('court')
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+        cursor = request.args.get('cursor')
+        if cursor is not None and not cursor.isdigit():
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        # A case looked up several times has several details; report the latest one with a
+        # proceeding that day, i.e. skip a detail when a newer one of the same case has one too
+        newer_proceeding = aliased(CaseProceeding)
+        newer_detail = aliased(CaseDetail)
+        newer_query = aliased(CaseQuery)
+        superseded = (
+            select(newer_proceeding.id)
+            .join(newer_detail, newer_detail.id == newer_proceeding.case_detail_id)
+            .join(newer_query, newer_query.id == newer_detail.query_id)
+            .where(
+                newer_proceeding.date == hearing_date,
+                newer_proceeding.case_detail_id > CaseProceeding.case_detail_id,
+                newer_query.court_key == CaseQuery.court_key,
+                newer_query.case_type_key == CaseQuery.case_type_key,
+                newer_query.case_number_key == CaseQuery.case_number_key,
+                newer_query.filing_year_key == CaseQuery.filing_year_key
+            )
+            .exists()
+        )
+        
+        # One page of distinct case details, served by ix_case_proceedings_date_case
+        page = (
+            select(CaseProceeding.case_detail_id)
+            .join(CaseDetail, CaseDetail.id == CaseProceeding.case_detail_id)
+            .join(CaseQuery, CaseQuery.id == CaseDetail.query_id)
+            .where(CaseProceeding.date == hearing_date, ~superseded)
+            .group_by(CaseProceeding.case_detail_id)
+            .order_by(CaseProceeding.case_detail_id.desc())
+            .limit(limit + 1)
+        )
+        if court:
+            page = page.where(CaseQuery.court_key == court.strip().lower())
+        if cursor is not None:
+            page = page.where(CaseProceeding.case_detail_id < int(cursor))
+        
+        detail_ids = db.session.scalars(page).all()
+        has_more = len(detail_ids) > limit
+        detail_ids = detail_ids[:limit]
+        
+        statement = (
+            select(CaseProceeding, CaseDetail, CaseQuery)
+            .join(CaseDetail, CaseDetail.id == CaseProceeding.case_detail_id)
+            .join(CaseQuery, CaseQuery.id == CaseDetail.query_id)
+            .where(CaseProceeding.date == hearing_date, CaseProceeding.case_detail_id.in_(detail_ids))
+            .order_by(CaseProceeding.case_detail_id.desc(), CaseProceeding.position)
+        )
+        
+        hearings = []
+        for proceeding, case_detail, query in (db.session.execute(statement) if detail_ids else []):
+            if not hearings or hearings[-1]['caseDetailId'] != case_detail.id:
+                hearings.append({
+                    'queryId': query.id,
+                    'caseDetailId': case_detail.id,
+                    'caseNumber': case_detail.case_number,
+                    'caseType': case_detail.case_type,
+                    'court': case_detail.court,
+                    'judge': case_detail.judge,
+                    'petitioner': case_detail.petitioner,
+                    'respondent': case_detail.respondent,
+                    'proceedings': []
                 })
+            hearings[-1]['proceedings'].append(_serialize_proceeding(proceeding))
         
-        return jsonify(response)
+        return jsonify({
+            'date': hearing_date.isoformat(),
+            'count': len(hearings),
+            'hearings': hearings,
+            'nextCursor': str(detail_ids[-1]) if has_more else None
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cases/history')
-def get_query_history():
-    """Get recent query history"""
-    try:
-        limit = request.args.get('limit', 20, type=int)
-        queries = CaseQuery.query.order_by(CaseQuery.created_at.desc()).limit(limit).all()
-        
-        result = []
-        for query in queries:
-            result.append({
-                'id': query.id,
-                'caseType': query.case_type,
-                'caseNumber': query.case_number,
-                'filingYear': query.filing_year,
-                'court': query.court,
-                'status': query.status,
-                'createdAt': query.created_at.isoformat(),
-                'completedAt': query.completed_at.isoformat() if query.completed_at else None
+@main.route('/api/cases/find')
+@read_only
+def find_cases():
+    """Full-text search of stored cases by party, judge or status, without scraping"""
+    try:
+        q = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        matches = find_case_details(db.session, q, limit, offset)
+        if matches is None:
+            return jsonify({'error': 'Search query must contain at least one word'}), 400
+        
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+        details = {
+            detail.id: detail
+            for detail in db.session.query(CaseDetail).options(joinedload(CaseDetail.query))
+            .filter(CaseDetail.id.in_([m['detailId'] for m in matches]))
+        }
+        
+        results = []
+        for match in matches:
+            detail = details.get(match['detailId'])
+            if detail is None or detail.query is None:
+                continue  # deleted or archived after the search matched it
+            results.append({
+                'queryId': detail.query_id,
+                'caseDetailId': detail.id,
+                'caseNumber': detail.case_number,
+                'caseType': detail.case_type,
+                'filingYear': detail.query.filing_year,
+                'court': detail.court,
+                'judge': detail.judge,
+                'petitioner': detail.petitioner,
+                'respondent': detail.respondent,
+                'currentStatus': detail.current_status,
+                'lastUpdate': detail.last_update,
+                'storedAt': detail.query.completed_at.isoformat() if detail.query.completed_at else None,
+                'score': round(abs(match['score']), 4)
             })
         
-        return jsonify(result)
+        return jsonify({
+            'query': q,
+            'results': results,
+            'offset': offset,
+            'nextOffset': offset + limit if has_more else None
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/cases/lookup')
+@read_only
+def lookup_case():
+    """Get the latest stored result for a case without scraping"""
+    try:
+        search_params = {
+            'caseType': request.args.get('caseType', ''),
+            'caseNumber': request.args.get('caseNumber', ''),
+            'filingYear': request.args.get('filingYear', ''),
+            'court': request.args.get('court', '')
+        }
+        
+        for field in ['caseType', 'caseNumber', 'filingYear', 'court']:
+            if not search_params[field]:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        status = request.args.get('status')
+        query = _find_latest_query(make_cache_key(search_params), status=status)
+        if not query:
+            return jsonify({'error': 'No stored result for this case'}), 404
+        
+        return jsonify(_query_response(query))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/cases/history')
+@read_only
+def get_query_history():
+    """Get recent query history
+
+    Pages are keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    header back as `cursor` for the next page. Pass X-Since-Cursor back as
+    `since` to receive only rows created or changed since that response.
+    """
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 500)
+        window_start = _history_window_start(request.args.get('filter', 'all'))
+        
+        queries = CaseQuery.query
+        if window_start:
+            queries = queries.filter(CaseQuery.created_at >= window_start)
+        
+        since = request.args.get('since')
+        if since:
+            # Delta mode: rows created or changed after the given position, oldest change first
+            updated_at, row_id = _decode_cursor(since)
+            rows = queries.filter(
+                tuple_(CaseQuery.updated_at, CaseQuery.id) > tuple_(updated_at, row_id)
+            ).order_by(CaseQuery.updated_at.asc(), CaseQuery.id.asc()).limit(limit).all()
+            
+            response = jsonify([_history_item(query) for query in rows])
+            response.headers['X-Since-Cursor'] = _encode_cursor(rows[-1].updated_at, rows[-1].id) if rows else since
+        else:
+            cursor = request.args.get('cursor')
+            if cursor:
+                created_at, row_id = _decode_cursor(cursor)
+                queries = queries.filter(tuple_(CaseQuery.created_at, CaseQuery.id) < tuple_(created_at, row_id))
+            
+            rows = queries.order_by(CaseQuery.created_at.desc(), CaseQuery.id.desc()).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            response = jsonify([_history_item(query) for query in rows])
+            if has_more:
+                response.headers['X-Next-Cursor'] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+            
+            latest = db.session.query(CaseQuery.updated_at, CaseQuery.id).order_by(
+                CaseQuery.updated_at.desc(), CaseQuery.id.desc()
+            ).first()
+            if latest and latest.updated_at:
+                response.headers['X-Since-Cursor'] = _encode_cursor(latest.updated_at, latest.id)
+        
+        response.headers['Cache-Control'] = 'no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/documents/<int:doc_id>/download')
+@main.route('/api/documents/<int:doc_id>/download')
 def download_document(doc_id):
-    """Download a case document - Returns sample PDF for demo"""
+    """Download a case document, proxying upstream files through the disk cache"""
     try:
         # Find document from any case (since doc_id might not match case_detail_id)
         document = db.session.query(CaseDocument).filter_by(id=doc_id).first()
-        
         if not document:
-            # Create a generic document for the requested ID
-            document_title = f"Court Document {doc_id}"
-            sample_pdf_content = generate_sample_pdf_by_id(doc_id, document_title)
-        else:
-            sample_pdf_content = generate_sample_pdf(document)
-            document_title = document.title
-        
-        return send_file(
-            BytesIO(sample_pdf_content),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"{document_title.replace(' ', '_')}.pdf"
-        )
+            return jsonify({'error': 'Document not found'}), 404
+        
+        if (document.download_url or '').startswith(('http://', 'https://')):
+            return _proxy_upstream_document(document)
+        
+        source = _document_source(document)
+        
+        cached = document_cache.get_or_render(doc_id, source, lambda: generate_sample_pdf(source))
+        
+        response = Response(cached.data, mimetype='application/pdf')
+        response.set_etag(cached.etag)
+        response.last_modified = cached.last_modified
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+        response.headers['Content-Disposition'] = f"attachment; filename={source['title'].replace(' ', '_')}.pdf"
+        
+        # Answers If-None-Match/If-Modified-Since with 304 and Range requests with 206
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(cached.data))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cases/history/export')
+def _proxy_upstream_document(document):
+    """Serve an upstream document from the disk cache, streaming it in on a miss"""
+    url = document.download_url
+    download_name = f"{document.title.replace(' ', '_')}.pdf"
+    path = court_scraper.document_store.lookup(url)
+    range_header = request.headers.get('Range')
+    
+    if path is None and range_header:
+        # Pass the range straight upstream rather than wait for the whole file,
+        # and fill the cache in the background for the next request
+        upstream = court_scraper.open_document_range(url, range_header)
+        court_scraper.prefetch_documents([url])
+        
+        headers = {'Accept-Ranges': 'bytes', 'Content-Disposition': f'attachment; filename={download_name}'}
+        for name in ('Content-Range', 'Content-Length', 'ETag', 'Last-Modified'):
+            if upstream.headers.get(name):
+                headers[name] = upstream.headers[name]
+        
+        def stream():
+            with upstream:
+                yield from upstream.iter_content(chunk_size=64 * 1024)
+        
+        return Response(
+            stream(),
+            status=upstream.status_code,
+            mimetype=upstream.headers.get('Content-Type', 'application/pdf'),
+            headers=headers
+        )
+    
+    if path is None:
+        path = court_scraper.download_document(url)
+        if path is None:
+            return jsonify({'error': 'Document is not available from the court website'}), 502
+    
+    metadata = court_scraper.document_store.metadata(url)
+    # send_file streams from disk and handles conditional and Range requests itself
+    return send_file(
+        path,
+        mimetype=metadata.get('contentType') or 'application/pdf',
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        max_age=3600
+    )
+
+EXPORT_COLUMNS = {
+    'caseNumber': ('Case Number', CaseQuery.case_number),
+    'caseType': ('Case Type', CaseQuery.case_type),
+    'filingYear': ('Filing Year', CaseQuery.filing_year),
+    'court': ('Court', CaseQuery.court),
+    'status': ('Status', CaseQuery.status),
+    'createdAt': ('Search Date', CaseQuery.created_at),
+    'completedAt': ('Completed Date', CaseQuery.completed_at),
+    'error': ('Error', CaseQuery.error_message),
+    'filingDate': ('Filing Date', CaseDetail.filing_date),
+    'judge': ('Judge', CaseDetail.judge),
+    'petitioner': ('Petitioner', CaseDetail.petitioner),
+    'respondent': ('Respondent', CaseDetail.respondent),
+    'currentStatus': ('Current Status', CaseDetail.current_status),
+    'lastUpdate': ('Last Update', CaseDetail.last_update)
+}
+
+DEFAULT_EXPORT_COLUMNS = ['caseNumber', 'caseType', 'filingYear', 'court', 'status', 'createdAt', 'completedAt']
+
+def _csv_value(value):
+    """Format a database value for CSV output"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+@main.route('/api/cases/history/export')
+@read_only
 def export_history():
-    """Export case history as CSV"""
+    """Export case history as CSV, streamed in batches"""
     try:
         filter_type = request.args.get('filter', '24h')
-        limit = int(request.args.get('limit', 50))
-        
-        queries = CaseQuery.query.order_by(CaseQuery.created_at.desc()).limit(limit).all()
+        window_start = _history_window_start(filter_type)
+        limit = request.args.get('limit', type=int)
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
         
-        # Create CSV content
-        csv_content = "Case Number,Case Type,Filing Year,Court,Status,Search Date,Completed Date\n"
+        columns = request.args.get('columns')
+        columns = [c.strip() for c in columns.split(',') if c.strip()] if columns else DEFAULT_EXPORT_COLUMNS
+        unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+        if unknown:
+            return jsonify({'error': f'Unknown column: {unknown[0]}'}), 400
         
-        for query in queries:
-            csv_content += f'"{query.case_number}","{query.case_type}","{query.filing_year}","{query.court}","{query.status}","{query.created_at.isoformat()}","{query.completed_at.isoformat() if query.completed_at else ""}"\n'
-        
-        return send_file(
-            BytesIO(csv_content.encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'case_history_{filter_type}_{datetime.now().strftime("%Y%m%d")}.csv'
-        )
+        statement = select(*[EXPORT_COLUMNS[c][1] for c in columns])
+        if any(EXPORT_COLUMNS[c][1].class_ is CaseDetail for c in columns):
+            # Queries answered from the cache export their source's detail
+            statement = statement.select_from(CaseQuery).outerjoin(
+                CaseDetail, CaseDetail.query_id == func.coalesce(CaseQuery.source_query_id, CaseQuery.id)
+            )
+        if window_start:
+            statement = statement.where(CaseQuery.created_at >= window_start)
+        statement = statement.order_by(CaseQuery.created_at.desc(), CaseQuery.id.desc())
+        if limit:
+            statement = statement.limit(limit)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([EXPORT_COLUMNS[c][0] for c in columns])
+        
+        # yield_per keeps only one batch of rows in memory (server-side cursor where supported)
+        rows = db.session.execute(statement.execution_options(yield_per=1000))
+        for partition in rows.partitions():
+            writer.writerows([_csv_value(value) for value in row] for row in partition)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        
+        yield buffer.getvalue().encode('utf-8')
+    
+    def generate_gzip():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+        for chunk in generate_csv():
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    
+    filename = f'case_history_{filter_type}_{datetime.now().strftime("%Y%m%d")}.csv'
+    if compress:
+        filename += '.gz'
+    
+    return Response(
+        stream_with_context(generate_gzip() if compress else generate_csv()),
+        mimetype='application/gzip' if compress else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
-def generate_sample_pdf(document):
-    """Generate a sample PDF content for demonstration"""
-    return generate_sample_pdf_by_id(document.id, document.title)
-
-def generate_sample_pdf_by_id(doc_id, title):
-    """Generate a sample PDF content by ID and title"""
-    # Simple PDF content - for demo purposes only
-    title_bytes = title.encode('utf-8', errors='ignore')[:50]
-    
-    pdf_content = f"""%PDF-1.4
-1 0 obj
-<<
-/Type /Catalog
-/Pages 2 0 R
->>
-endobj
-
-2 0 obj
-<<
-/Type /Pages
-/Kids [3 0 R]
-/Count 1
->>
-endobj
-
-3 0 obj
-<<
-/Type /Page
-/Parent 2 0 R
-/MediaBox [0 0 612 792]
-/Contents 4 0 R
-/Resources <<
-/Font <<
-/F1 5 0 R
->>
->>
->>
-endobj
-
-4 0 obj
-<<
-/Length 300
->>
-stream
-BT
-/F1 14 Tf
-50 750 Td
-(DELHI COURT DOCUMENT) Tj
-0 -30 Td
-(Document ID: {doc_id}) Tj
-0 -20 Td
-(Title: {title}) Tj
-0 -30 Td
-(This is a sample PDF document for demonstration.) Tj
-0 -20 Td
-(In a real implementation, this would contain) Tj
-0 -20 Td
-(the actual court document content.) Tj
-0 -30 Td
-(Generated: {datetime.now().strftime('%d/%m/%Y %H:%M')}) Tj
-ET
-endstream
-endobj
-
-5 0 obj
-<<
-/Type /Font
-/Subtype /Type1
-/BaseFont /Helvetica
->>
-endobj
-
-xref
-0 6
-0000000000 65535 f 
-0000000010 00000 n 
-0000000079 00000 n 
-0000000173 00000 n 
-0000000301 00000 n 
-0000000450 00000 n 
-trailer
-<<
-/Size 6
-/Root 1 0 R
->>
-startxref
-500
-%%EOF""".encode('utf-8')
-    
-    return pdf_content
-
-@app.route('/api/captcha', methods=['GET'])
+def _document_source(document):
+    """Collect the fields a document PDF is rendered from"""
+    source = {
+        'id': document.id,
+        'title': document.title,
+        'documentType': document.document_type,
+        'filedDate': document.filed_date,
+        'fileSize': document.file_size
+    }
+    
+    case_detail = document.case_detail
+    if case_detail:
+        source.update({
+            'caseNumber': case_detail.case_number,
+            'court': case_detail.court,
+            'petitioner': case_detail.petitioner,
+            'respondent': case_detail.respondent
+        })
+    
+    return source
+
+def generate_sample_pdf(source):
+    """Generate a sample PDF document for demonstration"""
+    lines = [
+        f"Document ID: {source['id']}",
+        f"Title: {source['title']}"
+    ]
+    for label, field in [('Document Type', 'documentType'), ('Filed', 'filedDate'), ('Case Number', 'caseNumber'),
+                         ('Court', 'court'), ('Petitioner', 'petitioner'), ('Respondent', 'respondent')]:
+        if source.get(field):
+            lines.append(f"{label}: {source[field]}")
+    
+    lines += [
+        '',
+        'This is a sample PDF document for demonstration.',
+        'In a real implementation, this would contain the actual court document content.'
+    ]
+    
+    return render_text_pdf(lines, heading='DELHI COURT DOCUMENT', title=source['title'])
+
+@main.route('/api/captcha', methods=['GET'])
 @limiter.limit("20 per minute")
 def get_captcha():
     """Get CAPTCHA text for inline display"""
@@ -427,7 +1962,23 @@ def get_captcha():
     except Exception as e:
         return jsonify({'error': f'Failed to generate CAPTCHA: {str(e)}'}), 500
 
-@app.route('/api/cases/refresh-captcha', methods=['POST'])
+@main.route('/api/captcha/<session_id>/image')
+def get_captcha_image(session_id):
+    """Serve the rendered CAPTCHA image for a session from memory"""
+    try:
+        image = court_scraper.captcha_images.image(session_id)
+        if image is None:
+            return jsonify({'error': 'CAPTCHA expired or not found'}), 404
+        
+        data, mimetype = image
+        response = Response(data, mimetype=mimetype)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/cases/refresh-captcha', methods=['POST'])
 @limiter.limit("10 per minute")
 def refresh_captcha():
     """Generate a fresh CAPTCHA for the current search session"""
@@ -458,7 +2009,7 @@ def refresh_captcha():
     except Exception as e:
         return jsonify({'error': f'Failed to generate fresh CAPTCHA: {str(e)}'}), 500
 
-@app.route('/api/cases/captcha-submit', methods=['POST'])
+@main.route('/api/cases/captcha-submit', methods=['POST'])
 @limiter.limit("5 per minute")
 def submit_captcha():
     """Submit CAPTCHA solution and continue case search"""
@@ -475,69 +2026,295 @@ def submit_captcha():
         form_data = data['formData']
         original_params = data['originalParams']
         
-        # Use court scraper to process CAPTCHA
-        result = court_scraper.submit_captcha_solution(
-            captcha_solution, 
-            form_data, 
-            original_params
-        )
-        
-        if result['success']:
-            # Create new query record for CAPTCHA-verified search
-            query = CaseQuery()
-            query.case_type = original_params['caseType']
-            query.case_number = original_params['caseNumber'] 
-            query.filing_year = original_params['filingYear']
-            query.court = original_params['court']
-            query.status = 'success'
-            query.completed_at = datetime.utcnow()
-            db.session.add(query)
-            db.session.commit()
-            
-            # Create case detail record
-            case_detail = CaseDetail()
-            case_detail.query_id = query.id
-            case_detail.case_number = result['caseDetail']['caseNumber']
-            case_detail.case_type = result['caseDetail']['caseType']
-            case_detail.filing_date = result['caseDetail'].get('filingDate')
-            case_detail.court = result['caseDetail']['court']
-            case_detail.judge = result['caseDetail'].get('judge')
-            case_detail.petitioner = result['caseDetail'].get('petitioner')
-            case_detail.respondent = result['caseDetail'].get('respondent')
-            case_detail.current_status = result['caseDetail'].get('currentStatus')
-            case_detail.last_update = result['caseDetail'].get('lastUpdate')
-            case_detail.proceedings = json.dumps(result['caseDetail'].get('proceedings', []))
-            db.session.add(case_detail)
-            db.session.commit()
-            
-            # Create documents if any
-            for doc in result.get('documents', []):
-                document = CaseDocument()
-                document.case_detail_id = case_detail.id
-                document.title = doc['title']
-                document.document_type = doc['documentType']
-                document.filed_date = doc.get('filedDate')
-                document.download_url = doc.get('downloadUrl')
-                document.is_available = doc.get('isAvailable', True)
-                document.file_size = doc.get('fileSize')
-                db.session.add(document)
-            db.session.commit()
-            
+        # Cache hits skip both the CAPTCHA check and the upstream fetch
+        cached = result_cache.get(original_params)
+        if cached is not None:
+            query = _record_lookup(original_params, cached, update_cache=False)
             return jsonify({
                 'success': True,
                 'queryId': query.id,
-                'message': 'CAPTCHA verified successfully',
-                'caseDetail': result['caseDetail']
+                'status': query.status,
+                'cached': True,
+                'message': 'Case details served from cache'
             })
-        else:
-            return jsonify(result), 400
-            
+        
+        # Validate the CAPTCHA up front; the case fetch itself runs in the background
+        rejection = court_scraper.verify_captcha(captcha_solution, form_data)
+        if rejection:
+            return jsonify(rejection), 400
+        
+        if not job_queue.has_capacity():
+            return jsonify({'error': 'Too many lookups in progress. Please try again shortly.'}), 503
+        
+        query, joined = _enqueue_lookup(original_params, captcha_solution)
+        
+        return jsonify({
+            'success': True,
+            'queryId': query.id,
+            'status': query.status,
+            'coalesced': joined,
+            'message': 'CAPTCHA verified successfully'
+        })
+        
+    except QueueFullError:
+        return jsonify({'error': 'Too many lookups in progress. Please try again shortly.'}), 503
     except Exception as e:
         return jsonify({'error': f'CAPTCHA submission failed: {str(e)}'}), 500
 
-# Create tables
-with app.app_context():
-    db.create_all()
+@main.route('/api/captcha/stats')
+def get_captcha_stats():
+    """Get CAPTCHA session store and image pool statistics"""
+    try:
+        stats = court_scraper.captcha_store.stats()
+        stats['images'] = court_scraper.captcha_images.stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/upstream/stats')
+def get_upstream_stats():
+    """Get upstream connection pool usage and HTTP cache revalidation counters"""
+    try:
+        return jsonify(court_scraper.http.stats())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/cache/stats')
+def get_cache_stats():
+    """Get result and document cache hit/miss/eviction counters"""
+    try:
+        stats = result_cache.stats()
+        stats['documents'] = document_cache.stats()
+        stats['upstreamDocuments'] = court_scraper.document_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/jobs/stats')
+def get_job_stats():
+    """Get background job queue depth and wait times"""
+    try:
+        stats = job_queue.stats()
+        stats['singleFlight'] = lookup_flights.stats()
+        stats['stored'] = {
+            'queued': ScrapeJob.query.filter_by(status='queued').count(),
+            'running': ScrapeJob.query.filter_by(status='running').count()
+        }
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/archive/queries')
+def find_archived_queries():
+    """Search archived queries by case key (scans the archive files, so it is slow)"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        criteria = {
+            'court': request.args.get('court'),
+            'case_type': request.args.get('caseType'),
+            'case_number': request.args.get('caseNumber'),
+            'filing_year': request.args.get('filingYear')
+        }
+        if not any(criteria.values()):
+            return jsonify({'error': 'Pass at least one of court, caseType, caseNumber or filingYear'}), 400
+        
+        records = _component('retention').archive.find(limit=limit, **criteria)
+        return jsonify({'queries': [_archived_response(record) for record in records]})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/retention/stats')
+def get_retention_stats():
+    """Get the retention policy, the last pass and archive size"""
+    try:
+        return jsonify(_component('retention').stats())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/assets/stats')
+def get_asset_stats():
+    """Get fingerprinted asset and page cache statistics"""
+    try:
+        stats = {'fingerprinting': _fingerprinting(current_app)}
+        if stats['fingerprinting']:
+            stats['assets'] = _component('static_assets').stats()
+        if current_app.config['PAGE_CACHE_SIZE']:
+            stats['pageCache'] = _component('page_cache').stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/metrics')
+@limiter.exempt
+def get_metrics():
+    """Expose request, scraper, SQL and limiter metrics in the Prometheus text format"""
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    try:
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/ratelimit/stats')
+def get_rate_limit_stats():
+    """Get rate limiter counter storage statistics"""
+    try:
+        if not current_app.config['RATELIMIT_ENABLED']:
+            # A disabled limiter never sets up its storage
+            return jsonify({'enabled': False})
+        
+        storage = limiter.storage
+        stats = storage.stats() if hasattr(storage, 'stats') else {'backend': type(storage).__name__}
+        stats['enabled'] = True
+        stats['strategy'] = current_app.config['RATELIMIT_STRATEGY']
+        stats['budget'] = current_app.config['RATELIMIT_APPLICATION']
+        stats['routeCosts'] = ROUTE_COSTS
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def init_db():
+    """Create tables and apply pending migrations (needs an app context)"""
+    db.create_all(bind_key=None)  # the primary only; a read bind is a replica of it
+    run_migrations(db.engine)
+    
+    # Stores kept in a database of their own get their tables there
+    if current_app.config['CAPTCHA_STORE'] == 'database' and current_app.config['CAPTCHA_STORE_URL']:
+        _migrate_store_database(current_app.config['CAPTCHA_STORE_URL'], 'captcha')
+    if current_app.config['RATELIMIT_STORAGE'] == 'database' and current_app.config['RATELIMIT_STORAGE_URL']:
+        _migrate_store_database(current_app.config['RATELIMIT_STORAGE_URL'], 'ratelimit')
+
+def _migrate_store_database(url, database):
+    from sqlalchemy import create_engine
+    
+    engine = create_engine(url)
+    try:
+        run_migrations(engine, database)
+    finally:
+        engine.dispose()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database schema and apply migrations"""
+    init_db()
+    click.echo('Database ready')
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static files ahead of deployment"""
+    assets = _component('static_assets').build()
+    click.echo(json.dumps(assets.stats(), indent=2))
+
+def _configure_database(app):
+    """Engine options for the configured database, and the read bind if there is one"""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(url, app.config))
+    read_url = app.config['DATABASE_READ_URL']
+    if read_url:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds[READ_BIND] = {'url': read_url, **engine_options(read_url, app.config)}
+
+def _configure_rate_limit_storage(app):
+    """Point Flask-Limiter at the configured counter storage"""
+    import rate_limit_storage  # registers the bounded-memory:// and app-database:// schemes
+    
+    storage = app.config['RATELIMIT_STORAGE']
+    if storage == 'database':
+        if app.config['RATELIMIT_STORAGE_URL']:
+            from sqlalchemy import create_engine
+            url = app.config['RATELIMIT_STORAGE_URL']
+            engine = tune_engine(create_engine(url, **engine_options(url, app.config)), app.config)
+        else:
+            with app.app_context():
+                engine = db.engine
+        app.config['RATELIMIT_STORAGE_URI'] = 'app-database://'
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {'engine': engine}
+    elif storage == 'memory':
+        app.config['RATELIMIT_STORAGE_URI'] = 'bounded-memory://'
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {'max_keys': app.config['RATELIMIT_MAX_KEYS']}
+    else:
+        app.config['RATELIMIT_STORAGE_URI'] = storage
+
+@click.command('retention')
+@click.option('--days', type=int, help='Archive finished lookups older than this (default: RETENTION_DAYS)')
+@click.option('--dry-run', is_flag=True, help='Only count what would be archived')
+@click.option('--no-vacuum', is_flag=True, help='Skip space reclamation after archiving')
+@click.option('--vacuum-full', is_flag=True, help='Rebuild the database once (locks it; enables incremental vacuum on SQLite)')
+@with_appcontext
+def retention_command(days, dry_run, no_vacuum, vacuum_full):
+    """Archive old lookups to compressed files and reclaim database space"""
+    retention = _component('retention')
+    if days is not None:
+        retention.days = days
+    if not retention.days:
+        click.echo('Retention is disabled (RETENTION_DAYS=0); pass --days to run anyway')
+        return
+    result = retention.run(dry_run=dry_run, vacuum=not no_vacuum)
+    if vacuum_full and not dry_run:
+        result['vacuumFull'] = retention.vacuum_full()
+    click.echo(json.dumps(result, indent=2))
+
+def create_app(config=None):
+    """Application factory
+
+    Only configuration, extensions and routes are set up here. The scraper,
+    caches and worker pools are built on first use, and the schema is created
+    by `flask init-db` (or the server entry points), so importing the app or
+    forking workers stays cheap.
+    """
+    app = Flask(__name__, static_folder='static', template_folder='templates')
+    _load_config(app)
+    if config:
+        app.config.update(config)
+    
+    _configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        tune_engine(db.engine, app.config)
+        if READ_BIND in db.engines:
+            tune_engine(db.engines[READ_BIND], app.config, read_only=True)
+    if app.config['METRICS_ENABLED']:
+        _install_metrics(app)
+    _configure_rate_limit_storage(app)
+    limiter.init_app(app)
+    app.register_blueprint(main)
+    _install_static_assets(app)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(retention_command)
+    app.cli.add_command(build_assets_command)
+    app.extensions['case_lookup'] = Components(app, COMPONENT_BUILDERS)
+    return app
+
+def start_background_work(app):
+    """Start the job queue, resuming stored jobs, build the scraper and static assets, so none
+    waits for the first request, and schedule retention. Server entry points call this after forking."""
+    with app.app_context():
+        app.extensions['case_lookup'].get('job_queue')
+        app.extensions['case_lookup'].get('court_scraper')
+        if _fingerprinting(app):
+            app.extensions['case_lookup'].get('static_assets')
+        if app.config['RETENTION_DAYS'] and app.config['RETENTION_INTERVAL']:
+            app.extensions['case_lookup'].get('retention').start(app.config['RETENTION_INTERVAL'])
+
+def stop_background_work(app):
+    """Let running jobs finish and stop the threads of every built component"""
+    app.extensions['case_lookup'].close()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app = create_app()
+    with app.app_context():
+        init_db()
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # the reloader's serving child, not its watcher
+        start_background_work(app)
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,81 @@
+"""
+Batch case lookups with bounded parallel fan-out.
+
+A BatchRunner fans a list of lookups out over a thread pool, holding a
+per-court slot for each upstream fetch so no court sees more than
+`court_concurrency` requests at once (across all running batches), and
+yields each result as soon as it finishes.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+REQUIRED_FIELDS = ['caseType', 'caseNumber', 'filingYear', 'court']
+
+
+def prepare_cases(cases: List[Any], key_func: Callable[[Dict[str, str]], Any]):
+    """Validate and dedupe batch entries; returns (unique, invalid, duplicates)"""
+    unique = []
+    invalid = []
+    seen = set()
+    duplicates = 0
+
+    for index, case in enumerate(cases):
+        if not isinstance(case, dict):
+            invalid.append((index, 'Entry must be an object'))
+            continue
+
+        missing = [field for field in REQUIRED_FIELDS if not case.get(field)]
+        if missing:
+            invalid.append((index, f'Missing required field: {missing[0]}'))
+            continue
+
+        params = {field: str(case[field]).strip() for field in REQUIRED_FIELDS}
+        key = key_func(params)
+        if key in seen:
+            duplicates += 1
+            continue
+
+        seen.add(key)
+        unique.append((index, params))
+
+    return unique, invalid, duplicates
+
+
+class BatchRunner:
+    def __init__(self, fetch: Callable[..., Dict[str, Any]], max_workers: int = 8, court_concurrency: int = 4):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.court_concurrency = court_concurrency
+        self._court_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, court: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._court_slots.get(court)
+            if slot is None:
+                slot = self._court_slots[court] = threading.BoundedSemaphore(self.court_concurrency)
+            return slot
+
+    def _fetch_one(self, params: Dict[str, str], fetch_args: Tuple[Any, ...]) -> Dict[str, Any]:
+        with self._slot(params['court'].lower()):
+            try:
+                return self.fetch(params, *fetch_args)
+            except Exception as e:
+                return {
+                    'success': False,
+                    'error': f'Unable to process request: {str(e)}'
+                }
+
+    def run(self, cases: List[Tuple[int, Dict[str, str]]], *fetch_args) -> Iterator[Tuple[int, Dict[str, str], Dict[str, Any]]]:
+        """Fetch every case, yielding (index, params, result) in completion order; fetch_args go to every fetch"""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch-worker')
+        try:
+            futures = {executor.submit(self._fetch_one, params, fetch_args): (index, params) for index, params in cases}
+            for future in as_completed(futures):
+                index, params = futures[future]
+                yield index, params, future.result()
+        finally:
+            # Stop outstanding fetches if the client goes away mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
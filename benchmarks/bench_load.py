@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test against a real server process and the stub court site.
+
+Starts benchmarks/stub_court.py in-process and the app under Gunicorn (as
+start_server.py would) on a scratch database, then runs lookups at the given
+concurrency. Each lookup is the browser flow: POST /api/cases/search, GET
+/api/captcha, POST /api/cases/captcha-submit, then polling
+/api/cases/query/<id> until the background fetch finishes (and optionally
+downloading the first document). Every case number is new, so nothing is
+served from the result cache.
+
+Reports throughput, p50/p95/p99 latency per step and per lookup, database
+commits per lookup (from /metrics, so only with a single worker) and the
+peak resident memory of the server processes. Results can be written as
+JSON and compared with an earlier run:
+
+    python benchmarks/bench_load.py --lookups 300 --concurrency 16 --json after.json
+    python benchmarks/bench_load.py --lookups 300 --concurrency 16 --compare before.json
+
+Linux only (memory is read from /proc); no network access is needed.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_court import StubCourt  # noqa: E402
+
+STEPS = ('search', 'captcha', 'submit', 'poll', 'document', 'lookup')
+POLL_INTERVAL = 0.05
+LOOKUP_TIMEOUT = 60
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def process_tree(pid):
+    """pid and all of its descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class MemorySampler(threading.Thread):
+    """Peak summed RSS of the server's process tree, sampled every 100 ms"""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(0.1):
+            self.peak = max(self.peak, sum(rss_bytes(pid) for pid in process_tree(self.pid)))
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def metric_total(base_url, name):
+    text = requests.get(f'{base_url}/metrics', timeout=10).text
+    return sum(float(value) for value in re.findall(rf'^{name}(?:{{[^}}]*}})? (\S+)$', text, re.MULTILINE))
+
+
+class LoadClient:
+    def __init__(self, base_url, documents):
+        self.base_url = base_url
+        self.documents = documents
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _timed(self, timings, step, method, path, **kwargs):
+        started = time.perf_counter()
+        response = self.session.request(method, self.base_url + path, timeout=LOOKUP_TIMEOUT, **kwargs)
+        timings[step] = timings.get(step, 0) + time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{step}: HTTP {response.status_code}')
+        return response
+
+    def lookup(self, number):
+        """Run one lookup; returns (timings, outcome)"""
+        timings = {}
+        started = time.perf_counter()
+        params = {'court': 'high-court', 'caseType': 'W.P.(C)', 'caseNumber': f'LT{number}', 'filingYear': '2024'}
+
+        search = self._timed(timings, 'search', 'POST', '/api/cases/search', json=params).json()
+        if 'queryId' in search:
+            query_id = search['queryId']  # already known, e.g. cached by an earlier run on this database
+        else:
+            captcha = self._timed(timings, 'captcha', 'GET', '/api/captcha').json()
+            submit = self._timed(timings, 'submit', 'POST', '/api/cases/captcha-submit', json={
+                'captchaSolution': captcha['captchaText'],
+                'formData': {'sessionId': captcha['sessionId']},
+                'originalParams': params
+            }).json()
+            query_id = submit['queryId']
+
+        poll_started = time.perf_counter()
+        while True:
+            result = self._timed(timings, 'polls', 'GET', f'/api/cases/query/{query_id}').json()
+            if result['status'] != 'pending':
+                break
+            if time.perf_counter() - poll_started > LOOKUP_TIMEOUT:
+                raise RuntimeError('poll: lookup did not finish')
+            time.sleep(POLL_INTERVAL)
+        timings['poll'] = time.perf_counter() - poll_started
+        timings.pop('polls')
+
+        if self.documents and result.get('documents'):
+            self._timed(timings, 'document', 'GET', f"/api/documents/{result['documents'][0]['id']}/download")
+
+        timings['lookup'] = time.perf_counter() - started
+        return timings, result['status']
+
+
+def start_server(args, scratch, stub):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=args.root,
+        BIND=f'127.0.0.1:{port}',
+        WEB_CONCURRENCY=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        ACCESS_LOG=os.devnull,
+        DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'load.db')}",
+        COURT_CASE_STATUS_URL=f'{stub.url}/case-status',
+        RATELIMIT_ENABLED='false'
+    )
+    for name in ('DOCUMENT_CACHE_DIR', 'DOCUMENT_STORE_DIR', 'UPSTREAM_CACHE_DIR'):
+        env[name] = os.path.join(scratch, name.lower())
+    log = open(os.path.join(scratch, 'server.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(args.root, 'gunicorn.conf.py'), 'wsgi:app'],
+        cwd=args.root, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited; see {log.name}")
+        try:
+            requests.get(f'{base_url}/api/jobs/stats', timeout=2)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Server did not start within 60 seconds')
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    return {
+        'p50': round(percentile(samples, 0.50) * 1000, 1),
+        'p95': round(percentile(samples, 0.95) * 1000, 1),
+        'p99': round(percentile(samples, 0.99) * 1000, 1),
+        'mean': round(statistics.mean(samples) * 1000, 1),
+        'max': round(max(samples) * 1000, 1)
+    }
+
+
+def run(args):
+    scratch = tempfile.mkdtemp(prefix='bench_load_')
+    stub = StubCourt(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                     document_kb=args.document_kb, seed=1).start()
+    process, base_url = start_server(args, scratch, stub)
+    sampler = MemorySampler(process.pid)
+    sampler.start()
+    try:
+        client = LoadClient(base_url, args.documents)
+        for number in range(args.warmup):
+            client.lookup(f'W{number}')
+
+        commits_before = metric_total(base_url, 'sql_commits_total') if args.workers == 1 else None
+        timings = {step: [] for step in STEPS}
+        outcomes, errors = {}, {}
+
+        def one(number):
+            try:
+                sample, outcome = client.lookup(number)
+            except Exception as e:
+                kind = str(e).split(':')[0] if isinstance(e, RuntimeError) else type(e).__name__
+                return None, kind
+            return sample, outcome
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for sample, outcome in pool.map(one, range(args.lookups)):
+                if sample is None:
+                    errors[outcome] = errors.get(outcome, 0) + 1
+                    continue
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                for step, seconds in sample.items():
+                    timings[step].append(seconds)
+        elapsed = time.perf_counter() - started
+
+        commits = None
+        if commits_before is not None:
+            commits = metric_total(base_url, 'sql_commits_total') - commits_before
+        completed = sum(outcomes.values())
+        return {
+            'commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=args.root,
+                                     capture_output=True, text=True).stdout.strip() or None,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'config': {
+                'lookups': args.lookups, 'concurrency': args.concurrency, 'workers': args.workers,
+                'threads': args.threads, 'latencyMs': args.latency_ms, 'jitterMs': args.jitter_ms,
+                'errorRate': args.error_rate, 'documents': args.documents, 'documentKb': args.document_kb
+            },
+            'seconds': round(elapsed, 2),
+            'throughput': round(completed / elapsed, 2),
+            'outcomes': outcomes,
+            'errors': errors,
+            'latencyMs': {step: summarize(samples) for step, samples in timings.items() if samples},
+            'commitsPerLookup': round(commits / completed, 2) if commits is not None and completed else None,
+            'peakRssMb': round(sampler.peak / 1024 ** 2, 1),
+            'stub': stub.stats()
+        }
+    finally:
+        sampler.stop()
+        process.terminate()
+        try:
+            process.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        stub.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def print_results(results, baseline=None):
+    def delta(current, previous, lower_is_better=True):
+        if previous in (None, 0) or current is None:
+            return ''
+        change = (current - previous) / previous * 100
+        worse = change > 0 if lower_is_better else change < 0
+        return f'  ({change:+.1f}%{" worse" if worse and abs(change) >= 5 else ""})'
+
+    old = baseline or {}
+    print(f"throughput: {results['throughput']} lookups/s"
+          f"{delta(results['throughput'], old.get('throughput'), lower_is_better=False)}")
+    print(f"outcomes: {results['outcomes']}  errors: {results['errors'] or 'none'}")
+    print(f"{'step':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, summary in results['latencyMs'].items():
+        previous = (old.get('latencyMs') or {}).get(step) or {}
+        print(f"{step:<10}{summary['p50']:>10}{summary['p95']:>10}{summary['p99']:>10}"
+              f"{delta(summary['p95'], previous.get('p95'))}")
+    print(f"commits per lookup: {results['commitsPerLookup']}"
+          f"{delta(results['commitsPerLookup'], old.get('commitsPerLookup'))}")
+    print(f"peak RSS: {results['peakRssMb']} MB{delta(results['peakRssMb'], old.get('peakRssMb'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the lookup flow against a local stub court')
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16, help='lookups in flight at once')
+    parser.add_argument('--warmup', type=int, default=5, help='lookups run before measuring')
+    parser.add_argument('--workers', type=int, default=1, help='server worker processes')
+    parser.add_argument('--threads', type=int, default=32, help='threads per server worker')
+    parser.add_argument('--latency-ms', type=float, default=150, help='stub court response delay')
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.02, help='share of stub responses that are 503s')
+    parser.add_argument('--documents', action='store_true', help='also download the first document of each case')
+    parser.add_argument('--document-kb', type=int, default=256)
+    parser.add_argument('--root', default=ROOT, help='checkout to measure (default: this one)')
+    parser.add_argument('--json', metavar='FILE', help='write results to this JSON file')
+    parser.add_argument('--compare', metavar='FILE', help='show changes against an earlier JSON result')
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
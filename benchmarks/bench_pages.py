@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Page load benchmark: bytes and requests for a first and a repeat visit.
+
+Loads the home page and a case details page with a minimal browser cache in
+front of the test client: assets linked from the page are fetched, responses
+are kept with their validators, anything marked immutable and still fresh is
+reused without a request, and everything else is revalidated with
+If-None-Match / If-Modified-Since. The run is repeated with fingerprinting
+and the page cache switched off (STATIC_FINGERPRINT=false, PAGE_CACHE_SIZE=0)
+for comparison, and the server-side time per page request is reported.
+
+Usage:
+    python benchmarks/bench_pages.py --requests 500
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ('/', '/case/1')
+ASSET_LINK = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+class BrowserCache:
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}  # url -> (etag, last modified, immutable, body)
+        self.requests = 0
+        self.bytes = 0
+
+    def get(self, url):
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        cached = self.entries.get(url)
+        if cached is not None:
+            etag, last_modified, immutable, body = cached
+            if immutable:
+                return body
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self.client.get(url, headers=headers)
+        data = response.get_data()
+        response.close()
+        self.requests += 1
+        self.bytes += len(data) + sum(len(name) + len(value) + 4 for name, value in response.headers.items())
+        if response.status_code == 304:
+            return cached[3]
+        if response.headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        self.entries[url] = (
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            'immutable' in response.headers.get('Cache-Control', ''),
+            data
+        )
+        return data
+
+    def visit(self, page):
+        html = self.get(page).decode('utf-8')
+        for asset in ASSET_LINK.findall(html):
+            self.get(asset)
+
+
+def measure(module, config, request_count):
+    application = module.create_app(config)
+    with application.app_context():
+        module.init_db()
+    client = application.test_client()
+
+    browser = BrowserCache(client)
+    for page in PAGES:
+        browser.visit(page)
+    first = {'requests': browser.requests, 'bytes': browser.bytes}
+    browser.requests = browser.bytes = 0
+    for page in PAGES:
+        browser.visit(page)
+    repeat = {'requests': browser.requests, 'bytes': browser.bytes}
+
+    timings = []
+    for i in range(request_count):
+        started = time.perf_counter()
+        client.get(PAGES[i % len(PAGES)], headers={'Accept-Encoding': 'gzip'}).close()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'firstVisit': first,
+        'repeatVisit': repeat,
+        'pageMs': {'median': round(statistics.median(timings), 3), 'p95': round(sorted(timings)[int(len(timings) * 0.95)], 3)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bytes transferred for first and repeat page loads')
+    parser.add_argument('--requests', type=int, default=500, help='page requests to time per configuration')
+    parser.add_argument('--json', metavar='FILE', help='also write results to this JSON file')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench_pages_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    import app as module
+
+    base = {'RATELIMIT_ENABLED': False, 'STATIC_BUILD_DIR': os.path.join(scratch, 'static_build')}
+    results = {
+        'plain': measure(module, dict(base, STATIC_FINGERPRINT=False, PAGE_CACHE_SIZE=0), args.requests),
+        'fingerprinted': measure(module, base, args.requests)
+    }
+
+    print(f"{'configuration':<15}{'first req':>10}{'first bytes':>13}{'repeat req':>12}{'repeat bytes':>14}{'page ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<15}{result['firstVisit']['requests']:>10}{result['firstVisit']['bytes']:>13}"
+              f"{result['repeatVisit']['requests']:>12}{result['repeatVisit']['bytes']:>14}{result['pageMs']['median']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark: pages parsed per second and peak memory per page.
+
+Parses every recorded court page in benchmarks/fixtures twice: with the
+targeted parse used by case_parser.parse_case_page (SoupStrainer on the
+result tables only), and with a full-tree parse followed by the same
+extraction, for comparison.
+
+Usage:
+    python benchmarks/bench_parser.py --iterations 50
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from case_parser import HTML_PARSER, extract_result, parse_case_page  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def full_parse(html):
+    """Build the whole tree, then extract"""
+    return extract_result(BeautifulSoup(html, HTML_PARSER))
+
+
+def measure(name, parse, pages, iterations):
+    # Peak memory of a single pass over the corpus
+    tracemalloc.start()
+    for html in pages.values():
+        parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for html in pages.values():
+            parse(html)
+    elapsed = time.perf_counter() - started
+
+    parsed = iterations * len(pages)
+    return {
+        'mode': name,
+        'pages': parsed,
+        'pagesPerSecond': round(parsed / elapsed, 1),
+        'msPerPage': round(elapsed / parsed * 1000, 3),
+        'peakKiB': round(peak / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark case page parsing')
+    parser.add_argument('--iterations', type=int, default=20, help='passes over the fixture corpus per mode')
+    parser.add_argument('--json', metavar='FILE', help='also write results to this JSON file')
+    args = parser.parse_args()
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+
+    # Both modes must agree before their speed means anything
+    for name, html in pages.items():
+        if parse_case_page(html) != full_parse(html):
+            sys.exit(f'Targeted and full parse disagree on {name}')
+
+    total_kib = sum(len(html.encode('utf-8')) for html in pages.values()) / 1024
+    print(f"{len(pages)} fixtures, {total_kib:.1f} KiB, parser: {HTML_PARSER}")
+
+    results = [
+        measure('targeted', parse_case_page, pages, args.iterations),
+        measure('full-tree', full_parse, pages, args.iterations)
+    ]
+
+    print(f"{'mode':<12}{'pages':>8}{'pages/s':>10}{'ms/page':>10}{'peak KiB':>10}")
+    for row in results:
+        print(f"{row['mode']:<12}{row['pages']:>8}{row['pagesPerSecond']:>10}{row['msPerPage']:>10}{row['peakKiB']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Persistence benchmark: database commits and write latency per lookup.
+
+Compares the original write path (query insert, status update, detail
+insert and document inserts, each committed separately) with the
+single-transaction path used by app._store_result.
+
+Usage:
+    python benchmarks/bench_persistence.py --lookups 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Point the app at a scratch database before it is imported
+_db_file = tempfile.NamedTemporaryFile(prefix='bench_persistence_', suffix='.db', delete=False)
+_db_file.close()
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+
+from sqlalchemy import event  # noqa: E402
+
+import app as court_app  # noqa: E402
+from app import db, CaseQuery, CaseDetail, CaseDocument, CaseProceeding  # noqa: E402
+
+
+def legacy_persist(search_params, result):
+    """The write path as it was before: one commit per step"""
+    query = CaseQuery()
+    query.case_type = search_params['caseType']
+    query.case_number = search_params['caseNumber']
+    query.filing_year = search_params['filingYear']
+    query.court = search_params['court']
+    query.status = 'pending'
+    db.session.add(query)
+    db.session.commit()
+
+    query.status = 'success'
+    query.completed_at = court_app.datetime.utcnow()
+    db.session.commit()
+
+    case_detail = CaseDetail()
+    case_detail.query_id = query.id
+    case_detail.case_number = result['caseDetail']['caseNumber']
+    case_detail.case_type = result['caseDetail']['caseType']
+    case_detail.filing_date = result['caseDetail'].get('filingDate')
+    case_detail.court = result['caseDetail']['court']
+    case_detail.judge = result['caseDetail'].get('judge')
+    case_detail.petitioner = result['caseDetail'].get('petitioner')
+    case_detail.respondent = result['caseDetail'].get('respondent')
+    case_detail.current_status = result['caseDetail'].get('currentStatus')
+    case_detail.last_update = result['caseDetail'].get('lastUpdate')
+    db.session.add(case_detail)
+    db.session.commit()
+    
+    for position, proceeding in enumerate(result['caseDetail'].get('proceedings', [])):
+        db.session.add(CaseProceeding(**court_app._proceeding_row(case_detail.id, position, proceeding)))
+
+    for doc in result.get('documents', []):
+        document = CaseDocument()
+        document.case_detail_id = case_detail.id
+        document.title = doc['title']
+        document.document_type = doc['documentType']
+        document.filed_date = doc.get('filedDate')
+        document.download_url = doc.get('downloadUrl')
+        document.is_available = doc.get('isAvailable', False)
+        document.file_size = doc.get('fileSize')
+        db.session.add(document)
+    db.session.commit()
+
+
+def current_persist(search_params, result):
+    """The shared single-transaction path"""
+    query = court_app._new_query(search_params)
+    court_app._store_result(query, result, update_cache=False)
+
+
+def run(name, persist, lookups, result, commits):
+    latencies = []
+    commits['count'] = 0
+
+    for i in range(lookups):
+        search_params = {
+            'caseType': 'civil',
+            'caseNumber': f'{name.upper()}-{i}',
+            'filingYear': '2023',
+            'court': 'high-court'
+        }
+        started = time.perf_counter()
+        persist(search_params, result)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    return {
+        'path': name,
+        'lookups': lookups,
+        'commitsPerLookup': round(commits['count'] / lookups, 2),
+        'meanMs': round(statistics.mean(latencies), 3),
+        'p50Ms': round(latencies[int(len(latencies) * 0.50)], 3),
+        'p95Ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark commits and latency per stored lookup')
+    parser.add_argument('--lookups', type=int, default=200, help='lookups to persist per path')
+    parser.add_argument('--json', metavar='FILE', help='also write results to this JSON file')
+    args = parser.parse_args()
+
+    app = court_app.create_app()
+    results = []
+    with app.app_context():
+        court_app.init_db()
+
+        # One realistic scraper result, reused for every write
+        result = court_app.court_scraper.fetch_case({
+            'caseType': 'civil',
+            'caseNumber': 'BENCH-1',
+            'filingYear': '2023',
+            'court': 'high-court'
+        })
+
+        commits = {'count': 0}
+
+        @event.listens_for(db.engine, 'commit')
+        def _count_commit(conn):
+            commits['count'] += 1
+
+        results.append(run('legacy', legacy_persist, args.lookups, result, commits))
+        results.append(run('current', current_persist, args.lookups, result, commits))
+
+    print(f"{'path':<10}{'lookups':>10}{'commits/lookup':>16}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in results:
+        print(f"{row['path']:<10}{row['lookups']:>10}{row['commitsPerLookup']:>16}"
+              f"{row['meanMs']:>10}{row['p50Ms']:>10}{row['p95Ms']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    court_app.stop_background_work(app)
+    os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time and cold start of a fresh process.
+
+Each run starts a new interpreter and records how long it takes to import
+the app module, create the app (and make sure the schema exists), answer
+the first request for the home page, and answer the first request that
+needs the scraper (GET /api/captcha, which builds it on first use). The
+schema is created once before timing, as a deployment would.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --root /path/to/other/checkout
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+heavy = sorted(name for name in ('requests', 'bs4', 'PIL', 'selenium') if name in sys.modules)
+if hasattr(module, 'create_app'):
+    application = module.create_app()
+    with application.app_context():
+        module.init_db()
+else:  # trees from before the app factory set everything up at import
+    application = module.app
+created = time.perf_counter()
+client = application.test_client()
+client.get('/')
+first_page = time.perf_counter()
+client.get('/api/captcha')
+first_captcha = time.perf_counter()
+print(json.dumps({
+    'importMs': (imported - started) * 1000,
+    'createMs': (created - imported) * 1000,
+    'firstPageMs': (first_page - created) * 1000,
+    'firstCaptchaMs': (first_captcha - first_page) * 1000,
+    'modules': len(sys.modules),
+    'heavyImportsAtImport': heavy
+}))
+sys.stdout.flush()
+os._exit(0)  # do not wait for worker threads started by the first requests
+'''
+
+
+def run_once(root, env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    wall = (time.perf_counter() - started) * 1000
+    sample = json.loads(output.strip().splitlines()[-1])
+    sample['processMs'] = wall
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import time and cold start')
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes to time')
+    parser.add_argument('--root', default=ROOT, help='checkout to measure (default: this one)')
+    parser.add_argument('--json', metavar='FILE', help='also write results to this JSON file')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(prefix='bench_startup_', suffix='.db', delete=False)
+    db_file.close()
+    scratch = tempfile.mkdtemp(prefix='bench_startup_')
+    env = dict(os.environ, PYTHONPATH=args.root, DATABASE_URL=f'sqlite:///{db_file.name}')
+    for name in ('DOCUMENT_CACHE_DIR', 'DOCUMENT_STORE_DIR', 'UPSTREAM_CACHE_DIR'):
+        env[name] = os.path.join(scratch, name.lower())
+
+    run_once(args.root, env)  # creates the schema and warms the OS file cache
+    samples = [run_once(args.root, env) for _ in range(args.runs)]
+
+    results = {'root': args.root, 'runs': args.runs, 'modules': samples[-1]['modules'],
+               'heavyImportsAtImport': samples[-1]['heavyImportsAtImport']}
+    print(f"{'phase':<16}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for phase in ('importMs', 'createMs', 'firstPageMs', 'firstCaptchaMs', 'processMs'):
+        values = [sample[phase] for sample in samples]
+        results[phase] = {
+            'median': round(statistics.median(values), 1),
+            'min': round(min(values), 1),
+            'max': round(max(values), 1)
+        }
+        print(f"{phase:<16}{results[phase]['median']:>12}{results[phase]['min']:>10}{results[phase]['max']:>10}")
+    print(f"modules loaded: {results['modules']}, heavy modules loaded by import: "
+          f"{', '.join(results['heavyImportsAtImport']) or 'none'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the court website, for load tests that must run offline.
+
+Serves the recorded case-status pages in benchmarks/fixtures at
+/case-status (picked by case number, so a given case always gets the same
+page; case numbers containing NOTFOUND or MISSING get the no-record page)
+and synthetic documents for any .pdf path, with Range support so the app's
+resumable downloads work. Every response can be delayed and a share of them
+answered with 503, to exercise the app's upstream retries.
+
+Point the app at it with COURT_CASE_STATUS_URL=http://127.0.0.1:<port>/case-status.
+
+Usage:
+    python benchmarks/stub_court.py --port 8901 --latency-ms 150 --error-rate 0.02
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+NO_RECORD_PAGE = 'no_record.html'
+
+
+class StubCourt:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, document_kb: int = 256, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.document_size = document_kb * 1024
+        self._random = random.Random(seed)
+        self._pages = {}
+        for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+            with open(path, 'rb') as f:
+                self._pages[os.path.basename(path)] = f.read()
+        self._case_pages = [name for name in self._pages if name != NO_RECORD_PAGE]
+        self._counters = {'pages': 0, 'documents': 0, 'injectedErrors': 0, 'notFound': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-court', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _delay_and_fail(self) -> bool:
+        """Sleep for the configured latency; returns True when this response should be an error"""
+        with self._lock:
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0)
+            fail = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def page_for(self, case_number: str) -> str:
+        if 'NOTFOUND' in case_number.upper() or 'MISSING' in case_number.upper():
+            return NO_RECORD_PAGE
+        return self._case_pages[zlib.crc32(case_number.encode('utf-8')) % len(self._case_pages)]
+
+    def document(self, path: str) -> bytes:
+        # Deterministic content per path, so ETags and resumed downloads line up
+        seed = hashlib.sha256(path.encode('utf-8')).digest()
+        header = b'%PDF-1.4\n% stub court document ' + path.encode('utf-8') + b'\n'
+        body = (seed * (self.document_size // len(seed) + 1))[:max(self.document_size - len(header), 0)]
+        return header + body
+
+    def _handler(self):
+        court = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                court._count('bytes', len(body))
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == '/stats':
+                    return self._send(200, json.dumps(court.stats()).encode('utf-8'), 'application/json')
+
+                if court._delay_and_fail():
+                    court._count('injectedErrors')
+                    return self._send(503, b'Service temporarily unavailable', 'text/plain', {'Retry-After': '1'})
+
+                if parts.path == '/case-status':
+                    query = parse_qs(parts.query)
+                    body = court._pages[court.page_for(query.get('caseNumber', [''])[0])]
+                    court._count('pages')
+                    etag = '"%s"' % hashlib.md5(self.path.encode('utf-8') + body).hexdigest()
+                    if self.headers.get('If-None-Match') == etag:
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    return self._send(200, body, 'text/html; charset=utf-8',
+                                      {'ETag': etag, 'Cache-Control': 'no-cache'})
+
+                if parts.path.endswith('.pdf'):
+                    body = court.document(parts.path)
+                    court._count('documents')
+                    headers = {'Accept-Ranges': 'bytes', 'ETag': '"%s"' % hashlib.md5(body).hexdigest()}
+                    requested = self.headers.get('Range', '')
+                    if requested.startswith('bytes=') and requested[6:].split('-')[0].isdigit():
+                        start = int(requested[6:].split('-')[0])
+                        if start >= len(body):
+                            headers['Content-Range'] = f'bytes */{len(body)}'
+                            return self._send(416, b'', 'application/pdf', headers)
+                        headers['Content-Range'] = f'bytes {start}-{len(body) - 1}/{len(body)}'
+                        return self._send(206, body[start:], 'application/pdf', headers)
+                    return self._send(200, body, 'application/pdf', headers)
+
+                court._count('notFound')
+                self._send(404, b'Not found', 'text/plain')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded court pages and documents locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='random +/- spread around the latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of responses answered with 503')
+    parser.add_argument('--document-kb', type=int, default=256, help='size of served documents')
+    parser.add_argument('--seed', type=int, help='seed for latency jitter and injected errors')
+    args = parser.parse_args()
+
+    court = StubCourt(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.document_kb, args.seed)
+    print(f'Stub court listening on {court.url} (case pages at {court.url}/case-status)')
+    try:
+        court._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        court._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
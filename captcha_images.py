@@ -0,0 +1,280 @@
+"""
+Pre-rendered CAPTCHA images.
+
+A CaptchaImagePool keeps a bounded pool of rendered CAPTCHAs topped up by a
+background producer thread, so issuing one is a pop from a deque. Rendering
+uses Pillow when it is installed: noise comes from one random byte buffer
+turned into a mask with a lookup table, never per-pixel draw calls, and fonts
+are loaded once. Without Pillow the pool renders small SVG images instead.
+
+Issued images are held in memory per session until they expire, and are
+served by the /api/captcha/<session>/image endpoint.
+
+CaptchaGenerator is the older one-image-at-a-time API: create_captcha_image
+returns a Pillow image, create_captcha_bytes encoded bytes and a mimetype.
+"""
+
+import io
+import os
+import random
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow is optional
+    Image = None
+
+# Mix of letters and numbers like real court CAPTCHAs, minus the confusing ones
+CAPTCHA_CHARS = ''.join(c for c in string.ascii_uppercase + string.digits if c not in '0O1I')
+
+FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+    '/Library/Fonts/Arial Bold.ttf',
+    'C:\\Windows\\Fonts\\arialbd.ttf'
+]
+
+WIDTH = 150
+HEIGHT = 50
+FONT_SIZE = 24
+
+
+def generate_captcha_text(length: int = 5) -> str:
+    """Generate random CAPTCHA text"""
+    return ''.join(random.choice(CAPTCHA_CHARS) for _ in range(length))
+
+
+@lru_cache(maxsize=8)
+def load_font(size: int = FONT_SIZE):
+    """Load the CAPTCHA font once per size"""
+    for path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except (OSError, IOError):
+            continue
+    return ImageFont.load_default()
+
+
+def _random_color(low: int = 50, high: int = 150) -> Tuple[int, int, int]:
+    return (random.randint(low, high), random.randint(low, high), random.randint(low, high))
+
+
+def render_image(text: str, width: int = WIDTH, height: int = HEIGHT, noise: float = 0.08):
+    """Render a CAPTCHA as a Pillow image"""
+    image = Image.new('RGB', (width, height), 'white')
+
+    # Speckle noise: one random buffer thresholded into a mask through a lookup table
+    threshold = int(256 * noise)
+    mask = Image.frombytes('L', (width, height), os.urandom(width * height))
+    mask = mask.point([255 if v < threshold else 0 for v in range(256)])
+    image.paste((200, 200, 200), mask=mask)
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(5):
+        draw.line(
+            [(random.randint(0, width), random.randint(0, height)),
+             (random.randint(0, width), random.randint(0, height))],
+            fill='gray', width=1
+        )
+
+    # Each character is drawn on its own tile and rotated, then pasted in place
+    font = load_font(FONT_SIZE)
+    step = (width - 20) // max(len(text), 1)
+    for i, char in enumerate(text):
+        tile = Image.new('L', (FONT_SIZE + 10, FONT_SIZE + 14), 0)
+        ImageDraw.Draw(tile).text((5, 3), char, font=font, fill=255)
+        tile = tile.rotate(random.uniform(-25, 25), resample=Image.BILINEAR, expand=False)
+        position = (10 + i * step, (height - tile.height) // 2 + random.randint(-4, 4))
+        image.paste(_random_color(), position, mask=tile)
+
+    return image
+
+
+def render_png(text: str, width: int = WIDTH, height: int = HEIGHT, noise: float = 0.08) -> bytes:
+    """Render a CAPTCHA as PNG bytes with Pillow"""
+    buffer = io.BytesIO()
+    render_image(text, width, height, noise).save(buffer, 'PNG', optimize=False)
+    return buffer.getvalue()
+
+
+def render_svg(text: str, width: int = WIDTH, height: int = HEIGHT) -> bytes:
+    """Render a CAPTCHA as a small SVG (used when Pillow is not installed)"""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<rect width="{width}" height="{height}" fill="#ffffff"/>'
+    ]
+    for _ in range(40):
+        parts.append(
+            f'<circle cx="{random.randint(0, width)}" cy="{random.randint(0, height)}" r="1" fill="#c8c8c8"/>'
+        )
+    for _ in range(5):
+        parts.append(
+            f'<line x1="{random.randint(0, width)}" y1="{random.randint(0, height)}" '
+            f'x2="{random.randint(0, width)}" y2="{random.randint(0, height)}" stroke="#808080" stroke-width="1"/>'
+        )
+
+    step = (width - 20) // max(len(text), 1)
+    for i, char in enumerate(text):
+        x = 15 + i * step
+        y = height // 2 + 8 + random.randint(-4, 4)
+        r, g, b = _random_color()
+        parts.append(
+            f'<text x="{x}" y="{y}" font-family="DejaVu Sans, Arial, sans-serif" font-size="{FONT_SIZE}" '
+            f'font-weight="bold" fill="rgb({r},{g},{b})" '
+            f'transform="rotate({random.randint(-25, 25)} {x} {y})">{char}</text>'
+        )
+
+    parts.append('</svg>')
+    return ''.join(parts).encode('utf-8')
+
+
+def render_captcha(text: str) -> Tuple[bytes, str]:
+    """Render a CAPTCHA; returns (image bytes, mimetype)"""
+    if Image is not None:
+        return render_png(text), 'image/png'
+    return render_svg(text), 'image/svg+xml'
+
+
+class CaptchaGenerator:
+    """The standalone generator API (see static/images/captcha_fresh.py)"""
+
+    def __init__(self):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.font_size = FONT_SIZE
+
+    def generate_captcha_text(self, length=5):
+        """Generate random CAPTCHA text"""
+        return generate_captcha_text(length)
+
+    def create_captcha_image(self, text):
+        """Create CAPTCHA image with given text (a Pillow image)"""
+        if Image is None:
+            raise RuntimeError('Pillow is not installed; use create_captcha_bytes for an SVG image')
+        return render_image(text, self.width, self.height)
+
+    def create_captcha_bytes(self, text) -> Tuple[bytes, str]:
+        """Create CAPTCHA image bytes with given text; returns (bytes, mimetype), SVG without Pillow"""
+        if Image is not None:
+            return render_png(text, self.width, self.height), 'image/png'
+        return render_svg(text, self.width, self.height), 'image/svg+xml'
+
+    def save_captcha(self, text, filename):
+        """Save CAPTCHA image to file (as .svg without Pillow); returns the file name used"""
+        data, mimetype = self.create_captcha_bytes(text)
+        if mimetype == 'image/svg+xml':
+            filename = os.path.splitext(filename)[0] + '.svg'
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+
+class CaptchaImagePool:
+    def __init__(self, pool_size: int = 64, max_sessions: int = 10000):
+        self.pool_size = pool_size
+        self.max_sessions = max_sessions
+        self._pool = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._issued = OrderedDict()  # session_id -> (expires_at, data, mimetype), oldest first
+        self._issued_lock = threading.Lock()
+        self._rendered = 0
+        self._pool_hits = 0
+        self._pool_misses = 0
+        self._render_seconds = 0.0
+
+    def start(self):
+        """Start the background producer if it is not running yet"""
+        with self._cond:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._produce, name='captcha-producer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _render(self) -> Tuple[str, bytes, str]:
+        started = time.perf_counter()
+        text = generate_captcha_text()
+        data, mimetype = render_captcha(text)
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._rendered += 1
+            self._render_seconds += elapsed
+        return text, data, mimetype
+
+    def _produce(self):
+        while True:
+            with self._cond:
+                while not self._stopped and len(self._pool) >= self.pool_size:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+            try:
+                item = self._render()
+            except Exception as e:
+                print(f"CAPTCHA render error: {e}")
+                time.sleep(1)
+                continue
+
+            with self._cond:
+                self._pool.append(item)
+
+    def take(self) -> Tuple[str, bytes, str]:
+        """Take a rendered CAPTCHA; returns (text, image bytes, mimetype)"""
+        self.start()
+        with self._cond:
+            if self._pool:
+                item = self._pool.popleft()
+                self._pool_hits += 1
+                self._cond.notify()
+                return item
+            self._pool_misses += 1
+            self._cond.notify()
+
+        # Pool drained by a burst: render inline rather than make the caller wait
+        return self._render()
+
+    def attach(self, session_id: str, data: bytes, mimetype: str, expires_at: int):
+        """Keep an issued image so it can be served for its session"""
+        now = int(time.time())
+        with self._issued_lock:
+            self._issued[session_id] = (expires_at, data, mimetype)
+            while self._issued:
+                oldest_id, (oldest_expiry, _, _) = next(iter(self._issued.items()))
+                if oldest_expiry >= now and len(self._issued) <= self.max_sessions:
+                    break
+                del self._issued[oldest_id]
+
+    def image(self, session_id: str) -> Optional[Tuple[bytes, str]]:
+        """Return (image bytes, mimetype) for an issued session, or None"""
+        with self._issued_lock:
+            entry = self._issued.get(session_id)
+        if entry is None or entry[0] < int(time.time()):
+            return None
+        return entry[1], entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {
+                'renderer': 'png' if Image is not None else 'svg',
+                'poolSize': self.pool_size,
+                'pooled': len(self._pool),
+                'rendered': self._rendered,
+                'poolHits': self._pool_hits,
+                'poolMisses': self._pool_misses,
+                'avgRenderMs': round(self._render_seconds / self._rendered * 1000, 3) if self._rendered else 0.0
+            }
+        with self._issued_lock:
+            stats['issuedImages'] = len(self._issued)
+        return stats
@@ -0,0 +1,230 @@
+"""
+CAPTCHA session stores.
+
+MemoryCaptchaStore keeps sessions in one process, with a lock around every
+change and an expiry heap so cleanup only touches sessions that have actually
+expired. DatabaseCaptchaStore keeps them in a table reachable from every
+worker process (the app database, or any SQLAlchemy URL such as a shared
+local SQLite file). Both count attempts atomically. The table is created by
+migration 9 (`flask init-db`), in the separate database too when there is one.
+"""
+
+import heapq
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Boolean, Column, Integer, MetaData, String, Table, delete, func, insert, select, update
+
+
+class CaptchaStore:
+    """Interface shared by the CAPTCHA session stores"""
+
+    def create(self, session_id: str, answer: str, created_at: int, ttl: int):
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def record_attempt(self, session_id: str) -> Optional[int]:
+        """Atomically increment the attempt counter; returns the new count, or None if unknown"""
+        raise NotImplementedError
+
+    def mark(self, session_id: str, expired: Optional[bool] = None, used: Optional[bool] = None):
+        raise NotImplementedError
+
+    def cleanup(self) -> int:
+        """Remove expired sessions; returns how many were removed"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryCaptchaStore(CaptchaStore):
+    def __init__(self, max_sessions: int = 100000):
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._expiry = []  # heap of (expires_at, session_id); stale entries are skipped lazily
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def create(self, session_id: str, answer: str, created_at: int, ttl: int):
+        expires_at = created_at + ttl
+        with self._lock:
+            self._remove_expired(int(time.time()))
+            while len(self._sessions) >= self.max_sessions and self._expiry:
+                # At capacity: drop the session closest to expiry
+                if self._pop_expiry():
+                    self._evicted += 1
+
+            self._sessions[session_id] = {
+                'correct_answer': answer,
+                'created_at': created_at,
+                'expires_at': expires_at,
+                'attempts': 0,
+                'expired': False,
+                'used': False
+            }
+            heapq.heappush(self._expiry, (expires_at, session_id))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._sessions.get(session_id)
+            return dict(data) if data else None
+
+    def record_attempt(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return None
+            data['attempts'] += 1
+            return data['attempts']
+
+    def mark(self, session_id: str, expired: Optional[bool] = None, used: Optional[bool] = None):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return
+            if expired is not None:
+                data['expired'] = expired
+            if used is not None:
+                data['used'] = used
+
+    def cleanup(self) -> int:
+        with self._lock:
+            return self._remove_expired(int(time.time()))
+
+    def _pop_expiry(self) -> bool:
+        """Pop the heap top, deleting its session if the entry is current"""
+        expires_at, session_id = heapq.heappop(self._expiry)
+        data = self._sessions.get(session_id)
+        if data is not None and data['expires_at'] == expires_at:
+            del self._sessions[session_id]
+            return True
+        return False
+
+    def _remove_expired(self, now: int) -> int:
+        removed = 0
+        while self._expiry and self._expiry[0][0] < now:
+            if self._pop_expiry():
+                removed += 1
+        self._expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._sessions)
+            sample = next(iter(self._sessions.values()), None)
+            per_session = sys.getsizeof(sample) + sum(sys.getsizeof(v) for v in sample.values()) if sample else 0
+            return {
+                'backend': 'memory',
+                'size': size,
+                'maxSessions': self.max_sessions,
+                'heapEntries': len(self._expiry),
+                'evicted': self._evicted,
+                'expired': self._expired,
+                'approxBytes': size * per_session + sys.getsizeof(self._sessions) + sys.getsizeof(self._expiry)
+            }
+
+
+metadata = MetaData()
+
+captcha_sessions = Table(
+    'captcha_sessions',
+    metadata,
+    Column('session_id', String(64), primary_key=True),
+    Column('correct_answer', String(20), nullable=False),
+    Column('created_at', Integer, nullable=False),
+    Column('expires_at', Integer, nullable=False, index=True),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('expired', Boolean, nullable=False, default=False),
+    Column('used', Boolean, nullable=False, default=False)
+)
+
+
+class DatabaseCaptchaStore(CaptchaStore):
+    def __init__(self, engine, max_sessions: int = 1000000, cleanup_interval: int = 60):
+        self.engine = engine
+        self.max_sessions = max_sessions
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+
+    def create(self, session_id: str, answer: str, created_at: int, ttl: int):
+        # Expired rows are swept periodically rather than on every issue
+        if time.time() - self._last_cleanup > self.cleanup_interval:
+            self.cleanup()
+
+        with self.engine.begin() as conn:
+            conn.execute(insert(captcha_sessions).values(
+                session_id=session_id,
+                correct_answer=answer,
+                created_at=created_at,
+                expires_at=created_at + ttl,
+                attempts=0,
+                expired=False,
+                used=False
+            ))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(captcha_sessions).where(captcha_sessions.c.session_id == session_id)
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def record_attempt(self, session_id: str) -> Optional[int]:
+        # A single UPDATE ... RETURNING is atomic across processes
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(captcha_sessions)
+                .where(captcha_sessions.c.session_id == session_id)
+                .values(attempts=captcha_sessions.c.attempts + 1)
+                .returning(captcha_sessions.c.attempts)
+            ).scalar()
+
+    def mark(self, session_id: str, expired: Optional[bool] = None, used: Optional[bool] = None):
+        values = {}
+        if expired is not None:
+            values['expired'] = expired
+        if used is not None:
+            values['used'] = used
+        if not values:
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(update(captcha_sessions).where(captcha_sessions.c.session_id == session_id).values(**values))
+
+    def cleanup(self) -> int:
+        self._last_cleanup = time.time()
+        with self.engine.begin() as conn:
+            removed = conn.execute(
+                delete(captcha_sessions).where(captcha_sessions.c.expires_at < int(time.time()))
+            ).rowcount
+
+            # Enforce the size cap by dropping the sessions closest to expiry
+            size = conn.execute(select(func.count()).select_from(captcha_sessions)).scalar()
+            if size > self.max_sessions:
+                cutoff = conn.execute(
+                    select(captcha_sessions.c.expires_at)
+                    .order_by(captcha_sessions.c.expires_at)
+                    .offset(size - self.max_sessions)
+                    .limit(1)
+                ).scalar()
+                removed += conn.execute(
+                    delete(captcha_sessions).where(captcha_sessions.c.expires_at < cutoff)
+                ).rowcount
+
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            size = conn.execute(select(func.count()).select_from(captcha_sessions)).scalar()
+        return {
+            'backend': 'database',
+            'size': size,
+            'maxSessions': self.max_sessions,
+            'lastCleanup': int(self._last_cleanup)
+        }
@@ -0,0 +1,210 @@
+"""
+Parser for court case-status pages.
+
+Turns a case-status page into the result shape the rest of the app uses
+({'success', 'caseDetail', 'documents'}). Only the case details, proceedings
+and orders tables (plus the "no record" notice) are parsed: a SoupStrainer
+keeps BeautifulSoup from building the navigation, scripts and footer that
+make up most of each page, and everything before the first of those
+elements is skipped without being tokenised at all. lxml is used when
+installed, otherwise the standard library parser.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+DETAILS_ID = 'caseDetails'
+PROCEEDINGS_ID = 'proceedings'
+ORDERS_ID = 'orders'
+NO_RECORD_ID = 'noRecord'
+
+TARGETS = SoupStrainer(id=[DETAILS_ID, PROCEEDINGS_ID, ORDERS_ID, NO_RECORD_ID])
+TARGET_PATTERN = re.compile(
+    r'id\s*=\s*["\']?(?:%s)\b' % '|'.join((DETAILS_ID, PROCEEDINGS_ID, ORDERS_ID, NO_RECORD_ID))
+)
+
+# Labels in the case details table, lower-cased, mapped to caseDetail fields
+DETAIL_LABELS = {
+    'case no.': 'caseNumber',
+    'case number': 'caseNumber',
+    'case type': 'caseType',
+    'date of filing': 'filingDate',
+    'filing date': 'filingDate',
+    'court': 'court',
+    'court name': 'court',
+    'bench': 'judge',
+    'judge': 'judge',
+    "hon'ble judge": 'judge',
+    'petitioner': 'petitioner',
+    'petitioner(s)': 'petitioner',
+    'respondent': 'respondent',
+    'respondent(s)': 'respondent',
+    'status': 'currentStatus',
+    'case status': 'currentStatus',
+    'nature of case': 'caseNature',
+    'last updated': 'lastUpdate',
+    'last listed on': 'lastUpdate'
+}
+
+# Proceeding purposes mapped to the timeline types used by the frontend
+PROCEEDING_TYPES = [
+    ('filed', 'filing'),
+    ('registered', 'filing'),
+    ('hearing', 'hearing'),
+    ('arguments', 'hearing'),
+    ('judgment', 'judgment'),
+    ('order', 'order'),
+    ('status', 'status')
+]
+
+DOCUMENT_TYPES = [
+    ('petition', 'petition'),
+    ('judgment', 'judgment'),
+    ('order', 'order'),
+    ('report', 'report'),
+    ('affidavit', 'affidavit')
+]
+
+SIZE_UNITS = {'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3}
+SIZE_PATTERN = re.compile(r'([\d.]+)\s*(b|kb|mb|gb)', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def _text(cell) -> str:
+    return WHITESPACE.sub(' ', cell.get_text(' ', strip=True)).strip()
+
+
+def _first_line(cell) -> str:
+    """Text before the first line break (drops advocate names and other sub-lines)"""
+    lines = cell.get_text('\n', strip=True).split('\n')
+    return WHITESPACE.sub(' ', lines[0]).strip() if lines else ''
+
+
+def _classify(text: str, types: List[tuple], default: str) -> str:
+    lowered = text.lower()
+    for needle, kind in types:
+        if needle in lowered:
+            return kind
+    return default
+
+
+def _parse_size(text: str) -> Optional[int]:
+    match = SIZE_PATTERN.search(text)
+    if not match:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def _body_rows(table):
+    """Data rows of a table, skipping header rows"""
+    for row in table.find_all('tr'):
+        cells = row.find_all('td', recursive=False)
+        if cells:
+            yield cells
+
+
+def _parse_details(table) -> Dict[str, Any]:
+    details = {}
+    for row in table.find_all('tr'):
+        label = row.find('th', recursive=False)
+        value = row.find('td', recursive=False)
+        if label is None or value is None:
+            continue
+        field = DETAIL_LABELS.get(_text(label).rstrip(':').lower())
+        if field and field not in details:
+            details[field] = _first_line(value)
+    return details
+
+
+def _parse_proceedings(table) -> List[Dict[str, str]]:
+    proceedings = []
+    for cells in _body_rows(table):
+        if len(cells) < 2:
+            continue
+        title = _text(cells[1])
+        proceedings.append({
+            'date': _text(cells[0]),
+            'title': title,
+            'description': _text(cells[2]) if len(cells) > 2 else '',
+            'type': _classify(title, PROCEEDING_TYPES, 'proceeding')
+        })
+    return proceedings
+
+
+def _parse_documents(table, base_url: str) -> List[Dict[str, Any]]:
+    documents = []
+    for cells in _body_rows(table):
+        if len(cells) < 2:
+            continue
+        link = cells[1].find('a', href=True)
+        title = _text(cells[1])
+        documents.append({
+            'title': title,
+            'documentType': _classify(title, DOCUMENT_TYPES, 'document'),
+            'filedDate': _text(cells[0]),
+            'downloadUrl': urljoin(base_url, link['href']) if link else None,
+            'isAvailable': link is not None,
+            'fileSize': _parse_size(_text(cells[2])) if len(cells) > 2 else None
+        })
+    return documents
+
+
+def result_region(html: str) -> str:
+    """Slice the page down to the part holding the result elements"""
+    match = TARGET_PATTERN.search(html)
+    if match is None:
+        return ''
+
+    start = html.rfind('<', 0, match.start())
+    end = html.rfind('</table>')
+    end = end + len('</table>') if end > start else len(html)
+    return html[start:end]
+
+
+def parse_case_page(html: str, base_url: str = '') -> Dict[str, Any]:
+    """Parse a case-status page into a scraper result"""
+    return extract_result(BeautifulSoup(result_region(html), HTML_PARSER, parse_only=TARGETS), base_url)
+
+
+def extract_result(soup, base_url: str = '') -> Dict[str, Any]:
+    """Build a scraper result from a parsed (or partially parsed) page"""
+    # After a strained parse the target elements sit at the top level; a full tree needs a search
+    targets = {el.get('id'): el for el in soup.find_all(True, recursive=False) if el.get('id')}
+    for target_id in (DETAILS_ID, PROCEEDINGS_ID, ORDERS_ID, NO_RECORD_ID):
+        if target_id not in targets:
+            targets[target_id] = soup.find(id=target_id)
+
+    if targets[NO_RECORD_ID] is not None:
+        return {
+            'success': False,
+            'captchaVerified': True,
+            'error': 'No case found for this number. Please verify the case number and try again.'
+        }
+
+    details_table = targets[DETAILS_ID]
+    if details_table is None:
+        return {
+            'success': False,
+            'error': 'Unrecognised response from court website'
+        }
+
+    case_detail = _parse_details(details_table)
+    proceedings_table = targets[PROCEEDINGS_ID]
+    orders_table = targets[ORDERS_ID]
+    case_detail['proceedings'] = _parse_proceedings(proceedings_table) if proceedings_table is not None else []
+
+    return {
+        'success': True,
+        'captchaVerified': True,
+        'caseDetail': case_detail,
+        'documents': _parse_documents(orders_table, base_url) if orders_table is not None else []
+    }
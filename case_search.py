@@ -0,0 +1,103 @@
+"""
+Full-text search over stored case details.
+
+Uses the index created by migration 6: an FTS5 table on SQLite, a GIN-indexed
+tsvector column on PostgreSQL. Other databases fall back to a LIKE scan.
+Results are ranked (bm25 / ts_rank_cd) and collapsed to one row per case,
+the most recently stored detail, since every lookup stores its own copy.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+MATCH_WINDOW = 2000
+
+# Column weights for bm25: petitioner, respondent, judge, current_status
+SQLITE_WEIGHTS = '10.0, 10.0, 4.0, 1.0'
+
+
+def search_terms(query: str) -> List[str]:
+    """Words of a search query, lower-cased, capped at MAX_TERMS"""
+    return [term.lower() for term in TOKEN_PATTERN.findall(query or '')][:MAX_TERMS]
+
+
+def fts5_expression(terms: List[str]) -> str:
+    """All terms must match; the last one as a prefix so partial names work as you type"""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def tsquery_expression(terms: List[str]) -> str:
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+
+# MATERIALIZED keeps SQLite from flattening bm25() into the aggregate, where it cannot run
+_SQLITE_SEARCH = f'''
+    WITH m AS MATERIALIZED (
+        SELECT rowid, bm25(case_details_fts, {SQLITE_WEIGHTS}) AS score
+        FROM case_details_fts WHERE case_details_fts MATCH :expression
+        ORDER BY score LIMIT :window
+    )
+    SELECT MAX(d.id) AS detail_id, MIN(m.score) AS score
+    FROM m
+    JOIN case_details d ON d.id = m.rowid
+    JOIN case_queries q ON q.id = d.query_id
+    GROUP BY q.court_key, q.case_type_key, q.case_number_key, q.filing_year_key
+    ORDER BY score, detail_id DESC
+    LIMIT :limit OFFSET :offset
+'''
+
+_POSTGRES_SEARCH = '''
+    SELECT MAX(d.id) AS detail_id, MAX(ts_rank_cd(d.search_vector, to_tsquery('simple', :expression))) AS score
+    FROM case_details d
+    JOIN case_queries q ON q.id = d.query_id
+    WHERE d.search_vector @@ to_tsquery('simple', :expression)
+    GROUP BY q.court_key, q.case_type_key, q.case_number_key, q.filing_year_key
+    ORDER BY score DESC, detail_id DESC
+    LIMIT :limit OFFSET :offset
+'''
+
+_LIKE_SEARCH = '''
+    SELECT MAX(d.id) AS detail_id, 0 AS score
+    FROM case_details d
+    JOIN case_queries q ON q.id = d.query_id
+    WHERE {conditions}
+    GROUP BY q.court_key, q.case_type_key, q.case_number_key, q.filing_year_key
+    ORDER BY detail_id DESC
+    LIMIT :limit OFFSET :offset
+'''
+
+
+def find_case_details(session, query: str, limit: int = 20, offset: int = 0) -> Optional[List[Dict[str, Any]]]:
+    """Ranked (detail_id, score) rows for a query; None if it has no searchable words.
+    Fetches limit + 1 rows so callers can tell whether another page exists."""
+    terms = search_terms(query)
+    if not terms:
+        return None
+
+    dialect = session.get_bind().dialect.name
+    # Only the best-ranked window of matches is joined and grouped, so broad terms stay cheap
+    params = {'limit': limit + 1, 'offset': offset, 'window': max(MATCH_WINDOW, (offset + limit + 1) * 4)}
+
+    if dialect == 'sqlite':
+        statement = text(_SQLITE_SEARCH)
+        params['expression'] = fts5_expression(terms)
+    elif dialect == 'postgresql':
+        statement = text(_POSTGRES_SEARCH)
+        params['expression'] = tsquery_expression(terms)
+    else:
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f'term{i}'] = f'%{term}%'
+            conditions.append(
+                f"(LOWER(d.petitioner) LIKE :term{i} OR LOWER(d.respondent) LIKE :term{i} "
+                f"OR LOWER(d.judge) LIKE :term{i} OR LOWER(d.current_status) LIKE :term{i})"
+            )
+        statement = text(_LIKE_SEARCH.format(conditions=' AND '.join(conditions)))
+
+    return [{'detailId': row.detail_id, 'score': row.score} for row in session.execute(statement, params)]
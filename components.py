@@ -0,0 +1,63 @@
+"""
+Lazily built application services.
+
+Components (scraper, HTTP client, caches, worker pools) are expensive to
+construct and most start threads or open files, so an app registers a
+builder for each and the first caller builds it. Importing the app, running
+a CLI command or forking server workers therefore pays only for what is
+actually used, and nothing that owns threads exists before a fork.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class Components:
+    def __init__(self, app, builders: Dict[str, Callable[[Any], Any]]):
+        self.app = app
+        self._builders = builders
+        self._built = {}
+        self._build_seconds = {}
+        self._lock = threading.RLock()  # re-entrant: builders may need other components
+
+    def get(self, name: str) -> Any:
+        """Return a component, building it on first use"""
+        component = self._built.get(name)
+        if component is not None:
+            return component
+
+        with self._lock:
+            component = self._built.get(name)
+            if component is None:
+                started = time.perf_counter()
+                component = self._builders[name](self.app)
+                self._build_seconds[name] = round(time.perf_counter() - started, 4)
+                self._built[name] = component
+        return component
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Return a component only if it has already been built"""
+        return self._built.get(name)
+
+    def close(self):
+        """Stop every built component that owns threads, newest first"""
+        with self._lock:
+            built = list(self._built.items())
+            self._built.clear()
+        for name, component in reversed(built):
+            close = getattr(component, 'close', None) or getattr(component, 'shutdown', None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                print(f"Error stopping {name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'built': sorted(self._built),
+                'buildSeconds': dict(self._build_seconds),
+                'available': sorted(self._builders)
+            }
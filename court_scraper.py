@@ -2,52 +2,64 @@ import time
 import random
 import os
 import uuid
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 import requests
+from captcha_store import CaptchaStore, MemoryCaptchaStore
+from captcha_images import CaptchaImagePool
+from document_cache import DiskDocumentStore
+from upstream_client import UpstreamClient
+from case_parser import parse_case_page
+from metrics import REGISTRY
+
+CAPTCHA_TTL = 600  # 10 minutes
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = (10, 60)  # connect, read
+DOWNLOAD_ATTEMPTS = 3
+
+PHASE_SECONDS = REGISTRY.histogram('court_scraper_phase_seconds', 'Time spent in each scraper phase', ['phase'])
 
 class CourtScraper:
-    def __init__(self):
+    def __init__(self, captcha_store: Optional[CaptchaStore] = None, captcha_images: Optional[CaptchaImagePool] = None,
+                 document_store: Optional[DiskDocumentStore] = None, prefetch_workers: int = 2,
+                 upstream_client: Optional[UpstreamClient] = None, case_status_url: Optional[str] = None):
         self.driver = None
-        self.session = requests.Session()
+        self.case_status_url = case_status_url  # court case-status page; the built-in demo data is used when unset
+        self.http = upstream_client or UpstreamClient()  # Pooled, retrying, caching upstream client
+        self.session = self.http.session
         self.captcha_images_dir = "static/images/captcha"
-        self.active_captchas = {}  # Store active CAPTCHA sessions
+        self.captcha_store = captcha_store or MemoryCaptchaStore()  # Store active CAPTCHA sessions
+        self.captcha_images = captcha_images or CaptchaImagePool()  # Pre-rendered CAPTCHA images
+        self.document_store = document_store or DiskDocumentStore(os.path.join(tempfile.gettempdir(), 'court_documents'))
+        self._prefetcher = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='document-prefetch')
+        self._downloads = {}  # url -> [Lock, threads using it], so one URL is only fetched by one thread at a time
+        self._downloads_lock = threading.Lock()
+        self._prefetched = 0
         self._setup_directories()
         
+    @PHASE_SECONDS.time('captcha_issue')
     def generate_fresh_captcha(self) -> Dict[str, Any]:
         
         # Generate unique session ID
         session_id = f"captcha_session_{uuid.uuid4().hex}"
         timestamp = int(time.time())
         
-        # Generate CAPTCHA text and corresponding image (simulate court website behavior)
-        captcha_options = [
-            {'text': 'AB5C7', 'image': '/static/images/sample_captcha.svg'},
-            {'text': 'XYZ89', 'image': '/static/images/sample_captcha_alt.svg'}, 
-            {'text': 'DEF67', 'image': '/static/images/sample_captcha_alt2.svg'},
-            {'text': '12345', 'image': '/static/images/sample_captcha.svg'}
-        ]
-        
-        selected_captcha = random.choice(captcha_options)
-        correct_captcha = selected_captcha['text']
-        captcha_path = selected_captcha['image']
-        
-        # Store CAPTCHA data for validation
-        self.active_captchas[session_id] = {
-            'correct_answer': correct_captcha,
-            'created_at': timestamp,
-            'attempts': 0,
-            'expired': False
-        }
+        # Take a pre-rendered CAPTCHA from the pool (simulate court website behavior)
+        correct_captcha, image_data, mimetype = self.captcha_images.take()
+        self.captcha_images.attach(session_id, image_data, mimetype, timestamp + CAPTCHA_TTL)
         
-        # Clean up old CAPTCHAs (expire after 10 minutes)
-        self._cleanup_expired_captchas()
+        # Store CAPTCHA data for validation; the store expires old sessions itself
+        self.captcha_store.create(session_id, correct_captcha, timestamp, CAPTCHA_TTL)
         
         return {
             'sessionId': session_id,
-            'captchaImageUrl': f"{captcha_path}?t={timestamp}&session={session_id[:8]}",
+            'captchaImageUrl': f"/api/captcha/{session_id}/image",
             'correctAnswer': correct_captcha,  # For demo purposes only
             'timestamp': timestamp,
-            'expiresIn': 600  # 10 minutes
+            'expiresIn': CAPTCHA_TTL
         }
         
     def search_case(self, search_params: Dict[str, str]) -> Dict[str, Any]:
@@ -196,15 +208,130 @@ class CourtScraper:
             ]
         }
     
-    def download_document(self, download_url: str) -> Optional[bytes]:
-       
+    @PHASE_SECONDS.time('fetch_page')
+    def fetch_page(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        """Fetch an upstream court page, revalidating cached copies instead of re-downloading"""
+        response = self.http.get(url, params=params)
+        response.raise_for_status()
+        return response.text
+    
+    def scrape_case_page(self, url: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Fetch a case-status page and parse it into a case result"""
+        html = self.fetch_page(url, params)
+        with PHASE_SECONDS.time('parse'):
+            return parse_case_page(html, base_url=url)
+    
+    def download_document(self, download_url: str) -> Optional[str]:
+        """Stream an upstream document into the disk cache; returns the cached file path"""
         try:
-            return None
+            path = self.document_store.lookup(download_url)
+            if path:
+                return path
+            
+            with self._download_lock(download_url):
+                # Another thread may have finished it while we waited
+                path = self.document_store.path(download_url)
+                if os.path.exists(path):
+                    return path
+                
+                for attempt in range(DOWNLOAD_ATTEMPTS):
+                    try:
+                        return self._fetch_to_store(download_url)
+                    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                        # The partial file is kept, so the next attempt resumes where this one stopped
+                        print(f"Document download interrupted ({attempt + 1}/{DOWNLOAD_ATTEMPTS}): {e}")
+                
+                return None
             
         except Exception as e:
             print(f"Document download error: {e}")
             return None
     
+    @contextmanager
+    def _download_lock(self, download_url: str):
+        """Hold the per-URL download lock; the entry is dropped once no thread is using it"""
+        with self._downloads_lock:
+            entry = self._downloads.get(download_url)
+            if entry is None:
+                entry = self._downloads[download_url] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._downloads_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._downloads[download_url]
+    
+    @PHASE_SECONDS.time('document_download')
+    def _fetch_to_store(self, download_url: str) -> str:
+        """Fetch a document in chunks, resuming from any partial file of the same version"""
+        partial = self.document_store.partial_path(download_url)
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        started = self.document_store.partial_metadata(download_url) if offset else {}
+        
+        # If-Range: the server sends the rest only if the document is unchanged, else all of it.
+        # A partial file with no strong validator cannot be resumed safely, so it is refetched.
+        etag = started.get('etag')
+        validator = etag if etag and not etag.startswith('W/') else started.get('lastModified')
+        headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if validator else {}
+        
+        with self.http.get(download_url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 416 and headers:
+                # The partial file already holds the whole document
+                metadata = started
+            else:
+                response.raise_for_status()
+                metadata = {
+                    'contentType': response.headers.get('Content-Type', 'application/octet-stream'),
+                    'etag': response.headers.get('ETag'),
+                    'lastModified': response.headers.get('Last-Modified')
+                }
+                append = response.status_code == 206
+                if not append:
+                    # A 200 is the whole (possibly changed) document; start over and remember its version
+                    self.document_store.start_partial(download_url, metadata)
+                self.document_store.write_partial(
+                    download_url, response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE), append=append
+                )
+        
+        return self.document_store.commit(download_url, metadata)
+    
+    def open_document_range(self, download_url: str, range_header: str) -> requests.Response:
+        """Pass a client Range request straight upstream; the caller streams and closes the response"""
+        response = self.http.get(download_url, headers={'Range': range_header}, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response
+    
+    def prefetch_documents(self, download_urls: List[str]):
+        """Download documents into the cache in the background"""
+        for url in download_urls:
+            if not url or not url.startswith(('http://', 'https://')):
+                continue
+            if os.path.exists(self.document_store.path(url)):
+                continue
+            self._prefetcher.submit(self._prefetch_one, url)
+    
+    def _prefetch_one(self, download_url: str):
+        if self.download_document(download_url):
+            with self._downloads_lock:
+                self._prefetched += 1
+    
+    def document_stats(self) -> Dict[str, Any]:
+        """Return document cache and prefetch counters"""
+        stats = self.document_store.stats()
+        with self._downloads_lock:
+            stats['prefetched'] = self._prefetched
+            stats['downloading'] = len(self._downloads)
+        return stats
+
+    def close(self):
+        """Stop background CAPTCHA rendering and prefetching and release pooled connections"""
+        self.captcha_images.stop()
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
     def _setup_directories(self):
         """Create necessary directories for CAPTCHA images"""
         if not os.path.exists(self.captcha_images_dir):
@@ -250,32 +377,50 @@ class CourtScraper:
     def submit_captcha_solution(self, captcha_solution: str, form_data: Dict[str, str], search_params: Dict[str, str]) -> Dict[str, Any]:
        
         try:
-            # Validate CAPTCHA input format
-            if not captcha_solution or len(captcha_solution.strip()) < 3:
-                return {
-                    'success': False,
-                    'error': 'Please enter a valid CAPTCHA (minimum 3 characters)'
-                }
-            
-            print(f"Processing CAPTCHA solution: {captcha_solution}")
+            rejection = self.verify_captcha(captcha_solution, form_data)
+            if rejection:
+                return rejection
             
-            # STEP 1: VALIDATE CAPTCHA FIRST
+            return self.fetch_case(search_params, captcha_solution)
             
-            captcha_valid = self._validate_captcha_solution(captcha_solution, form_data)
-            
-            if not captcha_valid:
-                # CAPTCHA is wrong - return error immediately without any case data
-                return {
-                    'success': False,
-                    'error': 'Invalid CAPTCHA. Please verify the characters and try again.',
-                    'requiresNewCaptcha': True,
-                    'message': 'CAPTCHA verification failed. A new CAPTCHA will be generated.'
-                }
-            
-            # STEP 2: CAPTCHA IS CORRECT - Now proceed with case search
-            print(f"CAPTCHA validation successful for: {captcha_solution}")
-            
-          
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'CAPTCHA verification failed: {str(e)}'
+            }
+    
+    @PHASE_SECONDS.time('captcha_validate')
+    def verify_captcha(self, captcha_solution: str, form_data: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Validate a CAPTCHA answer; returns an error response, or None when it is correct"""
+        # Validate CAPTCHA input format
+        if not captcha_solution or len(captcha_solution.strip()) < 3:
+            return {
+                'success': False,
+                'error': 'Please enter a valid CAPTCHA (minimum 3 characters)'
+            }
+        
+        print(f"Processing CAPTCHA solution: {captcha_solution}")
+        
+        if not self._validate_captcha_solution(captcha_solution, form_data):
+            # CAPTCHA is wrong - return error immediately without any case data
+            return {
+                'success': False,
+                'error': 'Invalid CAPTCHA. Please verify the characters and try again.',
+                'requiresNewCaptcha': True,
+                'message': 'CAPTCHA verification failed. A new CAPTCHA will be generated.'
+            }
+        
+        print(f"CAPTCHA validation successful for: {captcha_solution}")
+        return None
+    
+    @PHASE_SECONDS.time('fetch')
+    def fetch_case(self, search_params: Dict[str, str], captcha_solution: str = '') -> Dict[str, Any]:
+        """Fetch case details from the court site once the CAPTCHA has been verified"""
+        try:
+            if self.case_status_url:
+                # The parser marks only pages it recognised (a case or a "no record" notice) as verified;
+                # anything else is a failed lookup, never a cacheable "no such case"
+                return self.scrape_case_page(self.case_status_url, params=search_params)
             
             case_number = search_params.get('caseNumber', '').upper()
             
@@ -305,33 +450,37 @@ class CourtScraper:
         except Exception as e:
             return {
                 'success': False,
-                'error': f'CAPTCHA verification failed: {str(e)}'
+                'error': f'Unable to fetch case details: {str(e)}'
             }
     
     def _validate_captcha_solution(self, captcha_solution: str, form_data: Dict[str, str]) -> bool:
         
         try:
             session_id = form_data.get('sessionId')
-            if not session_id or session_id not in self.active_captchas:
+            captcha_data = self.captcha_store.get(session_id) if session_id else None
+            if not captcha_data:
                 print(f"Invalid or expired CAPTCHA session: {session_id}")
                 return False
             
-            captcha_data = self.active_captchas[session_id]
+            # A solved CAPTCHA authorizes one lookup (or one batch), not every later one
+            if captcha_data.get('used'):
+                print(f"CAPTCHA already used for session: {session_id}")
+                return False
             
             # Check if CAPTCHA is expired (10 minutes)
             current_time = int(time.time())
-            if current_time - captcha_data['created_at'] > 600:
+            if current_time - captcha_data['created_at'] > CAPTCHA_TTL:
                 print(f"CAPTCHA expired for session: {session_id}")
-                captcha_data['expired'] = True
+                self.captcha_store.mark(session_id, expired=True)
                 return False
             
-            # Increment attempt counter
-            captcha_data['attempts'] += 1
+            # Increment attempt counter atomically
+            attempts = self.captcha_store.record_attempt(session_id)
             
             # Block after 3 failed attempts
-            if captcha_data['attempts'] > 3:
+            if attempts is None or attempts > 3:
                 print(f"Too many attempts for session: {session_id}")
-                captcha_data['expired'] = True
+                self.captcha_store.mark(session_id, expired=True)
                 return False
             
             # Validate solution
@@ -343,25 +492,10 @@ class CourtScraper:
             
             # If valid, mark session as used
             if is_valid:
-                captcha_data['used'] = True
+                self.captcha_store.mark(session_id, used=True)
                 
             return is_valid
                 
         except Exception as e:
             print(f"CAPTCHA validation error: {e}")
             return False
-    
-    def _cleanup_expired_captchas(self):
-        """Remove expired CAPTCHA sessions"""
-        current_time = int(time.time())
-        expired_sessions = []
-        
-        for session_id, data in self.active_captchas.items():
-            if current_time - data['created_at'] > 600:  # 10 minutes
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            del self.active_captchas[session_id]
-        
-        if expired_sessions:
-            print(f"Cleaned up {len(expired_sessions)} expired CAPTCHA sessions")
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Database engine settings and read routing.
+
+SQLite connections are switched to WAL on connect, so readers no longer
+block behind a writer (and vice versa), with synchronous=NORMAL (safe in WAL
+mode; only the last transactions before a power loss can be lost), a busy
+timeout instead of immediate `database is locked` errors, memory-mapped
+reads, a larger page cache and incremental auto-vacuum. Postgres (and other
+server databases) get a sized connection pool with pre-ping and recycling,
+so connections dropped by the server or a proxy are replaced instead of
+failing a request.
+
+When a read bind is configured, views marked read-only run their queries on
+it: a replica, or the primary URL again to give reads their own pool.
+Flushes always go to the primary.
+"""
+
+from typing import Any, Dict
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READ_BIND = 'read'
+
+
+def engine_options(url: str, config) -> Dict[str, Any]:
+    """create_engine keyword arguments for a database URL"""
+    if make_url(url).get_backend_name() == 'sqlite':
+        # SQLAlchemy picks a suitable pool for SQLite; tuning happens per connection
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True
+    }
+
+
+def sqlite_pragmas(config, read_only: bool = False) -> Dict[str, Any]:
+    pragmas = {
+        'auto_vacuum': 'INCREMENTAL',  # only takes effect on a new database; see retention.py
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'cache_size': -config['SQLITE_CACHE_SIZE_KB'],  # negative means KiB rather than pages
+        'temp_store': 'MEMORY'
+    }
+    if read_only:
+        pragmas['query_only'] = 'ON'
+    return pragmas
+
+
+def tune_engine(engine, config, read_only: bool = False):
+    """Apply per-connection settings to an engine (SQLite only; other databases are tuned by engine_options)"""
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return engine
+
+    pragmas = sqlite_pragmas(config, read_only)
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    return engine
+
+
+class RoutingSession(Session):
+    """Session that sends a read-only view's queries to the read bind, if there is one"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('read_only') and not self._flushing:
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
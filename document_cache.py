@@ -0,0 +1,340 @@
+"""
+Content-addressed cache for rendered documents.
+
+Entries are keyed by document id plus a hash of the content they were
+rendered from, so a document whose details change gets a new key (and ETag)
+instead of a stale copy. A memory LRU sits in front of a directory of files
+named by that key; the disk tier survives restarts and is shared by worker
+processes on the same host. Both tiers are bounded: the disk tier evicts the
+least recently used files once it grows past max_disk_bytes.
+
+DiskDocumentStore holds documents fetched from upstream court sites. Files
+are streamed into `<key>.part` and renamed into place once complete, so an
+interrupted download can resume from the partial file, and the total size,
+partial files included, is bounded by evicting the least recently used files. The validators of the
+response a partial file came from are kept next to it (`<key>.part.json`)
+so a resume only appends bytes of the same version of the document.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class CachedDocument:
+    def __init__(self, data: bytes, etag: str, last_modified: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def content_hash(source: Dict[str, Any]) -> str:
+    """Hash the fields a document is rendered from"""
+    return hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> CachedDocument, least recently used first
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._renders = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.pdf')
+
+    def _disk_files(self):
+        """Yield (path, size, last used) for every rendered file on disk"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    def _remember(self, key: str, entry: CachedDocument):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.data)
+            self._entries[key] = entry
+            self._bytes += len(entry.data)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                self._evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[CachedDocument]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            last_modified = os.path.getmtime(path)
+            os.utime(path, (time.time(), last_modified))  # atime is the LRU clock; mtime stays the render time
+            return CachedDocument(data, key, last_modified)
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> Optional[float]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            last_modified = os.path.getmtime(path)
+        except OSError as e:
+            print(f"Document cache write error: {e}")
+            return None
+
+        with self._lock:
+            self._disk_bytes += len(data)
+        self._enforce_disk_limit(keep=path)
+        return last_modified
+
+    def _enforce_disk_limit(self, keep: str):
+        with self._lock:
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+
+            # Other worker processes share the directory, so recount from the files themselves
+            files = sorted(self._disk_files(), key=lambda f: f[2])
+            self._disk_bytes = sum(size for _, size, _ in files)
+            for path, size, _ in files:
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._disk_bytes -= size
+                self._disk_evictions += 1
+
+    def get_or_render(self, doc_id: Any, source: Dict[str, Any], render: Callable[[], bytes]) -> CachedDocument:
+        """Return the cached rendering of a document, rendering it on a miss"""
+        key = hashlib.sha256(f'{doc_id}:{content_hash(source)}'.encode('utf-8')).hexdigest()[:40]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self._disk_hits += 1
+        else:
+            data = render()
+            last_modified = self._write_disk(key, data) or time.time()
+            entry = CachedDocument(data, key, last_modified)
+            with self._lock:
+                self._renders += 1
+
+        self._remember(key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'directory': self.directory,
+                'diskBytes': self._disk_bytes,
+                'maxDiskBytes': self.max_disk_bytes,
+                'hits': self._hits,
+                'diskHits': self._disk_hits,
+                'renders': self._renders,
+                'evictions': self._evictions,
+                'diskEvictions': self._disk_evictions
+            }
+
+
+class DiskDocumentStore:
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stored = 0
+        self._evictions = 0
+        self._writing = set()  # partial files being written, never evicted
+
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(os.path.getsize(path) for path in self._files())
+
+    def key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:40]
+
+    def path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url))
+
+    def partial_path(self, url: str) -> str:
+        return self.path(url) + '.part'
+
+    def _files(self):
+        """Complete and partial documents; both count towards max_bytes"""
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                yield os.path.join(self.directory, name)
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Return the path of a complete cached document, or None"""
+        path = self.path(url)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # mtime doubles as the LRU clock
+            except OSError:
+                pass
+            with self._lock:
+                self._hits += 1
+            return path
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def metadata(self, url: str) -> Dict[str, Any]:
+        """Return the upstream headers recorded with a document"""
+        try:
+            with open(self.path(url) + '.json') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def partial_metadata(self, url: str) -> Dict[str, Any]:
+        """Return the upstream headers recorded when a partial download started"""
+        try:
+            with open(self.partial_path(url) + '.json') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def start_partial(self, url: str, metadata: Dict[str, Any]):
+        """Record the upstream headers of a download written from the start"""
+        with open(self.partial_path(url) + '.json', 'w') as f:
+            json.dump(metadata, f)
+
+    def write_partial(self, url: str, chunks: Iterable[bytes], append: bool):
+        """Stream chunks into the partial file, counting every byte against max_bytes"""
+        partial = self.partial_path(url)
+        with self._lock:
+            if append and not os.path.exists(partial):
+                raise ValueError('Partial download was evicted before it could be resumed')
+            self._writing.add(partial)
+            if not append and os.path.exists(partial):
+                self._bytes -= os.path.getsize(partial)
+        try:
+            with open(partial, 'ab' if append else 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    with self._lock:
+                        self._bytes += len(chunk)
+                    if not self._enforce_limit(keep=partial):
+                        raise ValueError(f'Document is larger than the document store ({self.max_bytes} bytes)')
+        except ValueError:
+            self.discard_partial(url)
+            raise
+        finally:
+            with self._lock:
+                self._writing.discard(partial)
+
+    def discard_partial(self, url: str):
+        """Remove a partial download and its recorded headers"""
+        partial = self.partial_path(url)
+        try:
+            size = os.path.getsize(partial)
+            os.remove(partial)
+        except OSError:
+            return
+        with self._lock:
+            self._bytes -= size
+        try:
+            os.remove(partial + '.json')
+        except OSError:
+            pass
+
+    def commit(self, url: str, metadata: Dict[str, Any]) -> str:
+        """Move a completed partial download into place; returns its path"""
+        path = self.path(url)
+        with open(path + '.json', 'w') as f:
+            json.dump(metadata, f)
+        os.replace(self.partial_path(url), path)  # its bytes were counted as they were written
+        try:
+            os.remove(self.partial_path(url) + '.json')
+        except OSError:
+            pass
+
+        with self._lock:
+            self._stored += 1
+        return path
+
+    def _enforce_limit(self, keep: str) -> bool:
+        """Evict least recently used files until under max_bytes; False if in-progress downloads alone exceed it"""
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return True
+
+            files = sorted(self._files(), key=lambda p: os.path.getmtime(p))
+            for path in files:
+                if self._bytes <= self.max_bytes:
+                    break
+                if path == keep or path in self._writing:
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    if os.path.exists(path + '.json'):
+                        os.remove(path + '.json')
+                except OSError:
+                    continue
+                self._bytes -= size
+                self._evictions += 1
+            return self._bytes <= self.max_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stored': self._stored,
+                'evictions': self._evictions
+            }
@@ -0,0 +1,144 @@
+"""
+In-process publish/subscribe for pushing updates to browsers.
+
+Publishers call `publish` after their transaction commits; every subscriber
+whose filter matches gets the event on its own bounded queue, and the SSE
+endpoint drains that queue into a text/event-stream response. Recent events
+are kept in a ring buffer so a reconnecting client can replay what it missed
+from its Last-Event-ID. Event ids carry a per-process token, so an id issued
+by another worker process (or before a restart) is recognised as unknown and
+the client is told to resync instead of silently missing updates.
+"""
+
+import json
+import queue
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Event:
+    def __init__(self, event_id: str, seq: int, event_type: str, data: Dict[str, Any], query_id: Optional[int]):
+        self.id = event_id
+        self.seq = seq
+        self.type = event_type
+        self.data = data
+        self.query_id = query_id
+
+    def encode(self) -> str:
+        """The event in text/event-stream framing"""
+        return f'id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n'
+
+
+class Subscription:
+    def __init__(self, query_ids: Iterable[int], history: bool, max_queued: int):
+        self.query_ids = set(query_ids)
+        self.history = history
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.overflowed = False
+        self.start_seq = 0  # events up to here were published before the subscription existed
+
+    def wants(self, event: Event) -> bool:
+        if event.type == 'history':
+            return self.history
+        return event.query_id in self.query_ids
+
+    def get(self, timeout: float) -> Optional[Event]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    def __init__(self, replay_size: int = 1000, max_queued: int = 256, max_subscribers: int = 1000):
+        self.token = uuid.uuid4().hex[:8]
+        self.max_queued = max_queued
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._recent = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._versions = OrderedDict()  # (type, query id) -> last published version, for de-duplication
+        self._published = 0
+        self._duplicates = 0
+        self._dropped = 0
+        self._rejected = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any], query_id: Optional[int] = None,
+                version: Optional[str] = None) -> Optional[Event]:
+        """Deliver an event to matching subscribers; a repeated version of the same row is skipped"""
+        with self._lock:
+            if version is not None:
+                key = (event_type, query_id)
+                if self._versions.get(key) == version:
+                    self._duplicates += 1
+                    return None
+                self._versions[key] = version
+                self._versions.move_to_end(key)
+                while len(self._versions) > self._recent.maxlen:
+                    self._versions.popitem(last=False)
+
+            self._seq += 1
+            event = Event(self.event_id(self._seq), self._seq, event_type, data, query_id)
+            self._recent.append(event)
+            self._published += 1
+            subscribers = [sub for sub in self._subscribers if sub.wants(event)]
+
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                # A stalled client is told to resync rather than holding events without bound
+                sub.overflowed = True
+                with self._lock:
+                    self._dropped += 1
+        return event
+
+    def subscribe(self, query_ids: Iterable[int] = (), history: bool = False) -> Optional[Subscription]:
+        """Register a subscriber, or None when the subscriber limit is reached"""
+        sub = Subscription(query_ids, history, self.max_queued)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._rejected += 1
+                return None
+            sub.start_seq = self._seq
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def replay(self, sub: Subscription, last_event_id: str) -> Optional[List[Event]]:
+        """Events after last_event_id that match a subscription, or None if they are no longer known"""
+        token, _, seq = last_event_id.partition('-')
+        if token != self.token or not seq.isdigit():
+            return None
+
+        with self._lock:
+            recent = list(self._recent)
+        seq = int(seq)
+        if recent and recent[0].seq > seq + 1:
+            return None
+        return [event for event in recent if event.seq > seq and sub.wants(event)]
+
+    def event_id(self, seq: int) -> str:
+        return f'{self.token}-{seq}'
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'maxSubscribers': self.max_subscribers,
+                'published': self._published,
+                'duplicatesSkipped': self._duplicates,
+                'dropped': self._dropped,
+                'rejected': self._rejected,
+                'replayBuffer': len(self._recent)
+            }
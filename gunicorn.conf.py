@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for the production server (see start_server.py).
+
+The app is loaded once in the master and forked into the workers. The
+master creates the schema and applies migrations before any worker starts.
+Each worker builds its scraper, caches and job queue on first use. On
+SIGTERM (or SIGHUP for a reload), workers stop accepting connections and
+let running requests and scrape jobs finish within graceful_timeout.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# Threaded workers: an open event stream (/api/events) holds a thread, not a whole process.
+# The app caps streams at WEB_THREADS - EVENTS_RESERVED_THREADS so ordinary requests always get one.
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 32))
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('MAX_REQUESTS', 0))  # recycle workers after this many requests; 0 never
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    """Create tables and apply migrations once, before workers are forked"""
+    if os.getenv('INIT_DB_ON_START', 'true').lower() != 'true':
+        return
+
+    from app import create_app, db, init_db
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+        # Connections opened here must not be inherited by the workers
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    """Resume stored scrape jobs in each worker. Only jobs whose lease has lapsed are
+    requeued, so jobs a sibling worker is still running are left alone."""
+    from app import start_background_work
+
+    start_background_work(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from app import stop_background_work
+
+    stop_background_work(worker.wsgi)
@@ -0,0 +1,139 @@
+"""
+Background job queue for court lookups.
+
+Jobs themselves live in the database (see ScrapeJob in app.py) so queued work
+survives a restart; this module owns the bounded worker pool that runs them
+and keeps queue depth / wait time statistics. A job is handed to the pool at
+most once per process at a time, and an optional maintenance task (lease
+renewal and recovery, in app.py) runs periodically next to the pool.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds its maximum number of waiting jobs"""
+
+
+class JobQueue:
+    def __init__(self, app, runner: Callable[[int], None], max_workers: int = 4, max_pending: int = 500):
+        self.app = app
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-worker')
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'  # recorded on claimed jobs
+        self._lock = threading.Lock()
+        self._queued = set()  # job ids waiting in this process
+        self._active = set()  # job ids running in this process
+        self._stopped = threading.Event()
+        self._maintenance = None
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+
+    def has_capacity(self) -> bool:
+        """Check whether another job can be accepted right now"""
+        with self._lock:
+            return self._pending < self.max_pending
+
+    def submit(self, job_id: int, enqueued_at: Optional[float] = None) -> bool:
+        """Hand a stored job to the worker pool; returns False if it is already queued or running here"""
+        with self._lock:
+            if job_id in self._queued or job_id in self._active:
+                return False
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f'Job queue is full ({self.max_pending} jobs waiting)')
+            self._pending += 1
+            self._queued.add(job_id)
+
+        self._executor.submit(self._run, job_id, enqueued_at or time.time())
+        return True
+
+    def running_jobs(self) -> List[int]:
+        """Ids of the jobs this process is running right now"""
+        with self._lock:
+            return sorted(self._active)
+
+    def start_maintenance(self, task: Callable[['JobQueue'], None], interval: float):
+        """Call task(queue) in an app context every `interval` seconds until shutdown"""
+        def loop():
+            while not self._stopped.wait(interval):
+                try:
+                    with self.app.app_context():
+                        task(self)
+                except Exception as e:
+                    print(f"Job queue maintenance error: {e}")
+
+        self._maintenance = threading.Thread(target=loop, name='job-maintenance', daemon=True)
+        self._maintenance.start()
+
+    def _run(self, job_id: int, enqueued_at: float):
+        started_at = time.time()
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+            self._queued.discard(job_id)
+            self._active.add(job_id)
+            self._wait_times.append(max(0.0, started_at - enqueued_at))
+
+        succeeded = False
+        try:
+            with self.app.app_context():
+                self.runner(job_id)
+            succeeded = True
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._active.discard(job_id)
+                self._run_times.append(time.time() - started_at)
+                if succeeded:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, throughput counters and wait/run time summaries"""
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                'workers': self.max_workers,
+                'maxPending': self.max_pending,
+                'pending': self._pending,
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'waitSeconds': _summarize(wait_times),
+                'runSeconds': _summarize(run_times)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        self._stopped.set()
+        self._executor.shutdown(wait=wait)
+
+
+def _summarize(values) -> Dict[str, float]:
+    """Summarize a sorted list of durations"""
+    if not values:
+        return {'avg': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+    return {
+        'avg': round(sum(values) / len(values), 3),
+        'p50': round(values[int(len(values) * 0.50)], 3),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        'max': round(values[-1], 3)
+    }
@@ -0,0 +1,260 @@
+"""
+Lightweight schema migrations.
+
+db.create_all() creates missing tables but never changes existing ones, so
+indexes and columns added after a database was first created are applied
+here. Each migration runs once per database, in version order, and is
+recorded in the schema_migrations table. Migrations are written to be
+idempotent so they are also safe on a database freshly built by create_all().
+
+A store that can live in a database of its own (CAPTCHA_STORE_URL,
+RATELIMIT_STORAGE_URL) tags its migrations with that database's name as well
+as 'app'; run_migrations(engine, 'captcha') then applies just those to the
+separate database.
+"""
+
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+
+MIGRATIONS: List[Tuple[int, str, Callable, Tuple[str, ...]]] = []
+
+
+def migration(version: int, description: str, databases: Tuple[str, ...] = ('app',)):
+    """Register a migration function taking an open connection"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn, databases))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def create_index(conn, name: str, table: str, columns: str):
+    """Create an index unless it already exists"""
+    conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+
+
+def add_column(conn, table: str, column: str, ddl: str):
+    """Add a column unless the table already has it"""
+    existing = {col['name'] for col in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def run_migrations(engine, database: str = 'app') -> List[int]:
+    """Apply all pending migrations for a database; returns the versions applied"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)'
+        ))
+        applied = {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+    newly_applied = []
+    for version, description, fn, databases in MIGRATIONS:
+        if version in applied or database not in databases:
+            continue
+
+        # One transaction per migration so a failure leaves earlier ones recorded
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': version, 'd': description, 't': datetime.utcnow()}
+            )
+        newly_applied.append(version)
+        print(f"Applied migration {version}: {description}")
+
+    return newly_applied
+
+
+@migration(1, 'Index case_queries by created_at, status and case key; index foreign keys')
+def _index_case_queries(conn):
+    create_index(conn, 'ix_case_queries_created_at', 'case_queries', 'created_at')
+    create_index(conn, 'ix_case_queries_status', 'case_queries', 'status')
+    create_index(conn, 'ix_case_queries_case_key', 'case_queries', 'court, case_type, case_number, filing_year')
+    create_index(conn, 'ix_case_details_query_id', 'case_details', 'query_id')
+    create_index(conn, 'ix_case_documents_case_detail_id', 'case_documents', 'case_detail_id')
+    create_index(conn, 'ix_scrape_jobs_status', 'scrape_jobs', 'status')
+
+
+@migration(2, 'Normalize stored case keys (superseded by migration 8)')
+def _normalize_case_keys(conn):
+    # This used to rewrite the display columns in place; migration 8 stores the
+    # normalized key in columns of its own instead, leaving what users entered intact
+    pass
+
+
+@migration(3, 'Store a materialized response snapshot on terminal queries')
+def _add_query_snapshots(conn):
+    add_column(conn, 'case_queries', 'snapshot', 'TEXT')
+    add_column(conn, 'case_queries', 'snapshot_etag', 'VARCHAR(40)')
+
+
+@migration(4, 'Track updated_at on case_queries for history deltas; keyset indexes')
+def _add_query_updated_at(conn):
+    add_column(conn, 'case_queries', 'updated_at', 'TIMESTAMP')
+    conn.execute(text('UPDATE case_queries SET updated_at = COALESCE(completed_at, created_at) WHERE updated_at IS NULL'))
+    create_index(conn, 'ix_case_queries_created_id', 'case_queries', 'created_at, id')
+    create_index(conn, 'ix_case_queries_updated_id', 'case_queries', 'updated_at, id')
+
+
+def _parse_date(value):
+    for date_format in ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime((value or '').strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+@migration(5, 'Move case proceedings from a JSON column into the case_proceedings table')
+def _normalize_proceedings(conn):
+    create_index(conn, 'ix_case_proceedings_date_case', 'case_proceedings', 'date, case_detail_id')
+    create_index(conn, 'ix_case_proceedings_case_position', 'case_proceedings', 'case_detail_id, position')
+
+    # Databases created after the change never had the JSON column
+    if 'proceedings' not in {col['name'] for col in inspect(conn).get_columns('case_details')}:
+        return
+
+    rows = conn.execute(text(
+        'SELECT id, proceedings FROM case_details WHERE proceedings IS NOT NULL '
+        'AND id NOT IN (SELECT DISTINCT case_detail_id FROM case_proceedings)'
+    )).fetchall()
+
+    batch = []
+    for case_detail_id, raw in rows:
+        try:
+            proceedings = json.loads(raw) or []
+        except ValueError:
+            continue
+        for position, proceeding in enumerate(proceedings):
+            batch.append({
+                'case_detail_id': case_detail_id,
+                'position': position,
+                'date': _parse_date(proceeding.get('date')),
+                'date_text': proceeding.get('date'),
+                'title': proceeding.get('title'),
+                'description': proceeding.get('description'),
+                'proceeding_type': proceeding.get('type')
+            })
+
+    if batch:
+        conn.execute(text(
+            'INSERT INTO case_proceedings '
+            '(case_detail_id, position, date, date_text, title, description, proceeding_type) '
+            'VALUES (:case_detail_id, :position, :date, :date_text, :title, :description, :proceeding_type)'
+        ), batch)
+
+    # The rows are the source of truth now; free the duplicated JSON
+    conn.execute(text('UPDATE case_details SET proceedings = NULL'))
+
+
+FTS_COLUMNS = ['petitioner', 'respondent', 'judge', 'current_status']
+
+
+@migration(6, 'Full-text index over case parties, judges and statuses')
+def _add_case_search(conn):
+    if conn.dialect.name == 'sqlite':
+        # External-content FTS5 table kept in sync with case_details by triggers
+        columns = ', '.join(FTS_COLUMNS)
+        new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+        old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+        conn.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS case_details_fts USING fts5({columns}, '
+            "content='case_details', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            'CREATE TRIGGER IF NOT EXISTS case_details_fts_insert AFTER INSERT ON case_details BEGIN '
+            f'INSERT INTO case_details_fts(rowid, {columns}) VALUES (new.id, {new_values}); END'
+        ))
+        conn.execute(text(
+            'CREATE TRIGGER IF NOT EXISTS case_details_fts_delete AFTER DELETE ON case_details BEGIN '
+            f"INSERT INTO case_details_fts(case_details_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        ))
+        conn.execute(text(
+            f'CREATE TRIGGER IF NOT EXISTS case_details_fts_update AFTER UPDATE OF {columns} ON case_details BEGIN '
+            f"INSERT INTO case_details_fts(case_details_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO case_details_fts(rowid, {columns}) VALUES (new.id, {new_values}); END'
+        ))
+        conn.execute(text("INSERT INTO case_details_fts(case_details_fts) VALUES ('rebuild')"))
+
+    elif conn.dialect.name == 'postgresql':
+        # A generated tsvector column stays in sync without triggers; parties rank above judge and status
+        add_column(conn, 'case_details', 'search_vector', (
+            "tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(petitioner, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(respondent, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(judge, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(current_status, '')), 'C')"
+            ") STORED"
+        ))
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_case_details_search_vector ON case_details USING GIN (search_vector)'
+        ))
+
+
+@migration(7, 'Lease running scrape jobs to a worker so recovery only requeues abandoned ones')
+def _add_job_leases(conn):
+    add_column(conn, 'scrape_jobs', 'claimed_by', 'VARCHAR(100)')
+    add_column(conn, 'scrape_jobs', 'lease_expires_at', 'TIMESTAMP')
+
+
+@migration(8, 'Key case_queries on separate normalized columns; keep the display columns as entered')
+def _add_case_key_columns(conn):
+    from result_cache import make_cache_key
+
+    for column, ddl in (('court_key', 'VARCHAR(50)'), ('case_type_key', 'VARCHAR(50)'),
+                        ('case_number_key', 'VARCHAR(100)'), ('filing_year_key', 'VARCHAR(10)')):
+        add_column(conn, 'case_queries', column, ddl)
+
+    rows = conn.execute(text(
+        'SELECT id, court, case_type, case_number, filing_year FROM case_queries WHERE court_key IS NULL'
+    )).all()
+    keys = []
+    for row in rows:
+        court, case_type, case_number, filing_year = make_cache_key({
+            'court': row.court or '', 'caseType': row.case_type or '',
+            'caseNumber': row.case_number or '', 'filingYear': row.filing_year or ''
+        })
+        keys.append({'id': row.id, 'court': court, 'case_type': case_type,
+                     'case_number': case_number, 'filing_year': filing_year})
+    if keys:
+        conn.execute(text(
+            'UPDATE case_queries SET court_key = :court, case_type_key = :case_type, '
+            'case_number_key = :case_number, filing_year_key = :filing_year WHERE id = :id'
+        ), keys)
+
+    # Migration 1 built this index over the display columns
+    conn.execute(text('DROP INDEX IF EXISTS ix_case_queries_case_key'))
+    create_index(conn, 'ix_case_queries_case_key', 'case_queries',
+                 'court_key, case_type_key, case_number_key, filing_year_key')
+
+
+@migration(9, 'CAPTCHA session table for the database-backed store', databases=('app', 'captcha'))
+def _create_captcha_sessions(conn):
+    from captcha_store import captcha_sessions
+
+    captcha_sessions.create(conn, checkfirst=True)
+
+
+@migration(10, 'Rate-limit counter table for the database-backed limiter storage', databases=('app', 'ratelimit'))
+def _create_rate_limits(conn):
+    from rate_limit_storage import rate_limits
+
+    rate_limits.create(conn, checkfirst=True)
+
+
+@migration(11, 'Lease table that lets one process at a time run retention passes')
+def _create_maintenance_leases(conn):
+    from retention import maintenance_leases
+
+    maintenance_leases.create(conn, checkfirst=True)
+
+
+@migration(12, 'Let queries answered from the cache point at the stored result instead of copying it')
+def _add_source_query(conn):
+    add_column(conn, 'case_queries', 'source_query_id', 'INTEGER')
+    create_index(conn, 'ix_case_queries_source_query_id', 'case_queries', 'source_query_id')
@@ -0,0 +1,134 @@
+"""
+Minimal PDF writer.
+
+Builds text-only PDF 1.4 files with a correct cross-reference table: object
+offsets and stream lengths are measured from the bytes actually written, so
+viewers never have to repair the file. Long lines are wrapped and content
+that does not fit on one page flows onto further pages.
+"""
+
+from typing import List, Optional
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 50
+FONT_SIZE = 12
+LEADING = 16
+HEADING_SIZE = 14
+WRAP_WIDTH = 90  # characters per line of 12pt Helvetica on a Letter page
+
+
+def escape_text(text: str) -> bytes:
+    """Encode text as the body of a PDF literal string"""
+    data = text.encode('latin-1', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def wrap_line(line: str, width: int = WRAP_WIDTH) -> List[str]:
+    """Split a line on word boundaries so it fits the page width"""
+    if len(line) <= width:
+        return [line]
+
+    wrapped = []
+    current = ''
+    for word in line.split(' '):
+        while len(word) > width:
+            if current:
+                wrapped.append(current)
+                current = ''
+            wrapped.append(word[:width])
+            word = word[width:]
+        candidate = f'{current} {word}' if current else word
+        if len(candidate) > width:
+            wrapped.append(current)
+            current = word
+        else:
+            current = candidate
+    wrapped.append(current)
+    return wrapped
+
+
+class PdfWriter:
+    def __init__(self, title: Optional[str] = None):
+        self.title = title
+        self._objects: List[bytes] = []
+
+    def _add(self, body: bytes) -> int:
+        """Add an object body; returns its object number"""
+        self._objects.append(body)
+        return len(self._objects)
+
+    def _stream(self, content: bytes) -> bytes:
+        return b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content)
+
+    def _page_content(self, lines: List[str], heading: Optional[str]) -> bytes:
+        ops = [b'BT', b'%d %d Td' % (MARGIN, PAGE_HEIGHT - MARGIN), b'%d TL' % LEADING]
+        if heading:
+            ops.append(b'/F2 %d Tf' % HEADING_SIZE)
+            ops.append(b'(%s) Tj T*' % escape_text(heading))
+        ops.append(b'/F1 %d Tf' % FONT_SIZE)
+        for line in lines:
+            ops.append(b'(%s) Tj T*' % escape_text(line))
+        ops.append(b'ET')
+        return b'\n'.join(ops)
+
+    def render(self, lines: List[str], heading: Optional[str] = None) -> bytes:
+        """Render lines of text (wrapped and paginated) to PDF bytes"""
+        self._objects = []
+        wrapped = [part for line in lines for part in wrap_line(line)]
+
+        per_page = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+        first_page = per_page - 1 if heading else per_page
+        pages = [wrapped[:first_page]]
+        for start in range(first_page, len(wrapped), per_page):
+            pages.append(wrapped[start:start + per_page])
+
+        # Fixed objects first so pages can refer to them by number
+        catalog = self._add(b'')
+        pages_root = self._add(b'')
+        regular = self._add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        bold = self._add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+        kids = []
+        for number, page_lines in enumerate(pages):
+            content = self._add(self._stream(self._page_content(page_lines, heading if number == 0 else None)))
+            kids.append(self._add(
+                b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+                b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>'
+                % (pages_root, PAGE_WIDTH, PAGE_HEIGHT, content, regular, bold)
+            ))
+
+        self._objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_root
+        self._objects[pages_root - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % kid for kid in kids), len(kids)
+        )
+
+        info = None
+        if self.title:
+            info = self._add(b'<< /Title (%s) /Producer (Case Information Lookup) >>' % escape_text(self.title))
+
+        return self._serialize(catalog, info)
+
+    def _serialize(self, root: int, info: Optional[int]) -> bytes:
+        out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(self._objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+        xref_offset = len(out)
+        out += b'xref\n0 %d\n' % (len(self._objects) + 1)
+        out += b'0000000000 65535 f \n'
+        for offset in offsets:
+            out += b'%010d 00000 n \n' % offset
+
+        trailer = b'/Size %d /Root %d 0 R' % (len(self._objects) + 1, root)
+        if info:
+            trailer += b' /Info %d 0 R' % info
+        out += b'trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n' % (trailer, xref_offset)
+        return bytes(out)
+
+
+def render_text_pdf(lines: List[str], heading: Optional[str] = None, title: Optional[str] = None) -> bytes:
+    """Render a text document to PDF bytes"""
+    return PdfWriter(title=title).render(lines, heading=heading)
@@ -0,0 +1,325 @@
+"""
+Rate-limit counter storage for Flask-Limiter.
+
+Both backends implement the `limits` storage interface, including the
+sliding-window-counter strategy, and register a URI scheme so they can be
+selected with RATELIMIT_STORAGE_URI.
+
+BoundedMemoryStorage (`bounded-memory://`) keeps exact counters for at most
+`max_keys` keys, least recently used first out. Evicted counters are folded
+into a count-min sketch, a fixed-size table that can only over-estimate, so
+the long tail of occasional clients costs constant memory and is never
+under-counted by more than what expires with the sketch's rotation. A tail
+key that becomes active again is promoted back to an exact counter.
+
+DatabaseStorage (`app-database://`) keeps counters in a table of the app
+database (or any SQLAlchemy engine), so every worker process shares them.
+Increments are a single upsert, which is atomic across processes. The table
+is created by migration 10 (`flask init-db`).
+"""
+
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from math import floor
+from typing import Any, Dict, List, Optional, Tuple
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, delete, func, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+
+class _SlidingWindowCounter(SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Sliding window counter on top of incr/decr and a two-key read"""
+
+    def _window_counts(self, keys: List[str]) -> List[int]:
+        return [self.get(key) for key in keys]
+
+    def _window(self, key: str, expiry: int, now: float) -> Tuple[str, int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, current_count = self._window_counts([previous_key, current_key])
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        current_key, previous_count, previous_ttl, current_count, _ = self._window(key, expiry, now)
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if floor(previous_count * previous_ttl / expiry + current_count) > limit:
+            # A concurrent hit got there first; give the entry back
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        _, previous_count, previous_ttl, current_count, current_ttl = self._window(key, expiry, time.time())
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
+
+
+class CountMinSketch:
+    """Approximate counts in width x depth cells; estimates never fall below the true count"""
+
+    def __init__(self, width: int = 16384, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('q', bytes(8 * width)) for _ in range(depth)]
+
+    def _cells(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[i * 8:(i + 1) * 8], 'little') % self.width for i in range(self.depth)]
+
+    def add(self, key: str, amount: int):
+        for row, cell in zip(self._rows, self._cells(key)):
+            row[cell] += amount
+
+    def estimate(self, key: str) -> int:
+        return min(row[cell] for row, cell in zip(self._rows, self._cells(key)))
+
+    def nbytes(self) -> int:
+        return sum(row.itemsize * len(row) for row in self._rows)
+
+
+class BoundedMemoryStorage(_SlidingWindowCounter, Storage):
+    STORAGE_SCHEME = ['bounded-memory']
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, max_keys: int = 100000,
+                 sketch_width: int = 16384, sketch_depth: int = 4, **options):
+        self.max_keys = int(max_keys)
+        self._counters = OrderedDict()  # key -> [count, expires_at, base taken from the sketch]
+        self._sketches = [CountMinSketch(int(sketch_width), int(sketch_depth)) for _ in range(2)]
+        self._rotated_at = time.time()
+        self._period = 60.0  # longest limit window seen; the sketch forgets after one to two of these
+        self._lock = threading.Lock()
+        self._spilled = 0
+        self._promoted = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _estimate(self, key: str, now: float) -> int:
+        if now - self._rotated_at >= self._period:
+            # Start a fresh generation; estimates read the current and previous one
+            self._sketches = [CountMinSketch(self._sketches[0].width, self._sketches[0].depth), self._sketches[0]]
+            self._rotated_at = now
+        return self._sketches[0].estimate(key) + self._sketches[1].estimate(key)
+
+    def _entry(self, key: str, now: float) -> Optional[list]:
+        entry = self._counters.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._counters[key]
+            return None
+        return entry
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            self._period = max(self._period, float(expiry))
+            entry = self._entry(key, now)
+            if entry is None:
+                base = self._estimate(key, now)
+                if base:
+                    self._promoted += 1
+                entry = self._counters[key] = [base, now + expiry, base]
+                while len(self._counters) > self.max_keys:
+                    evicted_key, (count, expires_at, evicted_base) = self._counters.popitem(last=False)
+                    if expires_at > now and count > evicted_base:
+                        self._sketches[0].add(evicted_key, count - evicted_base)
+                        self._spilled += 1
+            entry[0] += amount
+            self._counters.move_to_end(key)
+            return entry[0]
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._entry(key, time.time())
+            if entry is None:
+                return 0
+            entry[0] = max(entry[0] - amount, 0)
+            return entry[0]
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._entry(key, now)
+            return entry[0] if entry is not None else self._estimate(key, now)
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self._lock:
+            entry = self._entry(key, now)
+            return entry[1] if entry is not None else self._rotated_at + self._period
+
+    def check(self) -> bool:
+        return True
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            cleared = len(self._counters)
+            self._counters.clear()
+            width, depth = self._sketches[0].width, self._sketches[0].depth
+            self._sketches = [CountMinSketch(width, depth) for _ in range(2)]
+            return cleared
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'bounded-memory',
+                'exactKeys': len(self._counters),
+                'maxKeys': self.max_keys,
+                'spilledToSketch': self._spilled,
+                'promotedFromSketch': self._promoted,
+                'sketchBytes': sum(sketch.nbytes() for sketch in self._sketches),
+                'sketchPeriodSeconds': self._period
+            }
+
+
+metadata = MetaData()
+
+rate_limits = Table(
+    'rate_limits',
+    metadata,
+    Column('key', String(255), primary_key=True),
+    Column('hits', Integer, nullable=False),
+    Column('expires_at', Float, nullable=False, index=True)
+)
+
+
+class DatabaseStorage(_SlidingWindowCounter, Storage):
+    STORAGE_SCHEME = ['app-database']
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, engine=None,
+                 cleanup_interval: int = 60, **options):
+        if engine is None:
+            raise ValueError('DatabaseStorage needs an engine (storage option "engine")')
+        self.engine = engine
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = time.time()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    def _upsert(self, key: str, expiry: float, amount: int, now: float):
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            return None
+
+        expired = rate_limits.c.expires_at <= now
+        return insert(rate_limits).values(key=key, hits=amount, expires_at=now + expiry).on_conflict_do_update(
+            index_elements=[rate_limits.c.key],
+            set_={
+                'hits': case((expired, amount), else_=rate_limits.c.hits + amount),
+                'expires_at': case((expired, now + expiry), else_=rate_limits.c.expires_at)
+            }
+        ).returning(rate_limits.c.hits)
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        if now - self._last_cleanup > self.cleanup_interval:
+            self.cleanup()
+
+        statement = self._upsert(key, expiry, amount, now)
+        with self.engine.begin() as conn:
+            if statement is not None:
+                return conn.execute(statement).scalar()
+
+            # Other databases: update, else insert (a racing insert retries as an update)
+            hits = conn.execute(
+                update(rate_limits).where(rate_limits.c.key == key, rate_limits.c.expires_at > now)
+                .values(hits=rate_limits.c.hits + amount).returning(rate_limits.c.hits)
+            ).scalar()
+            if hits is not None:
+                return hits
+            conn.execute(delete(rate_limits).where(rate_limits.c.key == key))
+            try:
+                with conn.begin_nested():
+                    conn.execute(rate_limits.insert().values(key=key, hits=amount, expires_at=now + expiry))
+                return amount
+            except IntegrityError:
+                return conn.execute(
+                    update(rate_limits).where(rate_limits.c.key == key)
+                    .values(hits=rate_limits.c.hits + amount).returning(rate_limits.c.hits)
+                ).scalar()
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self.engine.begin() as conn:
+            hits = conn.execute(
+                update(rate_limits).where(rate_limits.c.key == key)
+                .values(hits=case((rate_limits.c.hits > amount, rate_limits.c.hits - amount), else_=0))
+                .returning(rate_limits.c.hits)
+            ).scalar()
+        return hits or 0
+
+    def _window_counts(self, keys: List[str]) -> List[int]:
+        # Both windows in one round trip
+        with self.engine.connect() as conn:
+            rows = dict(conn.execute(
+                select(rate_limits.c.key, rate_limits.c.hits)
+                .where(rate_limits.c.key.in_(keys), rate_limits.c.expires_at > time.time())
+            ).all())
+        return [rows.get(key, 0) for key in keys]
+
+    def get(self, key: str) -> int:
+        return self._window_counts([key])[0]
+
+    def get_expiry(self, key: str) -> float:
+        with self.engine.connect() as conn:
+            expires_at = conn.execute(select(rate_limits.c.expires_at).where(rate_limits.c.key == key)).scalar()
+        return expires_at if expires_at and expires_at > time.time() else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def clear(self, key: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(rate_limits).where(rate_limits.c.key == key))
+
+    def reset(self) -> Optional[int]:
+        with self.engine.begin() as conn:
+            return conn.execute(delete(rate_limits)).rowcount
+
+    def cleanup(self) -> int:
+        """Remove expired counters; returns how many were removed"""
+        self._last_cleanup = time.time()
+        with self.engine.begin() as conn:
+            return conn.execute(delete(rate_limits).where(rate_limits.c.expires_at <= time.time())).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            active = conn.execute(
+                select(func.count()).select_from(rate_limits).where(rate_limits.c.expires_at > time.time())
+            ).scalar()
+        return {
+            'backend': 'database',
+            'activeKeys': active,
+            'lastCleanup': int(self._last_cleanup)
+        }
@@ -0,0 +1,121 @@
+"""
+Result cache in front of the court scraper.
+
+Two tiers: a bounded in-memory LRU, and a persistent tier that looks up
+recently stored CaseDetail rows through a loader supplied by the app. The
+loader also returns when the result was stored, and a result it supplies is
+kept in memory only for what remains of its TTL.
+Negative outcomes (no such case / invalid case number) are cached in
+memory only, with their own shorter TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def make_cache_key(search_params: Dict[str, str]) -> CacheKey:
+    """Normalize search parameters into a (court, caseType, caseNumber, filingYear) key"""
+    return (
+        str(search_params.get('court', '')).strip().lower(),
+        str(search_params.get('caseType', '')).strip().lower(),
+        str(search_params.get('caseNumber', '')).strip().upper(),
+        str(search_params.get('filingYear', '')).strip()
+    )
+
+
+def is_negative_result(result: Dict[str, Any]) -> bool:
+    """A definitive 'no such case' answer from the court, as opposed to a transient failure"""
+    return not result.get('success') and bool(result.get('captchaVerified'))
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 5000, ttl: int = 3600, negative_ttl: int = 300,
+                 loader: Optional[Callable[[CacheKey, int], Optional[Tuple[Dict[str, Any], float]]]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.loader = loader
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'persistentHits': 0,
+            'negativeHits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def get(self, search_params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Return a cached result for these parameters, or None on a miss"""
+        key = make_cache_key(search_params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    if is_negative_result(result):
+                        self._counters['negativeHits'] += 1
+                    return result
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        # Fall back to the persistent tier outside the lock
+        loaded = self.loader(key, self.ttl) if self.loader else None
+        expires_at = loaded[1] + self.ttl if loaded is not None else None
+
+        with self._lock:
+            if loaded is None or expires_at <= now:
+                self._counters['misses'] += 1
+                return None
+            self._counters['persistentHits'] += 1
+
+        result = loaded[0]
+        self._remember(key, result, expires_at)
+        return result
+
+    def put(self, search_params: Dict[str, str], result: Dict[str, Any]):
+        """Cache a scraper result; transient failures are never cached"""
+        if result.get('success'):
+            ttl = self.ttl
+        elif is_negative_result(result):
+            ttl = self.negative_ttl
+        else:
+            return
+
+        self._remember(make_cache_key(search_params), result, time.time() + ttl)
+
+    def invalidate(self, search_params: Dict[str, str]):
+        """Drop the in-memory entry for these parameters"""
+        with self._lock:
+            self._entries.pop(make_cache_key(search_params), None)
+
+    def _remember(self, key: CacheKey, result: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['persistentHits'] + self._counters['misses']
+            stats = dict(self._counters)
+            stats.update({
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'negativeTtl': self.negative_ttl,
+                'hitRate': round((lookups - self._counters['misses']) / lookups, 4) if lookups else 0.0
+            })
+            return stats
@@ -0,0 +1,356 @@
+"""
+Retention for stored lookups.
+
+Terminal queries older than the retention window are moved, together with
+their case details, documents, proceedings and scrape jobs, into gzip
+compressed JSON-lines archive files, then deleted from the database. Work
+is done in batches of at most `batch_size` queries: each batch is read,
+written to a new archive chunk (written to a temporary file and renamed, so
+a chunk is either complete or absent), and deleted in one short transaction,
+with a pause between batches so lookups can take the write lock. A crash
+between writing a chunk and deleting its rows only archives those rows
+twice; readers keep the last copy of each query. A query that cache hits
+still point at (source_query_id) is kept until those queries are archived.
+
+After archiving, free pages are handed back to the filesystem: SQLite by
+incremental vacuum in steps of `vacuum_pages` (databases created before
+auto_vacuum was enabled need one full VACUUM first, see `vacuum_full`),
+Postgres by a plain VACUUM ANALYZE of the affected tables.
+
+Archived queries remain readable through QueryArchive, which scans the
+chunk files (skipping chunks by id range when looking up a query id).
+
+Scheduled passes hold a lease in the maintenance_leases table (created by
+migration 11), so only one process in a deployment runs them at a time.
+"""
+
+import glob
+import gzip
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import Column, Float, MetaData, String, Table, delete, exists, select, text, update
+
+CHUNK_PATTERN = re.compile(r'^(\d+)-(\d+)-[0-9a-f]+\.jsonl\.gz$')
+
+ARCHIVED_TABLES = ('case_queries', 'case_details', 'case_documents', 'case_proceedings', 'scrape_jobs')
+
+lease_metadata = MetaData()
+
+maintenance_leases = Table(
+    'maintenance_leases',
+    lease_metadata,
+    Column('name', String(50), primary_key=True),
+    Column('holder', String(100), nullable=False),
+    Column('expires_at', Float, nullable=False)
+)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot archive {type(value).__name__}')
+
+
+class QueryArchive:
+    """Append-only directory of gzip JSON-lines chunks, one line per archived query"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, records: List[Dict[str, Any]]) -> str:
+        """Write a new chunk; returns its path"""
+        ids = [record['query']['id'] for record in records]
+        name = f'{min(ids):012d}-{max(ids):012d}-{uuid.uuid4().hex[:8]}.jsonl.gz'
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.partial')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=_json_default).encode('utf-8') + b'\n')
+            with open(temp_path, 'rb') as f:
+                os.fsync(f.fileno())
+            path = os.path.join(self.directory, name)
+            os.replace(temp_path, path)
+            return path
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _chunks(self, query_id: Optional[int] = None) -> List[str]:
+        chunks = []
+        for path in glob.glob(os.path.join(self.directory, '*.jsonl.gz')):
+            match = CHUNK_PATTERN.match(os.path.basename(path))
+            if not match:
+                continue
+            first, last = int(match.group(1)), int(match.group(2))
+            if query_id is None or first <= query_id <= last:
+                chunks.append(path)
+        return sorted(chunks)
+
+    def records(self, query_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Every archived record (only from chunks that can hold query_id, when given)"""
+        for path in self._chunks(query_id):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def get(self, query_id: int) -> Optional[Dict[str, Any]]:
+        """The archived record for a query, or None"""
+        found = None
+        for record in self.records(query_id):
+            if record['query']['id'] == query_id:
+                found = record  # a query archived twice keeps its last copy
+        return found
+
+    def find(self, court: Optional[str] = None, case_type: Optional[str] = None,
+             case_number: Optional[str] = None, filing_year: Optional[str] = None,
+             limit: int = 50) -> List[Dict[str, Any]]:
+        """Archived queries matching a (partial) case key, newest first"""
+        criteria = {'court': court, 'case_type': case_type, 'case_number': case_number, 'filing_year': filing_year}
+        criteria = {column: value for column, value in criteria.items() if value}
+        matches = {}
+        for record in self.records():
+            query = record['query']
+            if all(str(query.get(column) or '').strip().upper() == str(value).strip().upper()
+                   for column, value in criteria.items()):
+                matches[query['id']] = record
+        return sorted(matches.values(), key=lambda record: record['query']['id'], reverse=True)[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        chunks = self._chunks()
+        return {
+            'directory': self.directory,
+            'chunks': len(chunks),
+            'bytes': sum(os.path.getsize(path) for path in chunks)
+        }
+
+
+class Retention:
+    def __init__(self, engine, archive: QueryArchive, days: int = 90, batch_size: int = 500,
+                 pause: float = 0.05, vacuum_pages: int = 1000):
+        self.engine = engine
+        self.archive = archive
+        self.days = days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._tables = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_run = None
+
+    def _table(self, name: str) -> Table:
+        # Reflected on first use, so building this object opens no connection
+        if self._tables is None:
+            metadata = MetaData()
+            metadata.reflect(self.engine, only=ARCHIVED_TABLES)
+            self._tables = metadata.tables
+        return self._tables[name]
+
+    def _unreferenced(self):
+        """Condition on case_queries: no remaining cache-hit query points at it as its source"""
+        queries = self._table('case_queries')
+        dependents = queries.alias('dependents')
+        return ~exists().where(dependents.c.source_query_id == queries.c.id)
+
+    def _candidates(self, conn, cutoff: datetime, after_id: int) -> List[int]:
+        queries = self._table('case_queries')
+        # A source stays until the queries answered from it have been archived too
+        return list(conn.execute(
+            select(queries.c.id)
+            .where(queries.c.created_at < cutoff, queries.c.status != 'pending', queries.c.id > after_id)
+            .where(self._unreferenced())
+            .order_by(queries.c.id)
+            .limit(self.batch_size)
+        ).scalars())
+
+    def _load(self, conn, query_ids: List[int]) -> List[Dict[str, Any]]:
+        """Archive records for a batch, children grouped under their query"""
+        queries, details = self._table('case_queries'), self._table('case_details')
+        documents, proceedings = self._table('case_documents'), self._table('case_proceedings')
+        jobs = self._table('scrape_jobs')
+
+        records = {
+            row['id']: {'query': dict(row), 'caseDetail': None, 'documents': [], 'proceedings': [], 'jobs': []}
+            for row in conn.execute(select(queries).where(queries.c.id.in_(query_ids))).mappings()
+        }
+        detail_owner = {}
+        for row in conn.execute(select(details).where(details.c.query_id.in_(query_ids))).mappings():
+            records[row['query_id']]['caseDetail'] = dict(row)
+            detail_owner[row['id']] = row['query_id']
+        if detail_owner:
+            for row in conn.execute(select(documents).where(documents.c.case_detail_id.in_(list(detail_owner)))).mappings():
+                records[detail_owner[row['case_detail_id']]]['documents'].append(dict(row))
+            for row in conn.execute(
+                select(proceedings).where(proceedings.c.case_detail_id.in_(list(detail_owner)))
+                .order_by(proceedings.c.case_detail_id, proceedings.c.position)
+            ).mappings():
+                records[detail_owner[row['case_detail_id']]]['proceedings'].append(dict(row))
+        for row in conn.execute(select(jobs).where(jobs.c.query_id.in_(query_ids))).mappings():
+            records[row['query_id']]['jobs'].append(dict(row))
+        for record in records.values():
+            record['archivedAt'] = datetime.utcnow()
+        return list(records.values())
+
+    def _delete(self, conn, query_ids: List[int]) -> int:
+        queries, details = self._table('case_queries'), self._table('case_details')
+        # A cache hit may have started pointing at one since the batch was read; it stays
+        # (archived twice, which readers tolerate) rather than leave that query without a detail
+        query_ids = list(conn.execute(
+            select(queries.c.id).where(queries.c.id.in_(query_ids)).where(self._unreferenced())
+        ).scalars())
+        if not query_ids:
+            return 0
+        detail_ids = select(details.c.id).where(details.c.query_id.in_(query_ids)).scalar_subquery()
+        conn.execute(delete(self._table('case_proceedings')).where(
+            self._table('case_proceedings').c.case_detail_id.in_(detail_ids)))
+        conn.execute(delete(self._table('case_documents')).where(
+            self._table('case_documents').c.case_detail_id.in_(detail_ids)))
+        conn.execute(delete(details).where(details.c.query_id.in_(query_ids)))
+        conn.execute(delete(self._table('scrape_jobs')).where(self._table('scrape_jobs').c.query_id.in_(query_ids)))
+        return conn.execute(delete(queries).where(queries.c.id.in_(query_ids))).rowcount
+
+    def archive_expired(self, days: Optional[int] = None, dry_run: bool = False,
+                        max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """Archive and delete terminal queries older than `days`, batch by batch"""
+        days = self.days if days is None else days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        summary = {'cutoff': cutoff.isoformat(), 'batches': 0, 'archived': 0, 'chunks': []}
+        after_id = 0
+
+        while max_batches is None or summary['batches'] < max_batches:
+            if self._stop.is_set():
+                break
+            with self.engine.connect() as conn:
+                query_ids = self._candidates(conn, cutoff, after_id)
+                if not query_ids:
+                    break
+                after_id = query_ids[-1]
+                if dry_run:
+                    summary['batches'] += 1
+                    summary['archived'] += len(query_ids)
+                    continue
+                records = self._load(conn, query_ids)
+
+            summary['chunks'].append(os.path.basename(self.archive.write(records)))
+            with self.engine.begin() as conn:
+                summary['archived'] += self._delete(conn, query_ids)
+            summary['batches'] += 1
+            if self.pause:
+                time.sleep(self.pause)  # let waiting writers in between batches
+
+        return summary
+
+    def reclaim_space(self) -> Dict[str, Any]:
+        """Return free pages to the filesystem (SQLite) or mark them reusable (Postgres)"""
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            with self.engine.connect() as conn:
+                if conn.execute(text('PRAGMA auto_vacuum')).scalar() != 2:
+                    return {'skipped': 'auto_vacuum is not INCREMENTAL; run a full vacuum once'}
+                before = conn.execute(text('PRAGMA freelist_count')).scalar()
+            free = before
+            while free and not self._stop.is_set():
+                # Each step is its own short write transaction
+                with self.engine.connect() as conn:
+                    # executescript steps the pragma to completion; execute() frees a single page
+                    conn.connection.driver_connection.executescript(f'PRAGMA incremental_vacuum({self.vacuum_pages});')
+                    remaining = conn.execute(text('PRAGMA freelist_count')).scalar()
+                if remaining >= free:
+                    break
+                free = remaining
+                if self.pause:
+                    time.sleep(self.pause)
+            return {'freePagesBefore': before, 'freePagesAfter': free}
+
+        if dialect == 'postgresql':
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(f"VACUUM (ANALYZE) {', '.join(ARCHIVED_TABLES)}"))
+            return {'vacuumed': list(ARCHIVED_TABLES)}
+
+        return {'skipped': f'no space reclamation for {dialect}'}
+
+    def vacuum_full(self) -> Dict[str, Any]:
+        """One-off full rebuild (SQLite: also switches on incremental auto-vacuum); locks the database"""
+        if self.engine.dialect.name == 'sqlite':
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('PRAGMA auto_vacuum=INCREMENTAL'))
+                conn.execute(text('VACUUM'))
+                return {'autoVacuum': conn.execute(text('PRAGMA auto_vacuum')).scalar()}
+        if self.engine.dialect.name == 'postgresql':
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(f"VACUUM (FULL, ANALYZE) {', '.join(ARCHIVED_TABLES)}"))
+            return {'vacuumed': list(ARCHIVED_TABLES)}
+        return {'skipped': f'no full vacuum for {self.engine.dialect.name}'}
+
+    def _acquire_lease(self, seconds: float) -> bool:
+        """Take or renew the cluster-wide retention lease, so one process runs passes at a time"""
+        now = time.time()
+        with self.engine.begin() as conn:
+            taken = conn.execute(
+                update(maintenance_leases)
+                .where(maintenance_leases.c.name == 'retention')
+                .where((maintenance_leases.c.expires_at < now) | (maintenance_leases.c.holder == self.holder))
+                .values(holder=self.holder, expires_at=now + seconds)
+            ).rowcount
+            if taken:
+                return True
+            if conn.execute(select(maintenance_leases.c.name).where(maintenance_leases.c.name == 'retention')).first():
+                return False
+            conn.execute(maintenance_leases.insert().values(name='retention', holder=self.holder, expires_at=now + seconds))
+            return True
+
+    def run(self, dry_run: bool = False, vacuum: bool = True) -> Dict[str, Any]:
+        """One retention pass: archive expired queries, then reclaim space"""
+        with self._lock:
+            started = time.time()
+            result = {'archive': self.archive_expired(dry_run=dry_run)}
+            if vacuum and not dry_run and result['archive']['archived']:
+                result['vacuum'] = self.reclaim_space()
+            result['seconds'] = round(time.time() - started, 2)
+            if not dry_run:
+                self._last_run = dict(result, finishedAt=datetime.utcnow().isoformat())
+            return result
+
+    def start(self, interval: float):
+        """Run passes every `interval` seconds in a background thread"""
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    if self._acquire_lease(interval * 2):
+                        result = self.run()
+                        if result['archive']['archived']:
+                            print(f"Retention archived {result['archive']['archived']} queries "
+                                  f"in {result['seconds']}s")
+                except Exception as e:
+                    print(f"Retention error: {e}")
+
+        self._thread = threading.Thread(target=loop, name='retention', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'retentionDays': self.days,
+            'batchSize': self.batch_size,
+            'running': self._lock.locked(),
+            'lastRun': self._last_run,
+            'archive': self.archive.stats()
+        }
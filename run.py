@@ -1,6 +1,6 @@
 import os
 import sys
-from app import app
+from app import create_app, init_db, start_background_work
 
 if __name__ == '__main__':
     # Set environment variables for development
@@ -14,6 +14,11 @@ if __name__ == '__main__':
     print("Ready for legal case searches...")
     
     try:
+        app = create_app()
+        with app.app_context():
+            init_db()
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # the reloader's serving child, not its watcher
+            start_background_work(app)
         app.run(host='0.0.0.0', port=port, debug=True)
     except KeyboardInterrupt:
         print("\nApplication stopped by user")
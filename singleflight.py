@@ -0,0 +1,100 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+`do` runs a function once per key and hands the same result to every caller
+that arrives while it is running. `join_or_start` does the same for work that
+outlives the call (a queued job): the first caller starts it and owns the key
+until `release` is called, and later callers attach to its handle.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call, for do()
+        self._owned = {}  # key -> _Call, for join_or_start()
+        self._started = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._started += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+        return call.result, False
+
+    def join_or_start(self, key: Hashable, start: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Attach to the in-flight work for key, or start it; returns (handle, joined)"""
+        with self._lock:
+            call = self._owned.get(key)
+            leader = call is None
+            if leader:
+                call = self._owned[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                # The leader failed to start, so this caller gets its own attempt
+                return self.join_or_start(key, start)
+            with self._lock:
+                self._coalesced += 1
+            return call.result, True
+
+        try:
+            call.result = start()
+            with self._lock:
+                self._started += 1
+        except Exception as e:
+            call.error = e
+            self.release(key)
+            raise
+        finally:
+            call.event.set()
+
+        return call.result, False
+
+    def release(self, key: Hashable):
+        """Mark the work started through join_or_start as finished"""
+        with self._lock:
+            self._owned.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return in-flight and coalescing counters"""
+        with self._lock:
+            return {
+                'inFlight': len(self._calls) + len(self._owned),
+                'started': self._started,
+                'coalesced': self._coalesced
+            }
@@ -1,7 +1,34 @@
-from app import app
+"""
+Production entry point: a preforking, multi-worker Gunicorn server with
+graceful shutdown, configured by gunicorn.conf.py. Falls back to Werkzeug's
+threaded server where Gunicorn is unavailable (e.g. Windows).
+"""
+
 import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     print(f"Starting Court Lookup Application on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
\ No newline at end of file
+    
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+    
+    if gunicorn is not None:
+        os.chdir(ROOT)
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'wsgi:app'
+        ] + sys.argv[1:])
+    
+    from app import create_app, init_db, start_background_work
+    
+    print("Gunicorn is not installed; using the single-process Werkzeug server")
+    app = create_app()
+    with app.app_context():
+        init_db()
+    start_background_work(app)
+    app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False, threaded=True)
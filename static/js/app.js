@@ -18,8 +18,8 @@ function initializeApp() {
     // Load initial history
     loadQueryHistory();
     
-    // Auto-refresh history every 30 seconds
-    setInterval(loadQueryHistory, 30000);
+    // Keep history current from pushed events, or poll for changes without them
+    watchHistory();
 }
 
 function populateFilingYears() {
@@ -350,12 +350,12 @@ async function handleSearch(event) {
         // CAPTCHA was correct and case search is in progress
         if (result.success) {
             // Show loading only for successful CAPTCHA validation
-            showLoadingModal('Searching Database', 'CAPTCHA verified! Searching court database...');
+            showLoadingModal('Searching Database', 'CAPTCHA verified! Your search has been queued...');
             
             // Hide loading after short delay and show redirect notification
             setTimeout(() => {
                 hideLoadingModal();
-                showToast('Redirecting to Case Details', 'Case found! Taking you to the case information page...', 'success');
+                showToast('Redirecting to Case Details', 'Taking you to the case information page...', 'success');
                 
                 // Clear form
                 clearForm();
@@ -364,7 +364,7 @@ async function handleSearch(event) {
                 refreshInlineCaptcha();
                 
                 // Refresh history
-                loadQueryHistory();
+                refreshHistory();
                 
                 // Redirect to case details
                 setTimeout(() => {
@@ -423,7 +423,7 @@ async function performCaseSearch(searchData) {
         }, 1500);
         
         // Refresh history
-        loadQueryHistory();
+        refreshHistory();
         
     } catch (error) {
         hideLoadingModal();
@@ -450,6 +450,12 @@ function clearForm() {
     // Silent form clear - no notification needed
 }
 
+// History state used for delta refreshes
+const historyState = {
+    filter: null,
+    sinceCursor: null
+};
+
 async function loadQueryHistory() {
     const historyContent = document.getElementById('historyContent');
     const historyLoading = document.getElementById('historyLoading');
@@ -471,6 +477,10 @@ async function loadQueryHistory() {
         
         const history = await response.json();
         
+        // Remember where this snapshot ends so later refreshes only fetch changes
+        historyState.filter = filter;
+        historyState.sinceCursor = response.headers.get('X-Since-Cursor');
+        
         // Hide loading
         if (historyLoading) {
             historyLoading.style.display = 'none';
@@ -524,42 +534,7 @@ function renderHistory(history) {
                     </tr>
                 </thead>
                 <tbody>
-                    ${history.map(query => `
-                        <tr>
-                            <td>
-                                <div class="fw-bold">${query.caseNumber}</div>
-                                <small class="text-muted">${formatCaseType(query.caseType)} • ${query.filingYear}</small>
-                            </td>
-                            <td>
-                                <span class="badge bg-light text-dark">
-                                    ${query.court === 'high-court' ? 'High Court' : 'District Court'}
-                                </span>
-                            </td>
-                            <td>
-                                <span class="status-badge status-${query.status}">
-                                    ${formatStatus(query.status)}
-                                </span>
-                            </td>
-                            <td>
-                                <div>${formatDate(query.createdAt)}</div>
-                                <small class="text-muted">${formatTime(query.createdAt)}</small>
-                            </td>
-                            <td>
-                                ${query.status === 'success' ? 
-                                    `<a href="/case/${query.id}" class="btn btn-sm btn-outline-primary">
-                                        <i class="fas fa-eye me-1"></i> View
-                                    </a>` :
-                                    query.status === 'pending' ?
-                                    `<button class="btn btn-sm btn-outline-secondary" disabled>
-                                        <i class="fas fa-clock me-1"></i> Processing
-                                    </button>` :
-                                    `<button class="btn btn-sm btn-outline-danger" disabled>
-                                        <i class="fas fa-times me-1"></i> Failed
-                                    </button>`
-                                }
-                            </td>
-                        </tr>
-                    `).join('')}
+                    ${history.map(renderHistoryRow).join('')}
                 </tbody>
             </table>
         </div>
@@ -568,6 +543,131 @@ function renderHistory(history) {
     historyContent.innerHTML = historyHtml;
 }
 
+function renderHistoryRow(query) {
+    return `
+        <tr data-query-id="${query.id}" data-created-at="${query.createdAt}">
+            <td>
+                <div class="fw-bold">${query.caseNumber}</div>
+                <small class="text-muted">${formatCaseType(query.caseType)} • ${query.filingYear}</small>
+            </td>
+            <td>
+                <span class="badge bg-light text-dark">
+                    ${query.court === 'high-court' ? 'High Court' : 'District Court'}
+                </span>
+            </td>
+            <td>
+                <span class="status-badge status-${query.status}">
+                    ${formatStatus(query.status)}
+                </span>
+            </td>
+            <td>
+                <div>${formatDate(query.createdAt)}</div>
+                <small class="text-muted">${formatTime(query.createdAt)}</small>
+            </td>
+            <td>
+                ${query.status === 'success' ? 
+                    `<a href="/case/${query.id}" class="btn btn-sm btn-outline-primary">
+                        <i class="fas fa-eye me-1"></i> View
+                    </a>` :
+                    query.status === 'pending' ?
+                    `<button class="btn btn-sm btn-outline-secondary" disabled>
+                        <i class="fas fa-clock me-1"></i> Processing
+                    </button>` :
+                    `<button class="btn btn-sm btn-outline-danger" disabled>
+                        <i class="fas fa-times me-1"></i> Failed
+                    </button>`
+                }
+            </td>
+        </tr>
+    `;
+}
+
+async function refreshHistory() {
+    const filter = document.getElementById('historyFilter')?.value || '24h';
+    const tbody = document.querySelector('.history-table tbody');
+    
+    // Fall back to a full load when there is nothing to patch
+    if (!historyState.sinceCursor || historyState.filter !== filter || !tbody) {
+        return loadQueryHistory();
+    }
+    
+    try {
+        const since = encodeURIComponent(historyState.sinceCursor);
+        const response = await fetch(`/api/cases/history?filter=${filter}&limit=50&since=${since}`);
+        
+        if (!response.ok) {
+            throw new Error('Failed to refresh history');
+        }
+        
+        const changes = await response.json();
+        historyState.sinceCursor = response.headers.get('X-Since-Cursor') || historyState.sinceCursor;
+        
+        patchHistory(tbody, changes, filter);
+        
+    } catch (error) {
+        console.error('History refresh error:', error);
+    }
+}
+
+function watchHistory() {
+    if (!window.EventSource) {
+        // Auto-refresh history every 30 seconds (only changed rows are fetched)
+        setInterval(refreshHistory, 30000);
+        return;
+    }
+    
+    const source = new EventSource('/api/events?history=1');
+    source.addEventListener('ready', event => {
+        // Sent on every (re)connect; fetch anything missed while disconnected
+        // (before the first load completes there is nothing to catch up on)
+        if (JSON.parse(event.data).resync && historyState.sinceCursor) {
+            refreshHistory();
+        }
+    });
+    source.addEventListener('history', event => {
+        const filter = document.getElementById('historyFilter')?.value || '24h';
+        const tbody = document.querySelector('.history-table tbody');
+        if (!tbody || historyState.filter !== filter) {
+            return loadQueryHistory();
+        }
+        patchHistory(tbody, [JSON.parse(event.data)], filter);
+    });
+    source.onerror = () => {
+        // The browser reconnects by itself unless the server refused the stream
+        if (source.readyState === EventSource.CLOSED) {
+            setInterval(refreshHistory, 30000);
+        }
+    };
+}
+
+function patchHistory(tbody, changes, filter) {
+    // Changes arrive oldest first, so inserting each new row at the top keeps newest first
+    changes.forEach(query => {
+        const existing = tbody.querySelector(`tr[data-query-id="${query.id}"]`);
+        if (existing) {
+            existing.outerHTML = renderHistoryRow(query);
+        } else {
+            tbody.insertAdjacentHTML('afterbegin', renderHistoryRow(query));
+        }
+    });
+    
+    // Drop rows that have aged out of the selected window
+    const windowHours = { '24h': 24, '7d': 24 * 7, '30d': 24 * 30 }[filter];
+    if (windowHours) {
+        const cutoff = Date.now() - windowHours * 60 * 60 * 1000;
+        tbody.querySelectorAll('tr[data-created-at]').forEach(row => {
+            // Server timestamps are UTC without a zone suffix
+            if (new Date(row.dataset.createdAt + 'Z').getTime() < cutoff) {
+                row.remove();
+            }
+        });
+    }
+    
+    while (tbody.rows.length > 50) {
+        tbody.deleteRow(-1);
+    }
+}
+
 function formatCaseType(caseType) {
     const types = {
         'civil': 'Civil Case',
@@ -852,7 +952,7 @@ async function submitCaptcha() {
             showToast('CAPTCHA Verified', 'Verification successful! Redirecting to case details...', 'success');
             
             // Refresh history
-            loadQueryHistory();
+            refreshHistory();
             
             // Redirect to case details
             setTimeout(() => {
@@ -0,0 +1,216 @@
+"""
+Fingerprinted static assets and cached page renders.
+
+StaticAssets copies every file under static/ to a build directory under a
+content-hashed name (css/styles.css -> css/styles.<hash>.css) and writes a
+gzip variant next to compressible files. url_for('static', ...) is rewritten
+to the hashed names, and those are served with a year-long immutable
+Cache-Control, precompressed when the client accepts gzip. A changed file
+gets a new name, so browsers never need to revalidate. The build is reused
+while the sources are unchanged; `flask build-assets` runs it ahead of
+deployment.
+
+PageCache keeps rendered pages (and their gzip variant) in memory keyed by
+template and context, and answers repeat loads with 304 Not Modified via
+ETags.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Response, current_app, render_template, request, send_file
+
+COMPRESSIBLE = ('.js', '.css', '.svg', '.html', '.json', '.txt', '.map')
+SKIPPED = ('.py', '.pyc')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+MANIFEST = 'manifest.json'
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.partial')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps builds reproducible
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class StaticAssets:
+    def __init__(self, source_dir: str, build_dir: str, exclude: Tuple[str, ...] = (), min_compress_size: int = 256):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.exclude = tuple(path.strip('/') for path in exclude)  # directories written at runtime
+        self.min_compress_size = min_compress_size
+        self.manifest = {}  # source path -> hashed path
+        self._files = {}  # hashed path -> (file, gzip file or None, mimetype)
+        self.version = ''
+
+    def _sources(self) -> Dict[str, Tuple[int, int]]:
+        sources = {}
+        for root, dirs, files in os.walk(self.source_dir):
+            relative_root = os.path.relpath(root, self.source_dir).replace(os.sep, '/')
+            dirs[:] = sorted(
+                d for d in dirs
+                if d != '__pycache__' and posixpath.normpath(posixpath.join(relative_root, d)) not in self.exclude
+            )
+            for name in sorted(files):
+                if name.endswith(SKIPPED) or name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                relative = os.path.relpath(path, self.source_dir).replace(os.sep, '/')
+                sources[relative] = (stat.st_size, stat.st_mtime_ns)
+        return sources
+
+    def load_or_build(self) -> 'StaticAssets':
+        """Use the existing build if its sources are unchanged, otherwise rebuild"""
+        sources = self._sources()
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST)) as f:
+                built = json.load(f)
+            if {name: tuple(value) for name, value in built['sources'].items()} == sources:
+                self._load(built)
+                return self
+        except (OSError, ValueError, KeyError):
+            pass
+        return self.build(sources)
+
+    def build(self, sources: Optional[Dict[str, Tuple[int, int]]] = None) -> 'StaticAssets':
+        """Hash, copy and precompress every static file, then write the manifest"""
+        sources = sources if sources is not None else self._sources()
+        files = {}
+        for relative in sources:
+            with open(os.path.join(self.source_dir, relative), 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(relative)
+            hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(self.build_dir, hashed)
+            if not os.path.exists(target):  # hashed names never change content
+                _write_atomic(target, data)
+            compressed = None
+            if ext.lower() in COMPRESSIBLE and len(data) >= self.min_compress_size:
+                packed = _gzip(data)
+                if len(packed) < len(data):
+                    compressed = hashed + '.gz'
+                    if not os.path.exists(target + '.gz'):
+                        _write_atomic(target + '.gz', packed)
+            files[relative] = {'path': hashed, 'gzip': compressed}
+
+        built = {'sources': sources, 'files': files}
+        _write_atomic(os.path.join(self.build_dir, MANIFEST), json.dumps(built, indent=2).encode('utf-8'))
+        self._load(built)
+        return self
+
+    def _load(self, built: Dict[str, Any]):
+        self.manifest = {source: entry['path'] for source, entry in built['files'].items()}
+        self._files = {
+            entry['path']: (
+                os.path.join(self.build_dir, entry['path']),
+                os.path.join(self.build_dir, entry['gzip']) if entry['gzip'] else None,
+                mimetypes.guess_type(source)[0] or 'application/octet-stream'
+            )
+            for source, entry in built['files'].items()
+        }
+        self.version = hashlib.sha1(json.dumps(self.manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def url_defaults(self, endpoint: str, values: Dict[str, Any]):
+        """url_defaults hook: point static URLs at the fingerprinted copy"""
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def send(self, filename: str) -> Response:
+        """View for the static endpoint; files that are not fingerprinted are served as before"""
+        built = self._files.get(filename)
+        if built is None:
+            return current_app.send_static_file(filename)
+
+        path, compressed, mimetype = built
+        use_gzip = compressed is not None and request.accept_encodings['gzip'] > 0
+        response = send_file(compressed if use_gzip else path, mimetype=mimetype, conditional=True)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        if compressed is not None:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [(os.path.getsize(path), os.path.getsize(compressed) if compressed else None)
+                 for path, compressed, _ in self._files.values()]
+        return {
+            'version': self.version,
+            'files': len(self._files),
+            'precompressed': sum(1 for _, packed in sizes if packed is not None),
+            'bytes': sum(size for size, _ in sizes),
+            'gzipBytes': sum(packed if packed is not None else size for size, packed in sizes),
+            'buildDir': self.build_dir
+        }
+
+
+class PageCache:
+    """Rendered pages by template and context, answered with ETags"""
+
+    def __init__(self, max_entries: int = 1024, version: str = ''):
+        self.max_entries = max_entries
+        self.version = version  # asset build the pages link to
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+
+    def _entry(self, template: str, context: Dict[str, Any]):
+        key = (template, tuple(sorted(context.items())))
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None:
+                self._pages.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+
+        body = render_template(template, **context).encode('utf-8')
+        digest = hashlib.sha1(body + self.version.encode('ascii')).hexdigest()[:20]
+        entry = (body, _gzip(body), digest)
+        with self._lock:
+            self._pages[key] = entry
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return entry
+
+    def render(self, template: str, **context) -> Response:
+        body, compressed, digest = self._entry(template, context)
+        use_gzip = request.accept_encodings['gzip'] > 0
+        response = Response(compressed if use_gzip else body, mimetype='text/html')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{digest}-gz" if use_gzip else digest)
+        response.headers['Cache-Control'] = 'no-cache'  # revalidate; unchanged pages cost a 304
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            with self._lock:
+                self._not_modified += 1
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._pages),
+                'maxEntries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'notModified': self._not_modified
+            }
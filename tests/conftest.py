@@ -0,0 +1,42 @@
+import pytest
+
+from app import create_app, db, init_db, stop_background_work
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build apps sharing one scratch database, like worker processes of one server"""
+    apps = []
+
+    def build(**config):
+        settings = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'court_cases.db'}",
+            'RATELIMIT_ENABLED': False,
+            'JOB_HEARTBEAT_INTERVAL': 0,
+            'EVENTS_SYNC_INTERVAL': 0,
+            'RETENTION_INTERVAL': 0,
+            'DOCUMENT_CACHE_DIR': str(tmp_path / 'document_cache'),
+            'DOCUMENT_STORE_DIR': str(tmp_path / 'documents'),
+            'UPSTREAM_CACHE_DIR': str(tmp_path / 'http_cache'),
+            'ARCHIVE_DIR': str(tmp_path / 'archive'),
+            'STATIC_BUILD_DIR': str(tmp_path / 'static_build')
+        }
+        settings.update(config)
+        application = create_app(settings)
+        with application.app_context():
+            init_db()
+        apps.append(application)
+        return application
+
+    yield build
+
+    for application in apps:
+        stop_background_work(application)
+        with application.app_context():
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
@@ -0,0 +1,47 @@
+import json
+
+CASES = [
+    {'caseType': 'W.P.(C)', 'caseNumber': '1201', 'filingYear': '2023', 'court': 'high-court'},
+    {'caseType': 'W.P.(C)', 'caseNumber': '1202', 'filingYear': '2023', 'court': 'high-court'}
+]
+
+
+def _captcha(client):
+    captcha = client.get('/api/captcha').get_json()
+    return captcha['captchaText'], {'sessionId': captcha['sessionId']}
+
+
+def test_batch_requires_a_captcha(app):
+    client = app.test_client()
+
+    response = client.post('/api/cases/batch', json={'cases': CASES})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing required field: captchaSolution'
+
+
+def test_batch_rejects_a_wrong_captcha(app):
+    client = app.test_client()
+    _, form_data = _captcha(client)
+
+    response = client.post('/api/cases/batch', json={'cases': CASES, 'captchaSolution': 'WRONG1', 'formData': form_data})
+
+    assert response.status_code == 400
+    assert response.get_json()['requiresNewCaptcha'] is True
+
+
+def test_verified_batch_streams_results_without_the_captcha(app):
+    client = app.test_client()
+    solution, form_data = _captcha(client)
+
+    response = client.post('/api/cases/batch', json={'cases': CASES, 'captchaSolution': solution, 'formData': form_data})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    results = [line for line in lines if line['type'] == 'result']
+    assert len(results) == 2 and all(line['success'] for line in results)
+    assert all('verificationMethod' not in line['caseDetail'] for line in results)
+    assert lines[-1]['succeeded'] == 2
+
+    # The CAPTCHA session is spent once the batch has used it
+    again = client.post('/api/cases/batch', json={'cases': CASES, 'captchaSolution': solution, 'formData': form_data})
+    assert again.status_code == 400
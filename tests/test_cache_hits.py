@@ -0,0 +1,116 @@
+import csv
+import io
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import CaseDetail, CaseQuery, _record_lookup, db
+from result_cache import make_cache_key
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'CRL.A.', 'caseNumber': '900', 'filingYear': '2024'}
+RETYPED = {'court': 'delhi high court', 'caseType': 'crl.a.', 'caseNumber': '900', 'filingYear': '2024'}
+
+
+def _details():
+    return db.session.scalar(select(func.count()).select_from(CaseDetail))
+
+
+def _first_lookup(app):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        return _record_lookup(SEARCH, scraper.fetch_case(SEARCH, 'FIRST-USER-CAPTCHA')).id
+
+
+def test_cache_hit_points_at_the_stored_result(app):
+    client = app.test_client()
+    source_id = _first_lookup(app)
+
+    with app.app_context():
+        cached = app.extensions['case_lookup'].get('result_cache').get(RETYPED)
+        assert cached['queryId'] == source_id
+        assert 'verificationMethod' not in cached['caseDetail']
+
+    hit = client.post('/api/cases/search', json=RETYPED).get_json()
+    assert hit['cached'] is True and hit['queryId'] != source_id
+
+    with app.app_context():
+        query = db.session.get(CaseQuery, hit['queryId'])
+        assert query.source_query_id == source_id
+        assert query.case_type == 'crl.a.'
+        assert _details() == 1
+
+    source = client.get(f'/api/cases/query/{source_id}').get_json()
+    served = client.get(f'/api/cases/query/{hit["queryId"]}').get_json()
+    assert served['id'] == hit['queryId']
+    assert served['status'] == 'success'
+    assert served['caseDetail'] == source['caseDetail']
+    assert served['documents'] == source['documents']
+    assert 'FIRST-USER-CAPTCHA' not in str(served)
+
+    paged = client.get(f'/api/cases/query/{hit["queryId"]}', query_string={'proceedingsLimit': 1}).get_json()
+    assert paged['caseDetail']['petitioner'] == source['caseDetail']['petitioner']
+
+    export = client.get('/api/cases/history/export', query_string={'filter': 'all', 'columns': 'caseType,petitioner'})
+    rows = list(csv.reader(io.StringIO(export.get_data(as_text=True))))
+    assert rows[1:] == [['crl.a.', source['caseDetail']['petitioner']], ['CRL.A.', source['caseDetail']['petitioner']]]
+
+
+def test_stored_tier_hit_points_at_the_original(make_app):
+    first = make_app()
+    source_id = _first_lookup(first)
+    hit = first.test_client().post('/api/cases/search', json=SEARCH).get_json()
+
+    # A fresh process has an empty memory tier and loads the latest stored result
+    second = make_app()
+    again = second.test_client().post('/api/cases/search', json=RETYPED).get_json()
+    assert again['cached'] is True
+
+    with second.app_context():
+        assert db.session.get(CaseQuery, hit['queryId']).source_query_id == source_id
+        assert db.session.get(CaseQuery, again['queryId']).source_query_id == source_id
+        assert _details() == 1
+
+
+def test_hit_on_a_removed_source_stores_a_copy(app):
+    client = app.test_client()
+    source_id = _first_lookup(app)
+
+    with app.app_context():
+        source = db.session.get(CaseQuery, source_id)
+        db.session.delete(source)
+        db.session.commit()
+
+    hit = client.post('/api/cases/search', json=SEARCH).get_json()
+    with app.app_context():
+        query = db.session.get(CaseQuery, hit['queryId'])
+        assert query.source_query_id is None
+        assert query.case_detail is not None
+
+
+def test_persistent_hits_keep_the_stored_expiry(app):
+    source_id = _first_lookup(app)
+
+    with app.app_context():
+        cache = app.extensions['case_lookup'].get('result_cache')
+        fetched_at = datetime.utcnow() - timedelta(seconds=cache.ttl - 60)
+        CaseQuery.query.filter_by(id=source_id).update({'completed_at': fetched_at}, synchronize_session=False)
+        db.session.commit()
+
+        # Answered from the database, then remembered only for the minute it has left
+        cache.invalidate(SEARCH)
+        assert cache.get(SEARCH)['queryId'] == source_id
+        expires_at, _ = cache._entries[make_cache_key(SEARCH)]
+        assert expires_at <= time.time() + 60
+
+        # A cache hit recorded now does not make the stored result any younger
+        _record_lookup(SEARCH, cache.get(SEARCH), update_cache=False)
+        cache.invalidate(SEARCH)
+        cache.get(SEARCH)
+        assert cache._entries[make_cache_key(SEARCH)][0] <= time.time() + 60
+
+        CaseQuery.query.filter_by(id=source_id).update(
+            {'completed_at': fetched_at - timedelta(seconds=120)}, synchronize_session=False)
+        db.session.commit()
+        cache.invalidate(SEARCH)
+        assert cache.get(SEARCH) is None
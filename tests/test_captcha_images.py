@@ -0,0 +1,41 @@
+import importlib
+
+import pytest
+
+from captcha_images import CAPTCHA_CHARS, CaptchaGenerator, CaptchaImagePool
+
+PIL = pytest.importorskip('PIL.Image')
+
+
+def test_generator_returns_pillow_images():
+    generator = CaptchaGenerator()
+    text = generator.generate_captcha_text()
+    assert len(text) == 5 and set(text) <= set(CAPTCHA_CHARS)
+
+    image = generator.create_captcha_image(text)
+    assert isinstance(image, PIL.Image)
+    assert image.size == (generator.width, generator.height)
+
+    data, mimetype = generator.create_captcha_bytes(text)
+    assert mimetype == 'image/png' and data.startswith(b'\x89PNG')
+
+
+def test_save_captcha_writes_a_png(tmp_path):
+    generator = CaptchaGenerator()
+    filename = generator.save_captcha('AB3CD', str(tmp_path / 'captcha.png'))
+    with PIL.open(filename) as image:
+        assert image.format == 'PNG'
+
+
+def test_standalone_module_imports_without_path_changes():
+    module = importlib.import_module('static.images.captcha_fresh')
+    assert module.CaptchaGenerator is CaptchaGenerator
+
+
+def test_pool_hands_out_rendered_images():
+    pool = CaptchaImagePool(pool_size=2)
+    try:
+        text, data, mimetype = pool.take()
+        assert len(text) == 5 and mimetype == 'image/png' and data.startswith(b'\x89PNG')
+    finally:
+        pool.stop()
@@ -0,0 +1,22 @@
+import app as application_module
+from app import _record_lookup
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'CS(OS)', 'caseNumber': '700', 'filingYear': '2020'}
+
+
+def test_hits_whose_detail_is_gone_are_skipped(app, monkeypatch):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        query = _record_lookup(SEARCH, scraper.fetch_case(SEARCH, 'ABC123'), update_cache=False)
+        detail_id = query.case_detail.id
+
+    # The index still lists a detail that retention has since archived
+    monkeypatch.setattr(application_module, 'find_case_details', lambda session, q, limit, offset: [
+        {'detailId': detail_id + 1000, 'score': -2.0},
+        {'detailId': detail_id, 'score': -1.0}
+    ])
+
+    response = app.test_client().get('/api/cases/find', query_string={'q': 'anything'})
+
+    assert response.status_code == 200
+    assert [result['caseDetailId'] for result in response.get_json()['results']] == [detail_id]
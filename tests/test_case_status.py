@@ -0,0 +1,56 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from case_parser import NO_RECORD_ID
+from court_scraper import CourtScraper
+from result_cache import is_negative_result
+from upstream_client import UpstreamClient
+
+SEARCH = {'caseType': 'W.P.(C)', 'caseNumber': '1234', 'filingYear': '2023', 'court': 'high-court'}
+
+
+class CaseStatusPage(BaseHTTPRequestHandler):
+    body = b''
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def scraper():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CaseStatusPage)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scraper = CourtScraper(upstream_client=UpstreamClient(retries=0),
+                           case_status_url=f'http://127.0.0.1:{server.server_port}/case-status')
+    yield scraper
+    scraper.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_unrecognised_page_is_a_failure_not_a_missing_case(scraper):
+    CaseStatusPage.body = b'<html><body><h1>Service temporarily unavailable</h1></body></html>'
+
+    result = scraper.fetch_case(SEARCH)
+
+    assert result['success'] is False
+    assert 'captchaVerified' not in result
+    assert not is_negative_result(result)
+
+
+def test_no_record_notice_is_a_missing_case(scraper):
+    CaseStatusPage.body = f'<html><body><div id="{NO_RECORD_ID}">No record found</div></body></html>'.encode()
+
+    result = scraper.fetch_case(SEARCH)
+
+    assert result['success'] is False
+    assert is_negative_result(result)
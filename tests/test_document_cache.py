@@ -0,0 +1,27 @@
+import os
+
+from document_cache import DocumentCache
+
+
+def test_unknown_document_is_not_rendered(app):
+    client = app.test_client()
+
+    response = client.get('/api/documents/987654/download')
+
+    assert response.status_code == 404
+    assert not any(files for _, _, files in os.walk(app.config['DOCUMENT_CACHE_DIR']))
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = DocumentCache(directory=str(tmp_path), max_entries=1, max_disk_bytes=2500)
+    render = lambda: b'x' * 1000
+
+    first = cache.get_or_render(1, {'id': 1}, render)
+    cache.get_or_render(2, {'id': 2}, render)
+    os.utime(cache._path(first.etag), (1, 1))  # make document 1 the oldest
+    cache.get_or_render(3, {'id': 3}, render)
+
+    stats = cache.stats()
+    assert stats['diskBytes'] == 2000
+    assert stats['diskEvictions'] == 1
+    assert not os.path.exists(cache._path(first.etag))
@@ -0,0 +1,145 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from court_scraper import CourtScraper
+from document_cache import DiskDocumentStore
+from upstream_client import UpstreamClient
+
+VERSION_A = b'%PDF-1.4 order of 15 March, first version ' * 200
+VERSION_B = b'%PDF-1.4 order of 15 March, corrected version ' * 200
+
+
+class DocumentServer(BaseHTTPRequestHandler):
+    """Serves one document with ETag and Last-Modified, honouring Range and If-Range"""
+    body = VERSION_A
+    etag = '"a"'
+    seen = []
+
+    def do_GET(self):
+        headers = dict(self.headers)
+        DocumentServer.seen.append(headers)
+        start = 0
+        if 'Range' in headers and headers.get('If-Range') in (None, self.etag):
+            start = int(headers['Range'].split('=')[1].rstrip('-'))
+        if start >= len(self.body):
+            self.send_response(416)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = self.body[start:]
+        self.send_response(206 if start else 200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', self.etag)
+        self.send_header('Last-Modified', 'Fri, 15 Mar 2024 10:00:00 GMT')
+        if start:
+            self.send_header('Content-Range', f'bytes {start}-{len(self.body) - 1}/{len(self.body)}')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def document_url():
+    DocumentServer.body, DocumentServer.etag, DocumentServer.seen = VERSION_A, '"a"', []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DocumentServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/documents/order.pdf'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    scraper = CourtScraper(document_store=DiskDocumentStore(str(tmp_path / 'documents')),
+                           upstream_client=UpstreamClient(retries=0))
+    yield scraper
+    scraper.close()
+
+
+def _partial(scraper, url, data, **metadata):
+    with open(scraper.document_store.partial_path(url), 'wb') as f:
+        f.write(data)
+    if metadata:
+        scraper.document_store.start_partial(url, metadata)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_unchanged_document_is_resumed(scraper, document_url):
+    _partial(scraper, document_url, VERSION_A[:1000], etag='"a"', lastModified=None)
+
+    path = scraper.download_document(document_url)
+
+    assert _read(path) == VERSION_A
+    assert DocumentServer.seen[-1]['Range'] == 'bytes=1000-'
+    assert DocumentServer.seen[-1]['If-Range'] == '"a"'
+    assert scraper.document_store.metadata(document_url)['etag'] == '"a"'
+
+
+def test_changed_document_restarts_from_the_beginning(scraper, document_url):
+    _partial(scraper, document_url, VERSION_A[:1000], etag='"a"', lastModified=None)
+    DocumentServer.body, DocumentServer.etag = VERSION_B, '"b"'
+
+    path = scraper.download_document(document_url)
+
+    assert _read(path) == VERSION_B
+    assert DocumentServer.seen[-1]['If-Range'] == '"a"'
+    assert scraper.document_store.metadata(document_url)['etag'] == '"b"'
+
+
+def test_partial_without_validator_is_refetched(scraper, document_url):
+    _partial(scraper, document_url, b'bytes of unknown origin')
+
+    path = scraper.download_document(document_url)
+
+    assert _read(path) == VERSION_A
+    assert 'Range' not in DocumentServer.seen[-1]
+
+
+def test_weak_etag_falls_back_to_last_modified(scraper, document_url):
+    _partial(scraper, document_url, VERSION_A[:500], etag='W/"a"', lastModified='Fri, 15 Mar 2024 10:00:00 GMT')
+
+    scraper.download_document(document_url)
+
+    assert DocumentServer.seen[-1]['If-Range'] == 'Fri, 15 Mar 2024 10:00:00 GMT'
+
+
+def test_partial_downloads_count_against_the_store_limit(tmp_path, document_url):
+    store = DiskDocumentStore(str(tmp_path / 'documents'), max_bytes=len(VERSION_A) // 2)
+    scraper = CourtScraper(document_store=store, upstream_client=UpstreamClient(retries=0))
+    try:
+        assert scraper.download_document(document_url) is None
+    finally:
+        scraper.close()
+
+    assert not list((tmp_path / 'documents').glob('*.part'))
+    assert store.stats()['bytes'] == 0
+
+
+def test_partial_bytes_are_tracked_until_commit(scraper, document_url):
+    path = scraper.download_document(document_url)
+
+    assert scraper.document_store.stats()['bytes'] == len(_read(path)) == len(VERSION_A)
+
+
+def test_download_locks_are_dropped_when_done(scraper, document_url):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scraper.download_document(document_url)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1 and results[0] is not None
+    assert scraper._downloads == {}
+    assert scraper.document_stats()['downloading'] == 0
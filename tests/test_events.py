@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from app import _new_query, _sync_step, db
+
+
+def test_stream_cap_leaves_threads_for_requests(make_app):
+    app = make_app(WEB_THREADS=10, EVENTS_RESERVED_THREADS=8)
+    client = app.test_client()
+
+    streams = [client.get('/api/events?history=1', buffered=False) for _ in range(2)]
+    assert [response.status_code for response in streams] == [200, 200]
+
+    # Past the cap the page falls back to polling
+    rejected = client.get('/api/events?history=1')
+    assert rejected.status_code == 503
+    assert client.get('/api/cases/history').status_code == 200
+
+    for response in streams:
+        response.close()
+
+
+def test_configured_cap_never_exceeds_free_threads(make_app):
+    app = make_app(WEB_THREADS=32, EVENTS_RESERVED_THREADS=8, EVENTS_MAX_CONNECTIONS=500)
+    assert app.extensions['case_lookup'].get('event_bus').max_subscribers == 24
+
+    app = make_app(WEB_THREADS=32, EVENTS_RESERVED_THREADS=8, EVENTS_MAX_CONNECTIONS=10)
+    assert app.extensions['case_lookup'].get('event_bus').max_subscribers == 10
+
+
+def test_sync_skips_the_backlog_while_nobody_listens(make_app):
+    listening, writing = make_app(), make_app()
+
+    def write(case_number):
+        with writing.app_context():
+            query = _new_query({'court': 'Delhi High Court', 'caseType': 'FAO',
+                                'caseNumber': case_number, 'filingYear': '2020'})
+            db.session.commit()
+            return query.id
+
+    with listening.app_context():
+        cursor = (datetime.min, 0)
+        write('1')
+        write('2')
+        cursor = _sync_step(cursor)  # no subscribers: the cursor moves to the head
+
+        bus = listening.extensions['case_lookup'].get('event_bus')
+        sub = bus.subscribe(history=True)
+        latest = write('3')
+        _sync_step(cursor)
+
+        published = [sub.get(timeout=0.1) for _ in range(2)]
+        assert [event.data['id'] for event in published if event] == [latest]
+        bus.unsubscribe(sub)
@@ -0,0 +1,37 @@
+from app import _record_lookup
+
+
+def _store(app, case_number, court='Delhi High Court'):
+    search = {'court': court, 'caseType': 'W.P.(C)', 'caseNumber': case_number, 'filingYear': '2022'}
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        return _record_lookup(search, scraper.fetch_case(search, 'ABC123'), update_cache=False).id
+
+
+def test_hearings_are_paged_by_case_detail(app):
+    client = app.test_client()
+    for number in ('101', '102', '103'):
+        _store(app, number)
+    _store(app, '102')  # looked up again: only the newer detail is listed
+
+    first = client.get('/api/hearings', query_string={'date': '2022-01-15', 'limit': 2}).get_json()
+    assert [h['caseNumber'] for h in first['hearings']] == ['102', '103']
+    assert first['nextCursor'] is not None
+    assert all(len(h['proceedings']) == 1 for h in first['hearings'])
+
+    second = client.get('/api/hearings', query_string={
+        'date': '2022-01-15', 'limit': 2, 'cursor': first['nextCursor']
+    }).get_json()
+    assert [h['caseNumber'] for h in second['hearings']] == ['101']
+    assert second['nextCursor'] is None
+
+
+def test_hearings_filter_by_court_and_reject_bad_cursors(app):
+    client = app.test_client()
+    _store(app, '201')
+    _store(app, '202', court='District Court')
+
+    found = client.get('/api/hearings', query_string={'date': '15/01/2022', 'court': 'district court '}).get_json()
+    assert [h['caseNumber'] for h in found['hearings']] == ['202']
+
+    assert client.get('/api/hearings', query_string={'date': '2022-01-15', 'cursor': 'x'}).status_code == 400
@@ -0,0 +1,94 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import CaseDetail, ScrapeJob, _finish_job, _new_query, _recover_scrape_jobs, db
+from job_queue import JobQueue
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'W.P.(C)', 'caseNumber': '1234', 'filingYear': '2023'}
+
+
+def _stored_job(app, claimed_by=None, lease_expires_at=None):
+    """A job as another worker left it: running under its lease, or just queued"""
+    with app.app_context():
+        query = _new_query(SEARCH)
+        query.status = 'pending'
+        job = ScrapeJob(payload=json.dumps({'searchParams': SEARCH, 'captchaSolution': ''}))
+        job.case_query = query
+        if claimed_by:
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            job.attempts = 1
+            job.claimed_by = claimed_by
+            job.lease_expires_at = lease_expires_at
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def _details():
+    return db.session.scalar(select(func.count()).select_from(CaseDetail))
+
+
+def _queue(app):
+    return app.extensions['case_lookup'].get('job_queue')
+
+
+def test_leased_job_is_left_to_its_worker(make_app):
+    worker_a, worker_b = make_app(), make_app()
+    queue_a, queue_b = _queue(worker_a), _queue(worker_b)
+    assert queue_a.worker_id != queue_b.worker_id
+
+    job_id = _stored_job(worker_a, queue_a.worker_id, datetime.utcnow() + timedelta(minutes=5))
+
+    with worker_b.app_context():
+        _recover_scrape_jobs(queue_b)
+    queue_b.shutdown()
+
+    with worker_b.app_context():
+        job = db.session.get(ScrapeJob, job_id)
+        assert job.status == 'running'
+        assert job.claimed_by == queue_a.worker_id
+        assert _details() == 0
+    assert queue_b.stats()['completed'] == 0
+
+
+def test_lapsed_lease_is_run_once_by_a_sibling(make_app):
+    worker_a, worker_b = make_app(), make_app()
+    queue_a, queue_b = _queue(worker_a), _queue(worker_b)
+
+    job_id = _stored_job(worker_a, queue_a.worker_id, datetime.utcnow() - timedelta(seconds=1))
+
+    with worker_b.app_context():
+        _recover_scrape_jobs(queue_b)
+    queue_b.shutdown()
+
+    with worker_b.app_context():
+        job = db.session.get(ScrapeJob, job_id)
+        assert job.status == 'done'
+        assert job.attempts == 2
+        assert job.claimed_by == queue_b.worker_id
+        assert job.case_query.status == 'success'
+        assert _details() == 1
+
+    # The first worker finishing late cannot close (or store) the job again
+    with worker_a.app_context():
+        assert not _finish_job(job_id, 'done')
+        db.session.rollback()
+        assert _details() == 1
+
+
+def test_job_is_held_once_per_process(make_app):
+    release = threading.Event()
+    queue = JobQueue(make_app(), lambda job_id: release.wait(5), max_workers=1)
+
+    assert queue.submit(1) is True
+    assert queue.submit(1) is False  # running or waiting here already
+    assert queue.submit(2) is True
+    assert queue.submit(2) is False
+
+    release.set()
+    queue.shutdown()
+    assert queue.stats()['completed'] == 2
@@ -0,0 +1,24 @@
+from app import _record_lookup
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'RFA', 'caseNumber': '42', 'filingYear': '2018'}
+
+
+def test_lookup_requires_a_court(app):
+    response = app.test_client().get('/api/cases/lookup', query_string={
+        'caseType': 'RFA', 'caseNumber': '42', 'filingYear': '2018'})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing required field: court'
+
+
+def test_lookup_reads_from_the_read_bind(make_app, tmp_path):
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    make_app(SQLALCHEMY_DATABASE_URI=replica_url)  # a replica with the schema, not yet caught up
+    app = make_app(DATABASE_READ_URL=replica_url)
+
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        _record_lookup(SEARCH, scraper.fetch_case(SEARCH, 'ABC123'), update_cache=False)
+
+    response = app.test_client().get('/api/cases/lookup', query_string=SEARCH)
+    assert response.status_code == 404
@@ -0,0 +1,176 @@
+import json
+import sqlite3
+
+from sqlalchemy import create_engine, inspect, text
+
+from app import _find_latest_query, _new_query, _store_result, db
+from migrations import MIGRATIONS, run_migrations
+from result_cache import make_cache_key
+
+# The schema before any migration existed, as the first release created it
+BASELINE_SCHEMA = '''
+CREATE TABLE case_queries (
+    id INTEGER PRIMARY KEY,
+    case_type VARCHAR(50) NOT NULL,
+    case_number VARCHAR(100) NOT NULL,
+    filing_year VARCHAR(10) NOT NULL,
+    court VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    error_message TEXT,
+    created_at DATETIME,
+    completed_at DATETIME
+);
+CREATE TABLE case_details (
+    id INTEGER PRIMARY KEY,
+    query_id INTEGER NOT NULL REFERENCES case_queries (id),
+    case_number VARCHAR(200) NOT NULL,
+    case_type VARCHAR(50) NOT NULL,
+    filing_date VARCHAR(50),
+    court VARCHAR(100) NOT NULL,
+    judge VARCHAR(200),
+    petitioner TEXT,
+    respondent TEXT,
+    current_status VARCHAR(200),
+    last_update VARCHAR(50),
+    proceedings TEXT
+);
+CREATE TABLE case_documents (
+    id INTEGER PRIMARY KEY,
+    case_detail_id INTEGER NOT NULL REFERENCES case_details (id),
+    title VARCHAR(300) NOT NULL,
+    document_type VARCHAR(50) NOT NULL,
+    filed_date VARCHAR(50),
+    download_url TEXT,
+    is_available BOOLEAN,
+    file_size INTEGER
+);
+'''
+
+PROCEEDINGS = [
+    {'date': '15/03/2024', 'title': 'Hearing', 'description': 'Arguments heard', 'type': 'hearing'},
+    {'date': 'to be listed', 'title': 'Next date', 'description': None, 'type': 'listing'}
+]
+
+
+def _baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute(
+        "INSERT INTO case_queries VALUES (1, 'W.P.(C)', ' 1234a ', '2023', 'Delhi High Court', 'success', NULL,"
+        " '2024-03-01 10:00:00', '2024-03-01 10:00:05')"
+    )
+    conn.execute(
+        "INSERT INTO case_details VALUES (1, 1, 'W.P.(C) 1234A/2023', 'W.P.(C)', '01/02/2023', 'Delhi High Court',"
+        " 'Justice Rao', 'Asha Verma', 'Union of India', 'Pending', '01/03/2024', ?)",
+        (json.dumps(PROCEEDINGS),)
+    )
+    conn.execute("INSERT INTO case_documents VALUES (1, 1, 'Order', 'order', '15/03/2024', NULL, 1, 2048)")
+    conn.commit()
+    conn.close()
+
+
+def test_migrations_upgrade_a_baseline_database(make_app, tmp_path):
+    path = tmp_path / 'baseline.db'
+    _baseline_db(path)
+
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            versions = [row[0] for row in conn.execute(text('SELECT version FROM schema_migrations ORDER BY version'))]
+            assert versions == [version for version, _, _, databases in MIGRATIONS if 'app' in databases]
+
+            # Display columns keep what was entered; the key columns hold the normalized case key
+            query = conn.execute(text(
+                'SELECT court, case_type, case_number, court_key, case_type_key, case_number_key, filing_year_key,'
+                ' updated_at FROM case_queries WHERE id = 1'
+            )).one()
+            assert (query.court, query.case_type, query.case_number) == ('Delhi High Court', 'W.P.(C)', ' 1234a ')
+            assert (query.court_key, query.case_type_key, query.case_number_key, query.filing_year_key) == (
+                'delhi high court', 'w.p.(c)', '1234A', '2023')
+            assert query.updated_at is not None
+
+            proceedings = conn.execute(text(
+                'SELECT position, date, date_text, proceeding_type FROM case_proceedings'
+                ' WHERE case_detail_id = 1 ORDER BY position'
+            )).all()
+            assert [(p.position, p.date_text, p.proceeding_type) for p in proceedings] == [
+                (0, '15/03/2024', 'hearing'), (1, 'to be listed', 'listing')]
+            assert proceedings[0].date is not None and proceedings[1].date is None
+            assert conn.execute(text('SELECT proceedings FROM case_details')).scalar() is None
+
+            matches = conn.execute(text("SELECT rowid FROM case_details_fts WHERE case_details_fts MATCH 'verma'")).all()
+            assert [row[0] for row in matches] == [1]
+
+        indexes = {index['name']: index['column_names'] for index in inspect(db.engine).get_indexes('case_queries')}
+        assert indexes['ix_case_queries_case_key'] == ['court_key', 'case_type_key', 'case_number_key', 'filing_year_key']
+        assert 'snapshot' in {column['name'] for column in inspect(db.engine).get_columns('case_queries')}
+        assert run_migrations(db.engine) == []
+
+    # Lookups match however the case is typed and answer with the case as entered
+    response = app.test_client().get('/api/cases/lookup', query_string={
+        'court': 'DELHI HIGH COURT', 'caseType': 'w.p.(c)', 'caseNumber': '1234A', 'filingYear': '2023'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['id'] == 1
+    assert body['court'] == 'Delhi High Court'
+    assert [p['type'] for p in body['caseDetail']['proceedings']] == ['hearing', 'listing']
+
+    # Full-text search groups repeat lookups of one case, however they were typed
+    retyped = {'court': 'delhi high court', 'caseType': 'w.p.(c)', 'caseNumber': '1234A', 'filingYear': '2023'}
+    with app.app_context():
+        result = app.extensions['case_lookup'].get('court_scraper').fetch_case(retyped, 'ABC123')
+        result['caseDetail']['petitioner'] = 'Asha Verma'
+        _store_result(_new_query(retyped), result, update_cache=False)
+
+    found = app.test_client().get('/api/cases/find', query_string={'q': 'verma'}).get_json()
+    assert [match['caseDetailId'] for match in found['results']] == [2]
+
+
+def test_new_queries_keep_the_case_as_entered(app):
+    client = app.test_client()
+    search = {'court': 'Delhi High Court', 'caseType': 'W.P.(C)', 'caseNumber': '55b', 'filingYear': '2020'}
+    with app.app_context():
+        query = _new_query(search)
+        query.status = 'failed'
+        db.session.commit()
+
+        found = _find_latest_query(make_cache_key(dict(search, court='delhi high court ', caseNumber='55B')))
+        assert found.id == query.id
+        assert (found.court, found.case_type, found.case_number) == ('Delhi High Court', 'W.P.(C)', '55b')
+
+    history = client.get('/api/cases/history').get_json()
+    assert history[0]['caseType'] == 'W.P.(C)'
+
+
+def test_separate_captcha_database_gets_only_its_table(make_app, tmp_path):
+    url = f"sqlite:///{tmp_path / 'captcha.db'}"
+    app = make_app(CAPTCHA_STORE='database', CAPTCHA_STORE_URL=url)
+
+    engine = create_engine(url)
+    try:
+        assert set(inspect(engine).get_table_names()) == {'captcha_sessions', 'schema_migrations'}
+        assert run_migrations(engine, 'captcha') == []
+    finally:
+        engine.dispose()
+
+    with app.app_context():
+        assert 'captcha_sessions' in inspect(db.engine).get_table_names()
+
+    response = app.test_client().get('/api/captcha')
+    assert response.status_code == 200
+
+
+def test_separate_rate_limit_database_gets_only_its_table(make_app, tmp_path):
+    url = f"sqlite:///{tmp_path / 'limits.db'}"
+    app = make_app(RATELIMIT_ENABLED=True, RATELIMIT_STORAGE='database', RATELIMIT_STORAGE_URL=url)
+
+    engine = create_engine(url)
+    try:
+        assert set(inspect(engine).get_table_names()) == {'rate_limits', 'schema_migrations'}
+    finally:
+        engine.dispose()
+
+    assert app.test_client().get('/api/cases/history').status_code == 200
+    stats = app.test_client().get('/api/ratelimit/stats').get_json()
+    assert stats['activeKeys'] >= 1
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from limits import parse
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+from sqlalchemy import create_engine
+
+from migrations import run_migrations
+from rate_limit_storage import DatabaseStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'limits.db'}")
+    run_migrations(engine, 'ratelimit')
+    yield DatabaseStorage(engine=engine)
+    engine.dispose()
+
+
+def test_hits_count_until_the_limit(storage):
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse('3/minute')
+
+    assert [limiter.hit(limit, 'client-a') for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit(limit, 'client-b')
+    assert limiter.get_window_stats(limit, 'client-a').remaining == 0
+    assert storage.stats()['activeKeys'] == 2
+
+
+def test_cost_is_charged_against_the_budget(storage):
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse('10/minute')
+
+    assert limiter.hit(limit, 'client', cost=5)
+    assert limiter.hit(limit, 'client', cost=5)
+    assert not limiter.hit(limit, 'client', cost=1)
+
+    sliding = SlidingWindowCounterRateLimiter(storage)
+    assert sliding.hit(limit, 'other', cost=8)
+    assert not sliding.hit(limit, 'other', cost=3)
+    assert sliding.hit(limit, 'other', cost=2)
+
+
+def test_counters_expire(storage):
+    assert storage.incr('key', expiry=0.2, amount=4) == 4
+    assert storage.incr('key', expiry=0.2) == 5
+    assert storage.decr('key', amount=2) == 3
+    assert storage.get('key') == 3
+
+    time.sleep(0.3)
+    assert storage.get('key') == 0
+    assert storage.stats()['activeKeys'] == 0
+
+    # An expired counter starts over rather than adding to the old count
+    assert storage.incr('key', expiry=60) == 1
+    assert storage.incr('stale', expiry=0.01) == 1
+    time.sleep(0.05)
+    assert storage.cleanup() == 1
+    assert storage.stats()['activeKeys'] == 1
+
+
+def test_stats_endpoint_reports_a_disabled_limiter(app):
+    response = app.test_client().get('/api/ratelimit/stats')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'enabled': False}
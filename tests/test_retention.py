@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import CaseDetail, CaseProceeding, CaseQuery, _new_query, _record_lookup, db
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'FAO', 'caseNumber': '310', 'filingYear': '2019'}
+
+
+def _age(query_id, days):
+    CaseQuery.query.filter_by(id=query_id).update(
+        {'created_at': datetime.utcnow() - timedelta(days=days)}, synchronize_session=False)
+    db.session.commit()
+
+
+def _count(model):
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_expired_queries_are_archived_and_read_back(app):
+    client = app.test_client()
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        retention = app.extensions['case_lookup'].get('retention')
+
+        old = _record_lookup(SEARCH, scraper.fetch_case(SEARCH, 'ABC123'), update_cache=False)
+        recent = _record_lookup(dict(SEARCH, caseNumber='311'), scraper.fetch_case(SEARCH, 'ABC123'),
+                                update_cache=False)
+        pending = _new_query(dict(SEARCH, caseNumber='312'))
+        pending.status = 'pending'
+        db.session.commit()
+        old_id, recent_id, pending_id = old.id, recent.id, pending.id
+        before = client.get(f'/api/cases/query/{old_id}').get_json()
+        proceedings = _count(CaseProceeding)
+
+        _age(old_id, 120)
+        _age(pending_id, 120)
+        result = retention.run(vacuum=False)
+
+        assert result['archive']['archived'] == 1
+        assert {query.id for query in CaseQuery.query} == {recent_id, pending_id}
+        assert _count(CaseDetail) == 1
+        assert _count(CaseProceeding) == proceedings // 2
+
+        record = retention.archive.get(old_id)
+        assert record['query']['case_number'] == '310'
+        assert record['caseDetail']['query_id'] == old_id
+        assert len(record['proceedings']) == proceedings // 2
+        assert retention.stats()['archive']['chunks'] == 1
+
+    # The status endpoint falls back to the archive, answering with the stored snapshot
+    archived = client.get(f'/api/cases/query/{old_id}').get_json()
+    assert archived['archived'] is True
+    assert archived['caseDetail'] == before['caseDetail']
+    assert archived['documents'] == before['documents']
+
+    found = client.get('/api/archive/queries', query_string={'court': ' delhi high court', 'caseNumber': '310'})
+    assert [query['id'] for query in found.get_json()['queries']] == [old_id]
+
+
+def test_one_process_holds_the_retention_lease(make_app):
+    first, second = make_app(), make_app()
+    lease_a = first.extensions['case_lookup'].get('retention')
+    lease_b = second.extensions['case_lookup'].get('retention')
+
+    assert lease_a._acquire_lease(60)
+    assert not lease_b._acquire_lease(60)
+    assert lease_a._acquire_lease(60)  # renewal by the holder
+
+
+def test_source_of_cache_hits_is_kept_until_they_are_archived(app):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        retention = app.extensions['case_lookup'].get('retention')
+
+        result = scraper.fetch_case(SEARCH, 'ABC123')
+        source = _record_lookup(SEARCH, result, update_cache=False)
+        hit = _record_lookup(SEARCH, dict(result, queryId=source.id), update_cache=False)
+        source_id, hit_id = source.id, hit.id
+        assert hit.source_query_id == source_id
+
+        _age(source_id, 120)
+        assert retention.run(vacuum=False)['archive']['archived'] == 0
+        assert db.session.get(CaseQuery, source_id) is not None
+
+        # Once the cache hit ages out too, it goes first and its source follows on the next pass
+        _age(hit_id, 120)
+        assert retention.run(vacuum=False)['archive']['archived'] == 1
+        assert retention.run(vacuum=False)['archive']['archived'] == 1
+        assert CaseQuery.query.count() == 0
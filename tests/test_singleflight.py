@@ -0,0 +1,104 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import ScrapeJob, _enqueue_lookup, _new_query, _run_scrape_job, db, lookup_flights
+from job_queue import QueueFullError
+from result_cache import make_cache_key
+from singleflight import SingleFlight
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'W.P.(C)', 'caseNumber': '77', 'filingYear': '2022'}
+
+
+def test_join_attaches_to_the_started_work_until_release():
+    flights = SingleFlight()
+    started = []
+
+    handle, joined = flights.join_or_start('case', lambda: started.append(1) or 'query-1')
+    assert (handle, joined) == ('query-1', False)
+
+    handle, joined = flights.join_or_start('case', lambda: started.append(2) or 'query-2')
+    assert (handle, joined) == ('query-1', True)
+
+    flights.release('case')
+    handle, joined = flights.join_or_start('case', lambda: started.append(3) or 'query-3')
+    assert (handle, joined) == ('query-3', False)
+    assert started == [1, 3]
+    assert flights.stats() == {'inFlight': 1, 'started': 2, 'coalesced': 1}
+
+
+def test_failed_start_releases_the_key():
+    flights = SingleFlight()
+
+    def fail():
+        raise RuntimeError('queue full')
+
+    with pytest.raises(RuntimeError):
+        flights.join_or_start('case', fail)
+    assert flights.stats()['inFlight'] == 0
+    assert flights.join_or_start('case', lambda: 'query-2') == ('query-2', False)
+
+
+def test_do_shares_one_call_between_concurrent_callers():
+    flights = SingleFlight()
+    gate = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        gate.wait(5)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('case', fetch))) for _ in range(3)]
+    threads[0].start()
+    while not flights.stats()['inFlight']:
+        pass
+    for thread in threads[1:]:
+        thread.start()
+    while flights.stats()['coalesced'] < 2:
+        pass
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert sorted(shared for _, shared in results) == [False, True, True]
+
+
+def test_failed_claim_releases_the_key(app):
+    key = make_cache_key(SEARCH)
+    with app.app_context():
+        query = _new_query(SEARCH)
+        query.status = 'pending'
+        # Already claimed elsewhere, e.g. by a sibling process that recovered it
+        job = ScrapeJob(payload=json.dumps({'searchParams': SEARCH}), status='running', claimed_by='other-worker',
+                        lease_expires_at=datetime.utcnow() + timedelta(minutes=5))
+        job.case_query = query
+        db.session.add(job)
+        db.session.commit()
+
+        lookup_flights.join_or_start(key, lambda: query.id)
+        _run_scrape_job(job.id)
+
+        assert lookup_flights.join_or_start(key, lambda: 'next')[1] is False
+        lookup_flights.release(key)
+        assert db.session.get(ScrapeJob, job.id).status == 'running'
+
+
+def test_rejected_submit_closes_the_query_and_releases_the_key(app):
+    key = make_cache_key(SEARCH)
+    with app.app_context():
+        app.extensions['case_lookup'].get('job_queue').max_pending = 0
+
+        with pytest.raises(QueueFullError):
+            _enqueue_lookup(SEARCH)
+
+        job = ScrapeJob.query.one()
+        assert job.status == 'failed'
+        assert job.case_query.status == 'failed'
+        assert json.loads(job.case_query.snapshot)['status'] == 'failed'
+        assert lookup_flights.join_or_start(key, lambda: 'next')[1] is False
+        lookup_flights.release(key)
@@ -0,0 +1,111 @@
+import json
+
+from app import CaseQuery, ScrapeJob, _new_query, _record_lookup, _run_scrape_job, db
+
+SEARCH = {'court': 'Delhi High Court', 'caseType': 'CS(OS)', 'caseNumber': '501', 'filingYear': '2021'}
+
+
+def test_cache_error_after_commit_keeps_the_query_successful(app, monkeypatch):
+    with app.app_context():
+        cache = app.extensions['case_lookup'].get('result_cache')
+
+        def broken_put(*args, **kwargs):
+            raise RuntimeError('cache unavailable')
+
+        monkeypatch.setattr(cache, 'put', broken_put)
+        app.extensions['case_lookup'].get('job_queue')  # built before the job exists, so it is not recovered
+
+        query = _new_query(SEARCH)
+        query.status = 'pending'
+        job = ScrapeJob(payload=json.dumps({'searchParams': SEARCH, 'captchaSolution': 'ABC123'}))
+        job.case_query = query
+        db.session.add(job)
+        db.session.commit()
+
+        _run_scrape_job(job.id)
+
+        db.session.expire_all()
+        job = db.session.get(ScrapeJob, job.id)
+        assert job.status == 'done'
+        assert job.case_query.status == 'success'
+        assert job.case_query.error_message is None
+        assert json.loads(job.case_query.snapshot)['status'] == 'success'
+
+
+def test_prefetch_error_after_commit_keeps_a_recorded_lookup(app, monkeypatch):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+
+        def broken_prefetch(urls):
+            raise RuntimeError('prefetch pool is shut down')
+
+        monkeypatch.setattr(scraper, 'prefetch_documents', broken_prefetch)
+        result = scraper.fetch_case(SEARCH, 'ABC123')
+
+        query = _record_lookup(SEARCH, result)
+
+        db.session.expire_all()
+        query = db.session.get(CaseQuery, query.id)
+        assert query.status == 'success'
+        assert query.case_detail is not None
+
+
+def test_failed_job_stores_its_snapshot(app, monkeypatch):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        app.extensions['case_lookup'].get('job_queue')
+
+        def unreachable(search_params, captcha_solution=''):
+            raise ConnectionError('court website unreachable')
+
+        monkeypatch.setattr(scraper, 'fetch_case', unreachable)
+
+        query = _new_query(SEARCH)
+        query.status = 'pending'
+        job = ScrapeJob(payload=json.dumps({'searchParams': SEARCH}))
+        job.case_query = query
+        db.session.add(job)
+        db.session.commit()
+
+        _run_scrape_job(job.id)
+
+        db.session.expire_all()
+        query = db.session.get(CaseQuery, query.id)
+        assert query.status == 'failed'
+        assert json.loads(query.snapshot)['error'] == 'court website unreachable'
+
+
+def test_status_view_does_not_write(app):
+    client = app.test_client()
+    with app.app_context():
+        query = _new_query(SEARCH)
+        query.status = 'failed'
+        query.error_message = 'stored before snapshots existed'
+        db.session.commit()
+        query_id = query.id
+
+    response = client.get(f'/api/cases/query/{query_id}')
+    assert response.status_code == 200
+    assert response.get_json()['error'] == 'stored before snapshots existed'
+    assert client.get(f'/api/cases/query/{query_id}', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        assert db.session.get(CaseQuery, query_id).snapshot is None
+
+
+def test_result_missing_case_fields_is_stored_as_a_failure(app):
+    with app.app_context():
+        scraper = app.extensions['case_lookup'].get('court_scraper')
+        cache = app.extensions['case_lookup'].get('result_cache')
+        result = scraper.fetch_case(SEARCH, 'ABC123')
+        result['caseDetail']['caseNumber'] = ''
+        del result['caseDetail']['court']
+
+        query = _record_lookup(SEARCH, result)
+
+        db.session.expire_all()
+        query = db.session.get(CaseQuery, query.id)
+        assert query.status == 'failed'
+        assert query.case_detail is None
+        assert 'caseNumber, court' in query.error_message
+        assert cache.get(SEARCH) is None
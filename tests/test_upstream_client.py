@@ -0,0 +1,75 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from upstream_client import UpstreamClient
+
+
+class CaseStatusPage(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        body = self.path.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=300')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    CaseStatusPage.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CaseStatusPage)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/case-status'
+    server.shutdown()
+    server.server_close()
+
+
+def test_params_are_part_of_the_cache_key(upstream, tmp_path):
+    client = UpstreamClient(cache_dir=str(tmp_path), retries=0)
+
+    first = client.get(upstream, params={'caseNumber': '1234', 'filingYear': '2023'})
+    second = client.get(upstream, params={'caseNumber': '5678', 'filingYear': '2023'})
+    assert first.text == '/case-status?caseNumber=1234&filingYear=2023'
+    assert second.text == '/case-status?caseNumber=5678&filingYear=2023'
+
+    # Each parameter set is served from its own fresh entry
+    again = client.get(upstream, params={'caseNumber': '1234', 'filingYear': '2023'})
+    assert again.text == first.text
+    assert len(CaseStatusPage.requests_seen) == 2
+
+    stats = client.stats()['hosts']
+    assert sum(host['freshHits'] for host in stats.values()) == 1
+    assert sum(host['stored'] for host in stats.values()) == 2
+
+
+def test_cache_evicts_least_recently_used_responses(upstream, tmp_path):
+    client = UpstreamClient(cache_dir=str(tmp_path), retries=0, cache_max_entries=2)
+
+    client.get(upstream, params={'caseNumber': '1'})
+    client.get(upstream, params={'caseNumber': '2'})
+    client.get(upstream, params={'caseNumber': '1'})  # fresh hit: now the most recently used
+    client.get(upstream, params={'caseNumber': '3'})
+
+    stats = client.stats()['cache']
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    assert len(list(tmp_path.rglob('*.json'))) == 2
+
+    client.get(upstream, params={'caseNumber': '1'})
+    client.get(upstream, params={'caseNumber': '2'})
+    assert CaseStatusPage.requests_seen == [
+        '/case-status?caseNumber=1', '/case-status?caseNumber=2', '/case-status?caseNumber=3',
+        '/case-status?caseNumber=2'
+    ]
+
+    # A new client over the same directory picks up what is stored
+    assert UpstreamClient(cache_dir=str(tmp_path), retries=0).stats()['cache']['entries'] == 2
@@ -0,0 +1,329 @@
+"""
+HTTP client for upstream court websites.
+
+Wraps a requests.Session with:
+- explicitly sized keep-alive connection pools (per host where configured),
+- retries with jittered exponential backoff for idempotent requests,
+- a default (connect, read) timeout on every request,
+- an on-disk response cache keyed by the full URL, query string included,
+  that honours Cache-Control/Expires and revalidates stale entries with
+  If-None-Match/If-Modified-Since, so an unchanged page costs a single 304
+  on a warm connection. The cache is bounded by entry count and bytes and
+  evicts the least recently used responses.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_policy(retries: int, backoff: float, jitter: float) -> Retry:
+    options = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        backoff_factor=backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    try:
+        return Retry(backoff_jitter=jitter, **options)
+    except TypeError:  # urllib3 < 2 has no backoff_jitter
+        return Retry(**options)
+
+
+def _freshness_lifetime(headers) -> Optional[int]:
+    """Seconds a response may be reused without revalidation; None if it must not be stored"""
+    directives = {}
+    for part in headers.get('Cache-Control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            return max(0, int(directives['max-age']))
+        except ValueError:
+            return 0
+    if headers.get('Expires'):
+        try:
+            expires = parsedate_to_datetime(headers['Expires']).timestamp()
+            return max(0, int(expires - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class HttpCache:
+    """Response bodies and headers on disk, keyed by URL"""
+
+    STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Content-Encoding')
+
+    def __init__(self, directory: str, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+        stored = list(self._stored())
+        self._entries = len(stored)
+        self._bytes = sum(size for _, size, _ in stored)
+
+    def _stored(self):
+        """Yield (metadata path, bytes on disk, last used) for every stored response"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(meta_path)
+                    body_size = os.path.getsize(meta_path[:-len('.json')] + '.body')
+                except OSError:
+                    continue
+                yield meta_path, stat.st_size + body_size, max(stat.st_atime, stat.st_mtime)
+
+    def _size(self, url: str) -> Optional[int]:
+        meta_path, body_path = self._paths(url)
+        try:
+            return os.path.getsize(meta_path) + os.path.getsize(body_path)
+        except OSError:
+            return None
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def load(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            now = time.time()
+            os.utime(meta_path, (now, now))  # the metadata file's times are the LRU clock
+            return meta, body
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, response: requests.Response, lifetime: int):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        previous = self._size(url)
+        meta = {
+            'url': url,
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers},
+            'expiresAt': time.time() + lifetime
+        }
+        # Body first, then metadata, each via rename, so a reader never pairs new headers with an old body
+        for path, data, mode in ((body_path, response.content, 'wb'), (meta_path, json.dumps(meta), 'w')):
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        now = time.time()
+        os.utime(meta_path, (now, now))  # file system timestamps can be too coarse to order recent entries
+
+        with self._lock:
+            self._entries += previous is None
+            self._bytes += (self._size(url) or 0) - (previous or 0)
+        self._enforce_limit(keep=meta_path)
+
+    def _enforce_limit(self, keep: str):
+        with self._lock:
+            if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+                return
+
+            # Other worker processes share the directory, so recount from the files themselves
+            stored = sorted(self._stored(), key=lambda entry: entry[2])
+            self._entries = len(stored)
+            self._bytes = sum(size for _, size, _ in stored)
+            for meta_path, size, _ in stored:
+                if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+                    break
+                if meta_path == keep:
+                    continue
+                try:
+                    os.remove(meta_path)  # metadata first, so a reader never finds it without a body
+                    os.remove(meta_path[:-len('.json')] + '.body')
+                except OSError:
+                    pass
+                self._entries -= 1
+                self._bytes -= size
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'entries': self._entries,
+                'bytes': self._bytes,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'evictions': self._evictions
+            }
+
+    def refresh(self, url: str, meta: Dict[str, Any], response: requests.Response, lifetime: int):
+        """Update a stored entry after a 304"""
+        meta_path, _ = self._paths(url)
+        for name in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires'):
+            if name in response.headers:
+                meta['headers'][name] = response.headers[name]
+        meta['expiresAt'] = time.time() + lifetime
+        tmp_path = f'{meta_path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+
+class UpstreamClient:
+    def __init__(self, cache_dir: Optional[str] = None, pool_connections: int = 10, pool_maxsize: int = 10,
+                 host_pool_sizes: Optional[Dict[str, int]] = None, retries: int = 3, backoff: float = 0.5,
+                 jitter: float = 0.5, timeout: Tuple[float, float] = (5, 30), user_agent: Optional[str] = None,
+                 cache_max_entries: int = 10000, cache_max_bytes: int = 256 * 1024 * 1024):
+        self.timeout = timeout
+        self.cache = HttpCache(cache_dir, cache_max_entries, cache_max_bytes) if cache_dir else None
+        self.session = requests.Session()
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+
+        retry = _retry_policy(retries, backoff, jitter)
+        self._adapters = {}
+        default = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('http://', default)
+        self.session.mount('https://', default)
+        self._adapters['*'] = default
+
+        # Busy court hosts get their own, larger pool; requests picks the longest matching prefix
+        for host, size in (host_pool_sizes or {}).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry)
+            self.session.mount(f'https://{host}/', adapter)
+            self.session.mount(f'http://{host}/', adapter)
+            self._adapters[host] = adapter
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _count(self, url: str, field: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            counters = self._hosts.get(host)
+            if counters is None:
+                counters = self._hosts[host] = {
+                    'requests': 0, 'freshHits': 0, 'conditional': 0, 'notModified': 0, 'stored': 0, 'errors': 0
+                }
+            counters[field] += 1
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request with the default timeout, bypassing the response cache"""
+        kwargs.setdefault('timeout', self.timeout)
+        self._count(url, 'requests')
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._count(url, 'errors')
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the response cache (streamed and Range requests skip it)"""
+        headers = dict(kwargs.pop('headers', None) or {})
+        if kwargs.get('params'):
+            # The cache is keyed by URL, so the query string has to be part of it
+            url = requests.Request('GET', url, params=kwargs.pop('params')).prepare().url
+        if self.cache is None or kwargs.get('stream') or 'Range' in headers:
+            return self.request('GET', url, headers=headers, **kwargs)
+
+        cached = self.cache.load(url)
+        if cached is not None:
+            meta, body = cached
+            if meta['expiresAt'] > time.time():
+                self._count(url, 'freshHits')
+                return self._from_cache(url, meta, body)
+
+            if meta['headers'].get('ETag'):
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+            if 'If-None-Match' in headers or 'If-Modified-Since' in headers:
+                self._count(url, 'conditional')
+
+        response = self.request('GET', url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self._count(url, 'notModified')
+            lifetime = _freshness_lifetime(response.headers)
+            self.cache.refresh(url, meta, response, lifetime or 0)
+            return self._from_cache(url, meta, body)
+
+        if response.status_code == 200:
+            lifetime = _freshness_lifetime(response.headers)
+            validators = 'ETag' in response.headers or 'Last-Modified' in response.headers
+            if lifetime is not None and (lifetime > 0 or validators):
+                self.cache.store(url, response, lifetime)
+                self._count(url, 'stored')
+
+        return response
+
+    def _from_cache(self, url: str, meta: Dict[str, Any], body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta.get('status', 200)
+        response.headers.update(meta['headers'])
+        response.headers['X-Cache'] = 'HIT'
+        response._content = body
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def _pool_stats(self) -> Dict[str, Dict[str, int]]:
+        pools = {}
+        for adapter in self._adapters.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                idle = pool.pool.qsize() if pool.pool is not None else 0
+                pools[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                    'maxSize': pool.pool.maxsize if pool.pool is not None else 0,
+                    'inUse': (pool.pool.maxsize - idle) if pool.pool is not None else 0,
+                    'connectionsOpened': pool.num_connections,
+                    'requests': pool.num_requests
+                }
+        return pools
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-host request, cache and revalidation counters plus pool usage"""
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self._hosts.items()}
+        for counters in hosts.values():
+            counters['revalidationHitRate'] = (
+                round(counters['notModified'] / counters['conditional'], 4) if counters['conditional'] else 0.0
+            )
+        return {
+            'hosts': hosts,
+            'pools': self._pool_stats(),
+            'cacheDirectory': self.cache.directory if self.cache else None,
+            'cache': self.cache.stats() if self.cache else None
+        }
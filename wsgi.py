@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Creating the app does not touch the database or start any threads, so it is
+safe to import in a preforking master (see gunicorn.conf.py).
+"""
+
+from app import create_app
+
+app = create_app()